@@ -33,6 +33,8 @@ export interface IFileInfo {
     error: string | null
     workProgress?: number
     workTotal?: number
+    workRate?: number
+    workEtaSeconds?: number
   } | null
   upload?: IUpload | null
 }
@@ -0,0 +1,46 @@
+import sys
+
+from server.models import CvrBallot
+from server.database import db_session
+from server.util.cvr_interpretations import pack_interpretations
+
+# Backfills CvrBallot.packed_interpretations for CVRs that were uploaded before
+# we started packing interpretations, clearing the text interpretations (which
+# new CVRs don't store). Once this has been run, the
+# CvrBallot.interpretations column can be dropped. Commits in batches so it can
+# be stopped and restarted.
+BATCH_SIZE = 10_000
+
+if __name__ == "__main__":
+    if len(sys.argv) != 1:
+        print("Usage: python -m scripts.pack-cvr-interpretations")
+        sys.exit(1)
+
+    total_packed = 0
+    while True:
+        cvr_ballots = (
+            CvrBallot.query.filter(CvrBallot.packed_interpretations.is_(None))
+            .with_entities(
+                CvrBallot.batch_id, CvrBallot.record_id, CvrBallot.interpretations
+            )
+            .limit(BATCH_SIZE)
+            .all()
+        )
+        if not cvr_ballots:
+            break
+
+        db_session.bulk_update_mappings(
+            CvrBallot,
+            [
+                dict(
+                    batch_id=batch_id,
+                    record_id=record_id,
+                    packed_interpretations=pack_interpretations(interpretations),
+                    interpretations=None,
+                )
+                for batch_id, record_id, interpretations in cvr_ballots
+            ],
+        )
+        db_session.commit()
+        total_packed += len(cvr_ballots)
+        print(f"Packed interpretations for {total_packed} CVR ballots")
@@ -13,6 +13,7 @@ from ..models import *
 from ..auth import restrict_access, UserType, get_loggedin_user, get_support_user
 from ..worker.tasks import (
     UserError,
+    TaskPriority,
     background_task,
     create_background_task,
 )
@@ -27,6 +28,7 @@ from ..util.file import (
     timestamp_filename,
     FileType,
 )
+from ..util.copy_stream import copy_rows
 from ..util.csv_download import csv_response
 from ..util.csv_parse import (
     CSVParseError,
@@ -104,7 +106,7 @@ def hybrid_jurisdiction_total_ballots(jurisdiction: Jurisdiction) -> HybridPair:
     )
 
 
-@background_task
+@background_task(priority=TaskPriority.BULK)
 def process_ballot_manifest_file(
     election_id: str,
     jurisdiction_id: str,
@@ -160,40 +162,78 @@ def process_ballot_manifest_file(
         num_batches = 0
         num_ballots = 0
         rows_without_ballots: list[int] = []
-
-        for row_index, row in enumerate(manifest_csv):
-            # For the "sample extra batches by counting group" feature, we
-            # require the Container column to identify the counting group, so we
-            # validate it here. We want to provide special custom error
-            # messages, so we don't use the built-in "required_column" option in
-            # CSVColumnType.
-            if is_counting_group_required:
-                if CONTAINER not in row:
-                    raise CSVParseError(
-                        'Missing required column "Container". Use the Batch Audit File Preparation Tool to create your ballot manifest.'
-                    )
-                counting_group = row.get(CONTAINER)
-                if counting_group not in counting_group_allowset:
-                    raise CSVParseError(
-                        f'Invalid value for column "Container", row {row_index + 2}: "{counting_group}". Use the Batch Audit File Preparation Tool to create your ballot manifest, or correct this value to one of the following: {", ".join(counting_group_allowlist)}.'
-                    )
-
-            if row[NUMBER_OF_BALLOTS] == 0:
-                rows_without_ballots.append(row_index + 2)
-                continue
-
-            batch = Batch(
-                id=str(uuid.uuid4()),
-                name=row[BATCH_NAME],
-                jurisdiction_id=jurisdiction.id,
-                num_ballots=row[NUMBER_OF_BALLOTS],
-                container=row.get(CONTAINER, None),
-                tabulator=row.get(TABULATOR, None),
-                has_cvrs=row.get(CVR, None),
+        # BaseModel sets these timestamps in Python, so we have to provide
+        # them ourselves when using COPY. Stored without a timezone, like
+        # UTCDateTime does.
+        created_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
+        def batch_copy_rows():
+            nonlocal num_batches, num_ballots
+            for row_index, row in enumerate(manifest_csv):
+                # For the "sample extra batches by counting group" feature, we
+                # require the Container column to identify the counting group, so we
+                # validate it here. We want to provide special custom error
+                # messages, so we don't use the built-in "required_column" option in
+                # CSVColumnType.
+                if is_counting_group_required:
+                    if CONTAINER not in row:
+                        raise CSVParseError(
+                            'Missing required column "Container". Use the Batch Audit File Preparation Tool to create your ballot manifest.'
+                        )
+                    counting_group = row.get(CONTAINER)
+                    if counting_group not in counting_group_allowset:
+                        raise CSVParseError(
+                            f'Invalid value for column "Container", row {row_index + 2}: "{counting_group}". Use the Batch Audit File Preparation Tool to create your ballot manifest, or correct this value to one of the following: {", ".join(counting_group_allowlist)}.'
+                        )
+
+                if row[NUMBER_OF_BALLOTS] == 0:
+                    rows_without_ballots.append(row_index + 2)
+                    continue
+
+                yield (
+                    str(uuid.uuid4()),
+                    jurisdiction.id,
+                    row.get(CONTAINER, None),
+                    row.get(TABULATOR, None),
+                    row[BATCH_NAME],
+                    row[NUMBER_OF_BALLOTS],
+                    row.get(CVR, None),
+                    created_at,
+                    created_at,
+                )
+                num_batches += 1
+                num_ballots += row[NUMBER_OF_BALLOTS]
+
+        # Stream the batches straight into the database with COPY rather than
+        # creating an ORM object for each one. As in cvrs.process_cvr_file, we
+        # use the db_session's underlying connection, so the operation occurs
+        # within the same transaction.
+        cursor = db_session.connection().connection.cursor()
+        try:
+            copy_rows(
+                cursor,
+                """
+                COPY batch (
+                    id,
+                    jurisdiction_id,
+                    container,
+                    tabulator,
+                    name,
+                    num_ballots,
+                    has_cvrs,
+                    created_at,
+                    updated_at
+                )
+                FROM STDIN
+                WITH (
+                    FORMAT CSV,
+                    DELIMITER ','
+                )
+                """,
+                batch_copy_rows(),
             )
-            db_session.add(batch)
-            num_batches += 1
-            num_ballots += batch.num_ballots
+        finally:
+            cursor.close()
 
         manifest_file.close()
 
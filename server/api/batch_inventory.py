@@ -9,15 +9,22 @@ from collections import defaultdict
 import csv
 from datetime import datetime, timezone
 import io
-from typing import TypedDict
+import itertools
+import operator
+import numpy as np
+from typing import Callable, Iterable, Iterator, TypedDict, TypeVar
 import uuid
+from zipfile import ZipFile
 from defusedxml.ElementTree import parse as parse_xml
 from xml.etree.ElementTree import ElementTree
 from flask import request, jsonify, session
 from werkzeug.exceptions import BadRequest, Conflict
 from sqlalchemy.orm import Session
 
-from server.util.collections import diff_file_lists_ignoring_order_and_case
+from server.util.collections import (
+    chunked,
+    diff_file_lists_ignoring_order_and_case,
+)
 from server.util.cvr_snapshot_parse import read_cvr_snapshots
 from server.util.string import strip_optional_string
 
@@ -55,8 +62,13 @@ from ..util.file import (
     timestamp_filename,
     unzip_files,
 )
-from ..util.hart_parse import find_xml, parse_contest_results, find_text_xml
-from ..worker.tasks import UserError, background_task, create_background_task
+from ..util.hart_parse import HartCvr, parse_hart_cvr
+from ..worker.tasks import (
+    TaskPriority,
+    UserError,
+    background_task,
+    create_background_task,
+)
 from ..util.csv_download import csv_response, jurisdiction_timestamp_name
 from ..util.isoformat import isoformat
 from .batch_tallies import construct_contest_choice_csv_headers
@@ -151,7 +163,367 @@ def validate_choice_name_and_get_choice_id(
     return choice_id
 
 
-@background_task
+# Number of CVR rows to parse and tally at a time
+BATCH_INVENTORY_CHUNK_SIZE = 10_000
+
+# first_tallied value for batch choice tallies that no ballot has been added to
+NOT_TALLIED = np.iinfo(np.int64).max
+
+T = TypeVar("T")
+ParsedChunk = TypeVar("ParsedChunk")
+
+
+class DistinctValues(dict[str, int]):
+    """
+    Assigns a code to each distinct value in CVR cells, in the order they're
+    first seen: { value: code }. CVRs only contain a handful of distinct values,
+    so encoding cells as codes lets us parse or look up each distinct value
+    once, rather than once per cell.
+    """
+
+    def __missing__(self, value: str) -> int:
+        code = self[value] = len(self)
+        return code
+
+    def encode(self, rows: list[list[str]], columns: list[int]) -> np.ndarray:
+        """
+        Returns a (rows x columns) array of the codes for the values in the
+        given columns. Raises IndexError if a row is missing a column.
+        """
+        if not columns:
+            return np.zeros((len(rows), 0), dtype=np.intp)
+        get_columns = operator.itemgetter(*columns)
+        row_values = (
+            map(get_columns, rows)
+            if len(columns) > 1
+            else ((get_columns(row),) for row in rows)
+        )
+        codes = np.fromiter(
+            map(self.__getitem__, itertools.chain.from_iterable(row_values)),
+            dtype=np.intp,
+            count=len(rows) * len(columns),
+        )
+        return codes.reshape(len(rows), len(columns))
+
+
+class BatchInventoryTally:
+    """
+    Tallies CVR ballots by batch for the batch inventory tool, producing the
+    ballot_count_by_batch and batch_tallies in ElectionResults.
+
+    Ballots are added in chunks as a (ballots x choices) matrix of votes, with
+    the choices of all contests laid out side by side. Overvotes are masked out
+    and the votes are summed by batch with array operations, rather than
+    building a dict of votes per contest for every ballot.
+
+    To produce exactly the same batch_tallies as adding each ballot's votes to
+    nested dicts, we also track the first ballot that was tallied for each
+    batch and choice, which determines the order of the dict keys.
+    """
+
+    def __init__(self, contests: list[Contest]):
+        self.contests = contests
+        self.choice_ids = [
+            choice.id for contest in contests for choice in contest.choices
+        ]
+        # For each contest, the range of its choices in choice_ids
+        contest_sizes = np.array(
+            [len(contest.choices) for contest in contests], dtype=np.intp
+        )
+        self.contest_ends = np.cumsum(contest_sizes, dtype=np.intp)
+        self.contest_starts = self.contest_ends - contest_sizes
+        # For each choice, the index of its contest
+        self.choice_contests = np.repeat(
+            np.arange(len(contests), dtype=np.intp), contest_sizes
+        )
+        self.votes_allowed = np.array(
+            [contest.votes_allowed for contest in contests], dtype=np.int64
+        )
+        self.choice_id_indices = {
+            choice_id: index for index, choice_id in enumerate(self.choice_ids)
+        }
+        # For each contest, { choice name in CVR: index in choice_ids }
+        self.choice_name_indices: list[dict[str | None, int | None]] = [
+            {} for _ in contests
+        ]
+        # For each contest, the distinct choice names in the contest's column
+        # of an ES&S CVR
+        self.contest_choice_names = [DistinctValues() for _ in contests]
+
+        self.batch_keys: list[BatchKey] = []
+        self.batch_indices: dict[BatchKey, int] = {}
+        self.ballot_counts = np.zeros(0, dtype=np.int64)
+        self.tallies = np.zeros((0, len(self.choice_ids)), dtype=np.int64)
+        self.first_tallied = np.full(
+            (0, len(self.choice_ids)), NOT_TALLIED, dtype=np.int64
+        )
+        self.num_ballots = 0
+
+    def index_batches(
+        self, tabulator_ids: np.ndarray, batch_ids: np.ndarray, clean_value=None
+    ) -> np.ndarray:
+        """
+        Returns the index of each ballot's batch, given the tabulator id and
+        batch id of each ballot. New batches are added in the order they first
+        appear. clean_value, if given, is applied to each distinct id.
+        """
+        tabulator_values, tabulator_indices = np.unique(
+            tabulator_ids, return_inverse=True
+        )
+        batch_values, batch_value_indices = np.unique(batch_ids, return_inverse=True)
+        pairs, pair_first_ballots, pair_indices = np.unique(
+            tabulator_indices.ravel() * len(batch_values) + batch_value_indices.ravel(),
+            return_index=True,
+            return_inverse=True,
+        )
+        pair_batch_indices = np.zeros(len(pairs), dtype=np.intp)
+        for pair_index in np.argsort(pair_first_ballots):
+            tabulator_id, batch_id = divmod(int(pairs[pair_index]), len(batch_values))
+            batch_key = (
+                str(tabulator_values[tabulator_id]),
+                str(batch_values[batch_id]),
+            )
+            if clean_value:
+                batch_key = (clean_value(batch_key[0]), clean_value(batch_key[1]))
+            pair_batch_indices[pair_index] = self.batch_index(batch_key)
+        return pair_batch_indices[pair_indices.ravel()]
+
+    def batch_index(self, batch_key: BatchKey) -> int:
+        index = self.batch_indices.get(batch_key)
+        if index is None:
+            index = self.batch_indices[batch_key] = len(self.batch_keys)
+            self.batch_keys.append(batch_key)
+        return index
+
+    def choice_index(self, contest_index: int, choice_name: str | None) -> int | None:
+        """
+        Looks up a choice name from a CVR using
+        validate_choice_name_and_get_choice_id, returning the index of the
+        choice in choice_ids. CVRs only contain a handful of distinct choice
+        names, so we only look up each one once.
+        """
+        choice_name_indices = self.choice_name_indices[contest_index]
+        if choice_name not in choice_name_indices:
+            choice_id = validate_choice_name_and_get_choice_id(
+                self.contests[contest_index], choice_name
+            )
+            choice_name_indices[choice_name] = (
+                self.choice_id_indices[choice_id] if choice_id else None
+            )
+        return choice_name_indices[choice_name]
+
+    def votes_for_choice_names(
+        self, rows: list[list[str]], contest_columns: list[int]
+    ) -> np.ndarray:
+        """
+        Builds a (ballots x choices) votes matrix from CVR rows that contain
+        the name of the choice voted for in each contest (as in ES&S CVRs),
+        given the column of each contest. Raises IndexError if a row is missing
+        a column, and UserError for unrecognized choice names.
+        """
+        votes = np.zeros((len(rows), len(self.choice_ids)), dtype=np.int64)
+        for contest_index, column in enumerate(contest_columns):
+            choice_names = self.contest_choice_names[contest_index]
+            name_codes = choice_names.encode(rows, [column])[:, 0]
+            # Use -1 for names that aren't a vote for any choice
+            code_choices = np.array(
+                [
+                    -1 if choice is None else choice
+                    for choice in (
+                        self.choice_index(contest_index, name) for name in choice_names
+                    )
+                ],
+                dtype=np.intp,
+            )
+            ballot_choices = code_choices[name_codes]
+            voted = np.flatnonzero(ballot_choices >= 0)
+            votes[voted, ballot_choices[voted]] = 1
+        return votes
+
+    def votes_for_choice_names_one_row_at_a_time(
+        self,
+        first_row_index: int,
+        rows: list[list[str]],
+        header_indices: dict[str, int],
+        row_batch_key: Callable[[int, list[str], int], BatchKey],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Parses the same CVR rows as votes_for_choice_names, but one row at a
+        time using column_value, so errors are raised exactly as they would be
+        by parsing the whole file row by row. row_batch_key(ballot, row,
+        row_number) returns the batch key of each row. Returns (batch indices,
+        votes).
+        """
+        batch_indices = []
+        voted_ballots = []
+        voted_choices = []
+        for ballot, row in enumerate(rows):
+            row_number = first_row_index + ballot + 1
+            batch_indices.append(
+                self.batch_index(row_batch_key(ballot, row, row_number))
+            )
+            for contest_index, contest in enumerate(self.contests):
+                choice_name = column_value(
+                    row, contest.name, row_number, header_indices, required=False
+                )
+                choice = self.choice_index(contest_index, choice_name)
+                if choice is not None:
+                    voted_ballots.append(ballot)
+                    voted_choices.append(choice)
+
+        return np.array(batch_indices, dtype=np.intp), self.votes_for_choices(
+            len(rows), voted_ballots, voted_choices
+        )
+
+    def within_votes_allowed(self, votes: np.ndarray) -> np.ndarray:
+        """
+        Returns whether each ballot's votes for each choice are within the
+        votes allowed for the choice's contest, i.e. not an overvote.
+        """
+        cumulative_votes = np.zeros((len(votes), len(self.choice_ids) + 1), np.int64)
+        np.cumsum(votes, axis=1, out=cumulative_votes[:, 1:])
+        contest_votes = (
+            cumulative_votes[:, self.contest_ends]
+            - cumulative_votes[:, self.contest_starts]
+        )
+        within_votes_allowed: np.ndarray = contest_votes <= self.votes_allowed
+        return within_votes_allowed[:, self.choice_contests]
+
+    def add_ballots(
+        self,
+        batch_indices: np.ndarray,
+        votes: np.ndarray,
+        tallied: np.ndarray,
+        ballot_count: int = 1,
+    ):
+        """
+        Adds a chunk of ballots:
+        - batch_indices: the index of each ballot's batch (from index_batches)
+        - votes: (ballots x choices) the votes for each choice
+        - tallied: (ballots x choices) whether each vote should be added to its
+          batch's tallies (e.g. False for overvotes)
+        - ballot_count: how many times to count each ballot in its batch's
+          ballot count
+        """
+        num_batches = len(self.batch_keys)
+        if len(self.ballot_counts) < num_batches:
+            new_batches = num_batches - len(self.ballot_counts)
+            self.ballot_counts = np.pad(self.ballot_counts, (0, new_batches))
+            self.tallies = np.pad(self.tallies, ((0, new_batches), (0, 0)))
+            self.first_tallied = np.pad(
+                self.first_tallied,
+                ((0, new_batches), (0, 0)),
+                constant_values=NOT_TALLIED,
+            )
+        if len(batch_indices) == 0:
+            return
+
+        ballot_numbers = self.num_ballots + np.arange(len(batch_indices))
+        self.num_ballots += len(batch_indices)
+        self.ballot_counts += ballot_count * np.bincount(
+            batch_indices, minlength=num_batches
+        )
+
+        # Group the ballots by batch and sum each group
+        order = np.argsort(batch_indices, kind="stable")
+        sorted_batch_indices = batch_indices[order]
+        group_starts = np.flatnonzero(
+            np.concatenate(
+                [[True], sorted_batch_indices[1:] != sorted_batch_indices[:-1]]
+            )
+        )
+        batches = sorted_batch_indices[group_starts]
+        self.tallies[batches] += np.add.reduceat(
+            np.where(tallied, votes, 0)[order], group_starts, axis=0
+        )
+        first_tallied = np.minimum.reduceat(
+            np.where(tallied, ballot_numbers[:, None], NOT_TALLIED)[order],
+            group_starts,
+            axis=0,
+        )
+        self.first_tallied[batches] = np.minimum(
+            self.first_tallied[batches], first_tallied
+        )
+
+    def ballot_count_by_batch(self) -> dict[BatchKey, int]:
+        return dict(zip(self.batch_keys, self.ballot_counts.tolist()))
+
+    def batch_tallies(self, include_untallied: bool) -> dict[BatchKey, dict[str, int]]:
+        """
+        Returns { batch_key: { choice_id: votes } }, ordered by the first ballot
+        tallied for each batch and choice. If include_untallied is set, batches
+        and choices that no ballot was tallied for are included with zero votes.
+        """
+        batch_first_tallied = self.first_tallied.min(axis=1, initial=NOT_TALLIED)
+        tallied_batches = np.flatnonzero(batch_first_tallied != NOT_TALLIED)
+        batches = tallied_batches[
+            np.argsort(batch_first_tallied[tallied_batches], kind="stable")
+        ].tolist()
+        if include_untallied:
+            batches += np.flatnonzero(batch_first_tallied == NOT_TALLIED).tolist()
+
+        batch_tallies = {}
+        for batch in batches:
+            first_tallied = self.first_tallied[batch]
+            tallied_choices = np.flatnonzero(first_tallied != NOT_TALLIED)
+            tallied_choices = tallied_choices[
+                np.argsort(first_tallied[tallied_choices], kind="stable")
+            ]
+            tallies = self.tallies[batch]
+            choice_tallies = {
+                self.choice_ids[choice]: int(tallies[choice])
+                for choice in tallied_choices
+            }
+            if include_untallied:
+                for choice_id in self.choice_ids:
+                    choice_tallies.setdefault(choice_id, 0)
+            batch_tallies[self.batch_keys[batch]] = choice_tallies
+        return batch_tallies
+
+    def votes_for_choices(
+        self,
+        num_ballots: int,
+        ballots: list[int] | np.ndarray,
+        choices: list[int] | np.ndarray,
+    ) -> np.ndarray:
+        """
+        Builds a (ballots x choices) votes matrix from a vote for each pair of
+        ballot index and choice index.
+        """
+        votes = np.zeros((num_ballots, len(self.choice_ids)), dtype=np.int64)
+        np.add.at(
+            votes,
+            (np.asarray(ballots, dtype=np.intp), np.asarray(choices, dtype=np.intp)),
+            1,
+        )
+        return votes
+
+
+def parse_in_chunks(
+    rows: Iterable[T],
+    parse_chunk: Callable[[list[T]], ParsedChunk | None],
+    parse_chunk_one_row_at_a_time: Callable[[int, list[T]], ParsedChunk],
+) -> Iterator[ParsedChunk]:
+    """
+    Parses CVR rows BATCH_INVENTORY_CHUNK_SIZE at a time, yielding each parsed
+    chunk. parse_chunk is the fast path, which returns None if it can't parse
+    a chunk (e.g. because of missing or invalid values). Those chunks are
+    parsed by parse_chunk_one_row_at_a_time instead, which gets the index of
+    the chunk's first row in the file, so it raises the same errors (with the
+    same row numbers) as parsing the whole file row by row.
+    """
+    first_row_index = 0
+    for chunk in chunked(rows, BATCH_INVENTORY_CHUNK_SIZE):
+        parsed_chunk = parse_chunk(chunk)
+        yield (
+            parsed_chunk
+            if parsed_chunk is not None
+            else parse_chunk_one_row_at_a_time(first_row_index, chunk)
+        )
+        first_row_index += len(chunk)
+
+
+@background_task(priority=TaskPriority.BULK)
 def process_batch_inventory_cvr_file(
     election_id: str,
     jurisdiction_id: str,
@@ -229,69 +601,163 @@ def process_batch_inventory_cvr_file(
 
         header_indices = get_header_indices(headers_and_affiliations)
 
+        tally = BatchInventoryTally(contests)
         ballot_count_by_group: dict[str, int] = defaultdict(int)
-        ballot_count_by_batch: dict[BatchKey, int] = defaultdict(int)
         batch_to_counting_group: dict[BatchKey, str] = {}
-        batch_tallies: dict[BatchKey, dict[str, int]] = defaultdict(
-            lambda: defaultdict(int)
-        )
 
         def parse_vote(vote: str):
             return int(vote if vote != "" else 0)
 
-        for row_index, row in enumerate(cvrs):
-            cvr_number = column_value(
-                row,
-                "CvrNumber",
-                row_index + 1,
-                header_indices,
-                remove_leading_equal_sign=True,
+        def remove_leading_equal_sign(value: str):
+            return (
+                value[2:-1] if value.startswith('="') and value.endswith('"') else value
             )
-            tabulator_number = column_value(
-                row,
-                "TabulatorNum",
-                cvr_number,
-                header_indices,
-                remove_leading_equal_sign=True,
+
+        metadata_headers = ["CvrNumber", "TabulatorNum", "BatchId", "CountingGroup"]
+        choice_columns = [
+            choice_indices[(contest.name, choice.name)]
+            for contest in contests
+            for choice in contest.choices
+        ]
+
+        vote_values = DistinctValues()
+        # The parsed value for each vote value code, or None if it couldn't be
+        # parsed
+        parsed_vote_values: list[int | None] = []
+
+        def parse_chunk(
+            rows: list[list[str]],
+        ) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+            # Returns (batch indices, counting groups, votes), or None if the
+            # chunk needs to be parsed one row at a time (which raises the same
+            # errors as the original row-by-row parsing)
+            if any(header not in header_indices for header in metadata_headers):
+                return None
+            get_metadata = operator.itemgetter(
+                *(header_indices[header] for header in metadata_headers)
             )
-            batch_id = column_value(
-                row,
-                "BatchId",
-                cvr_number,
-                header_indices,
-                remove_leading_equal_sign=True,
+            try:
+                metadata = np.array([get_metadata(row) for row in rows], dtype=str)
+                vote_codes = vote_values.encode(rows, choice_columns)
+            except IndexError:
+                return None
+            if (metadata == "").any():
+                return None
+
+            # Parse each distinct vote value once. Leave values that can't be
+            # parsed (or are too big to sum safely) to parse_chunk_one_row_at_a_time.
+            for value in list(vote_values)[len(parsed_vote_values) :]:
+                try:
+                    parsed_vote_value: int | None = parse_vote(value)
+                except ValueError:
+                    parsed_vote_value = None
+                if parsed_vote_value is not None and abs(parsed_vote_value) >= 2**31:
+                    parsed_vote_value = None
+                parsed_vote_values.append(parsed_vote_value)
+            is_unparseable = np.array(
+                [value is None for value in parsed_vote_values], dtype=bool
             )
-            counting_group = column_value(
-                row, "CountingGroup", cvr_number, header_indices
+            if is_unparseable[vote_codes].any():
+                return None
+            votes = np.array(
+                [value or 0 for value in parsed_vote_values], dtype=np.int64
+            )[vote_codes]
+
+            batch_indices = tally.index_batches(
+                metadata[:, 1], metadata[:, 2], remove_leading_equal_sign
             )
-
-            batch_key = (tabulator_number, batch_id)
-
-            ballot_count_by_batch[batch_key] += 1
-            ballot_count_by_group[counting_group] += 1
-            batch_to_counting_group[batch_key] = counting_group
-
-            for contest in contests:
-                contest_choice_votes: dict[str, int] = {
-                    choice.id: parse_vote(
-                        column_value(
-                            row,
-                            (contest.name, choice.name),
-                            cvr_number,
-                            choice_indices,
-                            required=False,
-                            header_readable_string_override=f"{choice.name} for contest {contest.name}",
+            return batch_indices, metadata[:, 3], votes
+
+        def parse_chunk_one_row_at_a_time(
+            first_row_index: int, rows: list[list[str]]
+        ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+            batch_keys = []
+            counting_groups = []
+            votes = []
+            for row_index, row in enumerate(rows, start=first_row_index):
+                cvr_number = column_value(
+                    row,
+                    "CvrNumber",
+                    row_index + 1,
+                    header_indices,
+                    remove_leading_equal_sign=True,
+                )
+                tabulator_number = column_value(
+                    row,
+                    "TabulatorNum",
+                    cvr_number,
+                    header_indices,
+                    remove_leading_equal_sign=True,
+                )
+                batch_id = column_value(
+                    row,
+                    "BatchId",
+                    cvr_number,
+                    header_indices,
+                    remove_leading_equal_sign=True,
+                )
+                counting_group = column_value(
+                    row, "CountingGroup", cvr_number, header_indices
+                )
+                batch_keys.append((tabulator_number, batch_id))
+                counting_groups.append(counting_group)
+                votes.append(
+                    [
+                        parse_vote(
+                            column_value(
+                                row,
+                                (contest.name, choice.name),
+                                cvr_number,
+                                choice_indices,
+                                required=False,
+                                header_readable_string_override=f"{choice.name} for contest {contest.name}",
+                            )
                         )
-                    )
-                    for choice in contest.choices
-                }
+                        for contest in contests
+                        for choice in contest.choices
+                    ]
+                )
 
-                # Skip overvotes
-                if sum(contest_choice_votes.values()) > contest.votes_allowed:
-                    continue
+            batch_indices = np.array(
+                [tally.batch_index(batch_key) for batch_key in batch_keys],
+                dtype=np.intp,
+            )
+            return (
+                batch_indices,
+                np.array(counting_groups, dtype=str),
+                np.array(votes, dtype=np.int64).reshape(len(rows), len(choice_columns)),
+            )
 
-                for choice_id, vote in contest_choice_votes.items():
-                    batch_tallies[batch_key][choice_id] += vote
+        for batch_indices, counting_groups, votes in parse_in_chunks(
+            cvrs, parse_chunk, parse_chunk_one_row_at_a_time
+        ):
+            # Skip overvotes
+            tally.add_ballots(batch_indices, votes, tally.within_votes_allowed(votes))
+
+            groups, group_first_ballots, group_counts = np.unique(
+                counting_groups, return_index=True, return_counts=True
+            )
+            for group_index in np.argsort(group_first_ballots):
+                ballot_count_by_group[str(groups[group_index])] += int(
+                    group_counts[group_index]
+                )
+
+            # Each batch's counting group is the counting group of its last
+            # ballot, but batches are ordered by their first ballot
+            chunk_batches, batch_first_ballots = np.unique(
+                batch_indices, return_index=True
+            )
+            _, batch_last_ballots_reversed = np.unique(
+                batch_indices[::-1], return_index=True
+            )
+            batch_last_ballots = len(batch_indices) - 1 - batch_last_ballots_reversed
+            for batch_index in np.argsort(batch_first_ballots):
+                batch_to_counting_group[
+                    tally.batch_keys[chunk_batches[batch_index]]
+                ] = str(counting_groups[batch_last_ballots[batch_index]])
+
+        ballot_count_by_batch = tally.ballot_count_by_batch()
+        batch_tallies = tally.batch_tallies(include_untallied=False)
 
         election_results: ElectionResults = dict(
             ballot_count_by_batch=dict_to_items_list(ballot_count_by_batch),
@@ -316,10 +782,7 @@ def process_batch_inventory_cvr_file(
             )
 
     def process_ess():
-        ballot_count_by_batch: dict[BatchKey, int] = defaultdict(int)
-        batch_tallies: dict[BatchKey, dict[str, int]] = defaultdict(
-            lambda: defaultdict(int)
-        )
+        tally = BatchInventoryTally(contests)
 
         # ZIP file with multiple CSVs
         if batch_inventory_data.cvr_file.storage_path.endswith(".zip"):
@@ -382,91 +845,135 @@ def process_batch_inventory_cvr_file(
                     f"CVR file is missing contest names: {', '.join(missing_contest_names)}"
                 )
 
-            for row_index, row in enumerate(cvr_csv):
+            contest_columns = [header_indices[contest.name] for contest in contests]
+
+            def parse_chunk(
+                rows: list[list[str]],
+            ) -> tuple[np.ndarray, np.ndarray] | None:
+                # Returns (batch indices, votes), or None if the chunk needs to
+                # be parsed one row at a time (which raises the same errors as
+                # the original row-by-row parsing)
+                if "Cast Vote Record" not in header_indices:
+                    return None
+                cvr_number_column = header_indices["Cast Vote Record"]
+                try:
+                    cvr_numbers = [row[cvr_number_column] for row in rows]
+                    votes = tally.votes_for_choice_names(rows, contest_columns)
+                except (IndexError, UserError):
+                    return None
+                batches = [
+                    cvr_number_to_batch.get(cvr_number) for cvr_number in cvr_numbers
+                ]
+                if "" in cvr_numbers or None in batches:
+                    return None
+                batch_indices = tally.index_batches(
+                    np.full(len(rows), ""), np.array(batches, dtype=str)
+                )
+                return batch_indices, votes
+
+            def row_batch_key(_ballot: int, row: list[str], row_number: int):
                 cvr_number = column_value(
                     row,
                     "Cast Vote Record",
-                    row_index + 1,
+                    row_number,
                     header_indices,
                     required=True,
                 )
-
                 if cvr_number not in cvr_number_to_batch:
                     raise UserError(
                         f"Unable to find batch for CVR number {cvr_number} in ballots files"
                     )
-                batch = cvr_number_to_batch[cvr_number]
-                batch_key: BatchKey = ("", batch)
-                ballot_count_by_batch[batch_key] += 1
+                return ("", cvr_number_to_batch[cvr_number])
 
-                for contest in contests:
-                    choice_name = column_value(
-                        row,
-                        contest.name,
-                        row_index + 1,
-                        header_indices,
-                        required=False,
-                    )
-                    choice_id = validate_choice_name_and_get_choice_id(
-                        contest, choice_name
-                    )
+            def parse_chunk_one_row_at_a_time(
+                first_row_index: int, rows: list[list[str]]
+            ) -> tuple[np.ndarray, np.ndarray]:
+                return tally.votes_for_choice_names_one_row_at_a_time(
+                    first_row_index, rows, header_indices, row_batch_key
+                )
 
-                    if choice_id:
-                        batch_tallies[batch_key][choice_id] += 1
+            for batch_indices, votes in parse_in_chunks(
+                cvr_csv, parse_chunk, parse_chunk_one_row_at_a_time
+            ):
+                tally.add_ballots(batch_indices, votes, votes > 0)
 
         # Single CSV file
         else:
             cvrs = csv_reader_for_cvr(cvr_file)
             headers = next(cvrs)
             header_indices = get_header_indices(headers)
-            for row_index, row in enumerate(cvrs):
-                for contest in contests:
-                    batch_col = column_value(
-                        row,
-                        "Batch",
-                        row_index + 1,
-                        header_indices,
-                        required=False,
-                    )
-                    batch_name_col = column_value(
-                        row,
-                        "Batch Name",
-                        row_index + 1,
-                        header_indices,
-                        required=False,
-                    )
-                    batch = batch_col if batch_col is not None else batch_name_col
-                    if batch is None:
-                        raise UserError(
-                            "Missing Batch and Batch Name columns from CSV, at least one must be defined."
-                        )
-                    choice_name = column_value(
-                        row,
-                        contest.name,
-                        row_index + 1,
-                        header_indices,
-                        required=False,
-                    )
+            batch_column = header_indices.get("Batch", header_indices.get("Batch Name"))
+            contest_columns = [
+                header_indices[contest.name]
+                for contest in contests
+                if contest.name in header_indices
+            ]
 
-                    batch_key: BatchKey = ("", batch)
-                    choice_id = validate_choice_name_and_get_choice_id(
-                        contest, choice_name
+            def parse_single_file_chunk(
+                rows: list[list[str]],
+            ) -> tuple[np.ndarray, np.ndarray] | None:
+                # Returns (batch indices, votes), or None if the chunk needs to
+                # be parsed one row at a time (which raises the same errors as
+                # the original row-by-row parsing)
+                if batch_column is None or len(contest_columns) != len(contests):
+                    return None
+                try:
+                    batches = [row[batch_column] for row in rows]
+                    votes = tally.votes_for_choice_names(rows, contest_columns)
+                except (IndexError, UserError):
+                    return None
+                batch_indices = tally.index_batches(
+                    np.full(len(rows), ""), np.array(batches, dtype=str)
+                )
+                return batch_indices, votes
+
+            def single_file_row_batch_key(
+                _ballot: int, row: list[str], row_number: int
+            ):
+                batch_col = column_value(
+                    row,
+                    "Batch",
+                    row_number,
+                    header_indices,
+                    required=False,
+                )
+                batch_name_col = column_value(
+                    row,
+                    "Batch Name",
+                    row_number,
+                    header_indices,
+                    required=False,
+                )
+                batch = batch_col if batch_col is not None else batch_name_col
+                if batch is None:
+                    raise UserError(
+                        "Missing Batch and Batch Name columns from CSV, at least one must be defined."
                     )
+                return ("", batch)
+
+            def parse_single_file_chunk_one_row_at_a_time(
+                first_row_index: int, rows: list[list[str]]
+            ) -> tuple[np.ndarray, np.ndarray]:
+                return tally.votes_for_choice_names_one_row_at_a_time(
+                    first_row_index, rows, header_indices, single_file_row_batch_key
+                )
+
+            # Rows are only tallied per contest, so if there are no contests,
+            # there's nothing to tally
+            for batch_indices, votes in parse_in_chunks(
+                cvrs if contests else [],
+                parse_single_file_chunk,
+                parse_single_file_chunk_one_row_at_a_time,
+            ):
+                # Each row is counted once per contest
+                tally.add_ballots(
+                    batch_indices, votes, votes > 0, ballot_count=len(contests)
+                )
 
-                    ballot_count_by_batch[batch_key] += 1
-                    if choice_id:
-                        batch_tallies[batch_key][choice_id] += 1
-
-        # Set explicit zeros for choices with zero votes in a batch to avoid KeyErrors when
-        # generating files
-        for batch_key in ballot_count_by_batch.keys():
-            if batch_key not in batch_tallies:
-                batch_tallies[batch_key] = defaultdict(int)
-        for tallies in batch_tallies.values():
-            for contest in contests:
-                for choice in contest.choices:
-                    if choice.id not in tallies:
-                        tallies[choice.id] = 0
+        # Include explicit zeros for choices with zero votes in a batch to avoid
+        # KeyErrors when generating files
+        ballot_count_by_batch = tally.ballot_count_by_batch()
+        batch_tallies = tally.batch_tallies(include_untallied=True)
 
         election_results: ElectionResults = dict(
             ballot_count_by_batch=dict_to_items_list(ballot_count_by_batch),
@@ -490,11 +997,7 @@ def process_batch_inventory_cvr_file(
         Each file is expected to contain the same rows as all the files above it in the same
         order, with zero or more rows added compared to the previous file.
         """
-        ballot_count_by_batch: dict[BatchKey, int] = defaultdict(int)
-        batch_to_counting_group: dict[BatchKey, str] = {}
-        batch_tallies: dict[BatchKey, dict[str, int]] = defaultdict(
-            lambda: defaultdict(int)
-        )
+        tally = BatchInventoryTally(contests)
 
         expected_files = ["EV.csv", "ED.csv", "MIB1.csv", "MIB2.csv", "Prov.csv"]
 
@@ -539,39 +1042,72 @@ def process_batch_inventory_cvr_file(
                 f"CVR file is missing contest names: {', '.join(missing_contest_names)}"
             )
 
-        for row_index, (source_file_name, row) in enumerate(cvr_csv):
-            source_file_path = Path(source_file_name)
-            source_name = source_file_path.stem
-            batch = column_value(
-                row, "Precinct", row_index + 1, header_indices, required=True
+        contest_columns = [header_indices[contest.name] for contest in contests]
+        source_names: dict[str, str] = {}
+
+        def source_name(source_file_name: str) -> str:
+            if source_file_name not in source_names:
+                source_names[source_file_name] = Path(source_file_name).stem
+            return source_names[source_file_name]
+
+        def parse_chunk(
+            chunk: list[tuple[str, list[str]]],
+        ) -> tuple[np.ndarray, np.ndarray] | None:
+            # Returns (batch indices, votes), or None if the chunk needs to be
+            # parsed one row at a time (which raises the same errors as the
+            # original row-by-row parsing)
+            source_file_names = [source_file_name for source_file_name, _ in chunk]
+            rows = [row for _, row in chunk]
+            if "Precinct" not in header_indices:
+                return None
+            precinct_column = header_indices["Precinct"]
+            try:
+                batches = [row[precinct_column] for row in rows]
+                votes = tally.votes_for_choice_names(rows, contest_columns)
+            except (IndexError, UserError):
+                return None
+            if "" in batches:
+                return None
+            batch_indices = tally.index_batches(
+                np.array(
+                    [source_name(file_name) for file_name in source_file_names],
+                    dtype=str,
+                ),
+                np.array(batches, dtype=str),
             )
-            batch_key: BatchKey = (source_name, batch)
-            ballot_count_by_batch[batch_key] += 1
-            batch_to_counting_group.setdefault(batch_key, source_name)
-
-            for contest in contests:
-                choice_name = column_value(
-                    row,
-                    contest.name,
-                    row_index + 1,
-                    header_indices,
-                    required=False,
+            return batch_indices, votes
+
+        def parse_chunk_one_row_at_a_time(
+            first_row_index: int, chunk: list[tuple[str, list[str]]]
+        ) -> tuple[np.ndarray, np.ndarray]:
+            def row_batch_key(ballot: int, row: list[str], row_number: int):
+                batch = column_value(
+                    row, "Precinct", row_number, header_indices, required=True
                 )
-                choice_id = validate_choice_name_and_get_choice_id(contest, choice_name)
-
-                if choice_id:
-                    batch_tallies[batch_key][choice_id] += 1
-
-        # Set explicit zeros for choices with zero votes in a batch to avoid KeyErrors when
-        # generating files and to make sure every batch is included even if it has no votes for the contest(s)
-        for batch_key in ballot_count_by_batch.keys():
-            if batch_key not in batch_tallies:
-                batch_tallies[batch_key] = defaultdict(int)
-        for tallies in batch_tallies.values():
-            for contest in contests:
-                for choice in contest.choices:
-                    if choice.id not in tallies:
-                        tallies[choice.id] = 0
+                source_file_name, _ = chunk[ballot]
+                return (source_name(source_file_name), batch)
+
+            return tally.votes_for_choice_names_one_row_at_a_time(
+                first_row_index,
+                [row for _, row in chunk],
+                header_indices,
+                row_batch_key,
+            )
+
+        for batch_indices, votes in parse_in_chunks(
+            cvr_csv, parse_chunk, parse_chunk_one_row_at_a_time
+        ):
+            tally.add_ballots(batch_indices, votes, votes > 0)
+
+        # Include explicit zeros for choices with zero votes in a batch to avoid
+        # KeyErrors when generating files and to make sure every batch is
+        # included even if it has no votes for the contest(s)
+        ballot_count_by_batch = tally.ballot_count_by_batch()
+        batch_tallies = tally.batch_tallies(include_untallied=True)
+        # Each batch's counting group is the snapshot file it first appeared in
+        batch_to_counting_group = {
+            batch_key: batch_key[0] for batch_key in tally.batch_keys
+        }
 
         election_results: ElectionResults = dict(
             ballot_count_by_batch=dict_to_items_list(ballot_count_by_batch),
@@ -582,68 +1118,80 @@ def process_batch_inventory_cvr_file(
         batch_inventory_data.election_results = election_results
 
     def process_hart():
-        ballot_count_by_batch: dict[BatchKey, int] = defaultdict(int)
-        batch_tallies: dict[BatchKey, dict[str, int]] = defaultdict(
-            lambda: defaultdict(int)
-        )
-
-        # cvr_file is a ZIP file with multiple XMLs
-        zip_entry_names = unzip_files(cvr_file, working_directory)
-        cvr_file_names = [
-            entry_name
-            for entry_name in zip_entry_names
-            if entry_name.lower().endswith(".xml")
-        ]
-        cvr_file.close()
-
-        for cvr_file_name in cvr_file_names:
-            cvr_xml = parse_xml(os.path.join(working_directory, cvr_file_name))
-            batch_number = find_text_xml(cvr_xml, "BatchNumber")
-            precinct_name = find_text_xml(find_xml(cvr_xml, "PrecinctSplit"), "Name")
-            batch_key_value = (
-                batch_number if batch_number is not None else precinct_name
-            )
-            if batch_key_value is None:
-                raise UserError(
-                    "Could not find batch number or precinct name in CVR file."
-                )
-            batch_key: BatchKey = (
-                "",
-                batch_key_value,
-            )  # Tabulator ID is not present in Hart CVRs
+        tally = BatchInventoryTally(contests)
+
+        contest_names = [collapse_whitespace(contest.name) for contest in contests]
+
+        # cvr_file is a ZIP file with multiple XMLs. Rather than extracting
+        # them, we stream each one straight out of the ZIP, parsing and
+        # tallying one chunk of CVRs at a time.
+        with ZipFile(cvr_file, "r") as cvr_zip_archive:
+            cvr_file_names = [
+                entry_name
+                for entry_name in cvr_zip_archive.namelist()
+                # ZIP files created on Macs include a hidden __MACOSX folder
+                if not entry_name.startswith("__")
+                and not entry_name.startswith(".")
+                and entry_name.lower().endswith(".xml")
+            ]
 
-            ballot_count_by_batch[batch_key] += 1
-            contest_results = {
-                collapse_whitespace(contest_name): choice_names
-                for contest_name, choice_names in parse_contest_results(cvr_xml).items()
-            }
-            for contest in contests:
-                choices = contest_results.get(collapse_whitespace(contest.name), set())
-                validated_choice_ids = []
-                for choice_name in choices:
-                    validated_choice_id = validate_choice_name_and_get_choice_id(
-                        contest, choice_name
+            # Check each CVR's batch as soon as it's parsed, so a missing batch
+            # number is reported before any errors in later files.
+            def parse_hart_cvrs() -> Iterator[tuple[BatchKey, HartCvr]]:
+                for cvr_file_name in cvr_file_names:
+                    with cvr_zip_archive.open(cvr_file_name) as cvr_xml_file:
+                        hart_cvr = parse_hart_cvr(
+                            cvr_xml_file, require_batch_fields=False
+                        )
+                    batch_key_value = (
+                        hart_cvr.batch_number
+                        if hart_cvr.batch_number is not None
+                        else hart_cvr.precinct_name
                     )
-                    if validated_choice_id:
-                        validated_choice_ids.append(validated_choice_id)
-
+                    if batch_key_value is None:
+                        raise UserError(
+                            "Could not find batch number or precinct name in CVR file."
+                        )
+                    batch_key: BatchKey = (
+                        "",
+                        batch_key_value,
+                    )  # Tabulator ID is not present in Hart CVRs
+                    yield batch_key, hart_cvr
+
+            for chunk in chunked(parse_hart_cvrs(), BATCH_INVENTORY_CHUNK_SIZE):
+                batch_indices = []
+                voted_ballots = []
+                voted_choices = []
+                for ballot, (batch_key, hart_cvr) in enumerate(chunk):
+                    batch_indices.append(tally.batch_index(batch_key))
+
+                    contest_results = {
+                        collapse_whitespace(contest_name): choice_names
+                        for contest_name, choice_names in hart_cvr.contest_results.items()
+                    }
+                    for contest_index, contest_name in enumerate(contest_names):
+                        for choice_name in contest_results.get(contest_name, set()):
+                            choice = tally.choice_index(contest_index, choice_name)
+                            if choice is not None:
+                                voted_ballots.append(ballot)
+                                voted_choices.append(choice)
+
+                votes = tally.votes_for_choices(
+                    len(chunk), voted_ballots, voted_choices
+                )
                 # Skip overvotes
-                if len(validated_choice_ids) > contest.votes_allowed:
-                    continue
-
-                for choice_id in validated_choice_ids:
-                    batch_tallies[batch_key][choice_id] += 1
-
-        # Set explicit zeros for choices with zero votes in a batch to avoid KeyErrors when
-        # generating files and to make sure every batch is included even if it has no votes for the contest(s)
-        for batch_key in ballot_count_by_batch.keys():
-            if batch_key not in batch_tallies:
-                batch_tallies[batch_key] = defaultdict(int)
-        for tallies in batch_tallies.values():
-            for contest in contests:
-                for choice in contest.choices:
-                    if choice.id not in tallies:
-                        tallies[choice.id] = 0
+                tally.add_ballots(
+                    np.array(batch_indices, dtype=np.intp),
+                    votes,
+                    (votes > 0) & tally.within_votes_allowed(votes),
+                )
+        cvr_file.close()
+
+        # Include explicit zeros for choices with zero votes in a batch to avoid
+        # KeyErrors when generating files and to make sure every batch is
+        # included even if it has no votes for the contest(s)
+        ballot_count_by_batch = tally.ballot_count_by_batch()
+        batch_tallies = tally.batch_tallies(include_untallied=True)
 
         election_results: ElectionResults = dict(
             ballot_count_by_batch=dict_to_items_list(ballot_count_by_batch),
@@ -13,6 +13,7 @@ from ..models import *
 from ..auth import restrict_access, UserType, get_loggedin_user, get_support_user
 from ..worker.tasks import (
     UserError,
+    TaskPriority,
     background_task,
     create_background_task,
 )
@@ -67,7 +68,7 @@ def construct_contest_choice_csv_headers(
     return contest_choice_csv_headers
 
 
-@background_task
+@background_task(priority=TaskPriority.BULK)
 def process_batch_tallies_file(
     election_id: str,
     jurisdiction_id: str,
@@ -76,23 +77,68 @@ def process_batch_tallies_file(
 ):
     jurisdiction: Jurisdiction = Jurisdiction.query.get(jurisdiction_id)
 
-    def process_batch_tallies_for_contest(
-        contest: Contest,
-        # { (contest_id, choice_id): csv_header }
-        contest_choice_csv_headers: dict[tuple[str, str], str],
-    ):
+    def process() -> None:
+        contests = list(jurisdiction.contests)
+        if len(contests) == 0:
+            jurisdiction.batch_tallies = {}
+            return
+
+        contest_choice_csv_headers = construct_contest_choice_csv_headers(
+            jurisdiction.election, jurisdiction
+        )
         columns = [CSVColumnType(BATCH_NAME, CSVValueType.TEXT, unique=True)] + [
             CSVColumnType(contest_choice_csv_header, CSVValueType.NUMBER)
             for contest_choice_csv_header in contest_choice_csv_headers.values()
         ]
+        contest_choice_headers = {
+            contest.id: [
+                (choice.id, contest_choice_csv_headers[(contest.id, choice.id)])
+                for choice in contest.choices
+            ]
+            for contest in contests
+        }
+        num_ballots_by_batch = {
+            batch.name: batch.num_ballots for batch in jurisdiction.batches
+        }
+
+        # Save the tallies as a JSON blob in the format needed by the audit_math.macro module
+        # { batch_name: { contest_id: { choice_id: vote_count } } }
+        batch_tallies: dict[str, dict[str, dict[str, int]]] = {}
+        # The first row (if any) in which each contest's total votes exceed the
+        # allowed votes: (batch_name, total_tallies)
+        over_allowed_tallies: dict[str, tuple[str, int]] = {}
 
+        # Read the file once and validate every contest's columns in the same
+        # pass, rather than re-parsing the file for each contest
         batch_tallies_file = retrieve_file(jurisdiction.batch_tallies_file)
-        batch_tallies_csv = list(parse_csv(batch_tallies_file, columns))
+        for row in parse_csv(batch_tallies_file, columns):
+            batch_name = row[BATCH_NAME]
+            num_ballots = num_ballots_by_batch.get(batch_name)
+            batch_tallies[batch_name] = {}
+            for contest in contests:
+                choice_votes = {
+                    choice_id: row[csv_header]
+                    for choice_id, csv_header in contest_choice_headers[contest.id]
+                }
+                # Batches that aren't in the manifest are reported below
+                if num_ballots is None:
+                    continue
+                assert contest.votes_allowed is not None
+                total_tallies = sum(int(votes) for votes in choice_votes.values())
+                if (
+                    total_tallies > num_ballots * contest.votes_allowed
+                    and contest.id not in over_allowed_tallies
+                ):
+                    over_allowed_tallies[contest.id] = (batch_name, total_tallies)
+                batch_tallies[batch_name][contest.id] = {
+                    "ballots": num_ballots,
+                    **choice_votes,
+                }
         batch_tallies_file.close()
 
         # Validate that the batch names match the ballot manifest
-        jurisdiction_batch_names = {batch.name for batch in jurisdiction.batches}
-        tally_batch_names = {row[BATCH_NAME] for row in batch_tallies_csv}
+        jurisdiction_batch_names = set(num_ballots_by_batch.keys())
+        tally_batch_names = set(batch_tallies.keys())
         extra_batch_names = sorted(tally_batch_names - jurisdiction_batch_names)
         missing_batch_names = sorted(jurisdiction_batch_names - tally_batch_names)
         if extra_batch_names or missing_batch_names:
@@ -113,56 +159,23 @@ def process_batch_tallies_file(
             )
 
         # Validate that the sum tallies for each batch don't exceed the allowed votes
-        num_ballots_by_batch = {
-            batch.name: batch.num_ballots for batch in jurisdiction.batches
-        }
-        assert contest.votes_allowed is not None
-        for row in batch_tallies_csv:
-            allowed_tallies = (
-                num_ballots_by_batch[row[BATCH_NAME]] * contest.votes_allowed
-            )
-            total_tallies = sum(
-                int(row[contest_choice_csv_headers[(contest.id, choice.id)]])
-                for choice in contest.choices
-            )
-            if total_tallies > allowed_tallies:
+        for contest in contests:
+            if contest.id in over_allowed_tallies:
+                batch_name, total_tallies = over_allowed_tallies[contest.id]
+                assert contest.votes_allowed is not None
+                allowed_tallies = (
+                    num_ballots_by_batch[batch_name] * contest.votes_allowed
+                )
                 raise UserError(
-                    f'The total votes for contest "{contest.name}" in batch "{row[BATCH_NAME]}" '
+                    f'The total votes for contest "{contest.name}" in batch "{batch_name}" '
                     f"({format_count(total_tallies, 'vote', 'votes')}) "
                     f"cannot exceed {allowed_tallies} - "
                     f"the number of ballots from the manifest "
-                    f"({format_count(num_ballots_by_batch[row[BATCH_NAME]], 'ballot', 'ballots')}) "
+                    f"({format_count(num_ballots_by_batch[batch_name], 'ballot', 'ballots')}) "
                     f"multiplied by the number of votes allowed for the contest "
                     f"({format_count(contest.votes_allowed, 'vote', 'votes')} per ballot)."
                 )
 
-        return {
-            row[BATCH_NAME]: {
-                "ballots": num_ballots_by_batch[row[BATCH_NAME]],
-                **{
-                    choice.id: row[contest_choice_csv_headers[(contest.id, choice.id)]]
-                    for choice in contest.choices
-                },
-            }
-            for row in batch_tallies_csv
-        }
-
-    def process() -> None:
-        contests = list(jurisdiction.contests)
-        contest_choice_csv_headers = construct_contest_choice_csv_headers(
-            jurisdiction.election, jurisdiction
-        )
-
-        # Save the tallies as a JSON blob in the format needed by the audit_math.macro module
-        # { batch_name: { contest_id: { choice_id: vote_count } } }
-        batch_tallies: dict[str, dict[str, dict[str, int]]] = defaultdict(dict)
-        for contest in contests:
-            batch_tallies_for_contest = process_batch_tallies_for_contest(
-                contest, contest_choice_csv_headers
-            )
-            for batch_name, batch_votes in batch_tallies_for_contest.items():
-                batch_tallies[batch_name][contest.id] = batch_votes
-
         jurisdiction.batch_tallies = batch_tallies
 
     error = None
@@ -2,19 +2,23 @@ from math import floor
 import uuid
 import tempfile
 import csv
-from defusedxml.ElementTree import parse as parse_xml
+import heapq
+import numpy as np
 import itertools
 import os
+import pickle
 import shutil
-from xml.etree.ElementTree import ElementTree
 import typing
+from zipfile import ZipFile
 from typing import (
     IO,
     BinaryIO,
+    Callable,
     Iterable,
     Iterator,
     TextIO,
     TypeVar,
+    NamedTuple,
     TypedDict,
     cast as typing_cast,
     Generator,
@@ -26,20 +30,23 @@ import ast
 from datetime import datetime
 from flask import request, jsonify, Request, session
 from werkzeug.exceptions import BadRequest, NotFound, Conflict
-from sqlalchemy import func, and_
 from sqlalchemy.orm import Session
 
 
 from . import api
+from .. import config
 from ..database import db_session, engine as db_engine
 from ..models import *
 from . import contests
 from ..auth import restrict_access, UserType, get_loggedin_user, get_support_user
 from ..worker.tasks import (
     UserError,
+    TaskPriority,
     background_task,
     create_background_task,
 )
+from ..util.copy_stream import copy_rows
+from ..util.cvr_interpretations import pack_interpretations_chunk
 from ..util.file import (
     any_jurisdiction_file_is_processing,
     get_file_upload_url,
@@ -59,12 +66,14 @@ from ..util.csv_parse import (
     column_value,
     decode_csv,
     get_header_indices,
+    read_csv,
     reject_no_rows,
     validate_comma_delimited,
     validate_not_empty,
 )
-from ..util.collections import find_first_duplicate
-from ..util.hart_parse import find_xml, parse_contest_results
+from ..util.collections import chunked, find_first_duplicate
+from ..util.hart_parse import HartCvr, parse_hart_cvr
+from ..util.process_pool import fork_process_pool
 from ..util.string import comma_join_until_limit
 from ..audit_math.suite import HybridPair
 from ..activity_log.activity_log import UploadFile, activity_base, record_activity
@@ -75,11 +84,6 @@ T = TypeVar("T")
 CVRS_FILE_NAME_PREFIX = "cvrs"
 
 
-def peek(iterator: Iterator[T]) -> tuple[T, Iterator[T]]:
-    first = next(iterator)
-    return first, itertools.chain([first], iterator)
-
-
 class CvrChoiceMetadata(TypedDict):
     num_votes: int
     column: int
@@ -202,6 +206,21 @@ def cvr_contests_metadata(
     return standardized_metadata
 
 
+# The inverse of the contest name standardization applied in
+# cvr_contests_metadata: maps an AA-provided contest name back to the contest
+# name used in the jurisdiction's CVR file (e.g. for looking up rows in
+# CvrBatchContestBallots, which are keyed by CVR contest name).
+def cvr_contest_name(jurisdiction: Jurisdiction, contest_name: str) -> str:
+    contest_name_standardizations = (
+        typing_cast(
+            dict[str, str | None] | None,
+            jurisdiction.contest_name_standardizations,
+        )
+        or {}
+    )
+    return contest_name_standardizations.get(contest_name) or contest_name
+
+
 def set_total_ballots_from_cvrs(contest: Contest):
     if not are_uploaded_cvrs_valid(contest) or len(list(contest.jurisdictions)) == 0:
         return
@@ -275,10 +294,7 @@ def hybrid_contest_choice_vote_counts(
 
 
 def csv_reader_for_cvr(cvr_file: BinaryIO) -> CSVIterator:
-    validate_not_empty(cvr_file)
-    text_file = decode_csv(cvr_file)
-    validate_comma_delimited(text_file)
-    return csv.reader(text_file, delimiter=",")
+    return read_csv(cvr_file)
 
 
 def parse_clearballot_cvrs(
@@ -624,6 +640,181 @@ def read_ess_ballots_file(
     return (headers, rows)
 
 
+class EssBallot(NamedTuple):
+    cvr_number: str
+    tabulator_number: str | None
+    batch_name: str
+    record_id: int
+    imprinted_id: str
+
+
+TEN_DIGIT_TABULATOR_CVR_REGEX = re.compile(r"^(\d{4})(\d{6})$")
+
+
+def parse_ess_ballots_file(ballots_file: TextIO) -> list[EssBallot]:
+    """
+    Parses the ballot metadata from an ES&S ballots file, sorted by CVR number.
+    """
+    headers, rows = read_ess_ballots_file(ballots_file)
+
+    header_indices = get_header_indices(headers)
+
+    # The rows may not be in order, but we need them sorted in order to
+    # merge the files. For now, sort them in memory, though we may need to
+    # change this if it becomes a memory bottleneck.
+    sorted_ballot_rows = (
+        row
+        for _, row in sorted(
+            enumerate(rows),
+            key=lambda index_and_row: int(
+                column_value(
+                    index_and_row[1],
+                    "Cast Vote Record",
+                    index_and_row[0] + 1,
+                    header_indices,
+                )
+            ),
+        )
+    )
+
+    ballots = []
+    for row_index, row in enumerate(sorted_ballot_rows):
+        cvr_number = column_value(
+            row, "Cast Vote Record", row_index + 1, header_indices
+        )
+        batch_name = column_value(row, "Batch", cvr_number, header_indices)
+
+        # Tabulator CVR is either a 10-digit string or a 16-character hex ID.
+        #
+        # When it's a 10-digit string, the first four digits are a tabulator ID, and the last
+        # six are the ballot number (record ID) within the batch. We use the full value as an
+        # imprinted ID even though it's not imprinted on the ballots.
+        #
+        # When it's a 16-character hex ID, it's actually imprinted on the ballots. We construct
+        # a ballot number (record ID) from the hex ID even though we don't know if it
+        # corresponds to ballot order.
+        #
+        # When the ballots file has a Machine column, we use that as a tabulator ID. Otherwise,
+        # we have to use the Tabulator CVR column for this purpose, and all Tabulator CVR
+        # values have to be 10-digit strings.
+        #
+        tabulator_cvr = column_value(row, "Tabulator CVR", cvr_number, header_indices)
+        tabulator_number = None
+        record_id = None
+        imprinted_id = tabulator_cvr
+        if "Machine" in headers:
+            tabulator_number = column_value(row, "Machine", cvr_number, header_indices)
+            match = TEN_DIGIT_TABULATOR_CVR_REGEX.match(tabulator_cvr)
+            if match:
+                _, ballot_number = match.groups()
+                record_id = int(ballot_number)
+            else:
+                # Convert 16-character hex to a small-ish int that fits in
+                # the db. Based on the data we've seen, this creates a large
+                # enough gap between ids to order them without creating any
+                # duplicates.
+                try:
+                    record_id = floor(int(tabulator_cvr, 16) / 10**10)
+                except ValueError:
+                    raise UserError(
+                        "Tabulator CVR should be a ten-digit number or a sixteen-character hexadecimal string."
+                        f" Got {tabulator_cvr} for Cast Vote Record {cvr_number}."
+                        " If you opened this file in Excel, it may have changed the format of this field."
+                    )
+        else:
+            match = TEN_DIGIT_TABULATOR_CVR_REGEX.match(tabulator_cvr)
+            if not match:
+                raise UserError(
+                    "Tabulator CVR should be a ten-digit number if there is no Machine column."
+                    f" Got {tabulator_cvr} for Cast Vote Record {cvr_number}."
+                    " Make sure any leading zeros have not been stripped from this field."
+                )
+            tabulator_number, ballot_number = match.groups()
+            record_id = int(ballot_number)
+
+        ballots.append(
+            EssBallot(
+                cvr_number=cvr_number,
+                tabulator_number=tabulator_number,
+                batch_name=batch_name,
+                record_id=record_id,
+                imprinted_id=imprinted_id,
+            )
+        )
+
+    return ballots
+
+
+def parse_ess_ballots_file_at_path(
+    ballots_file_path: str, encoding: str
+) -> list[EssBallot]:
+    # Runs in a separate process, so we reopen the file by path rather than
+    # sharing a file object. The parent already detected the file's encoding
+    # in separate_ess_cvr_and_ballots_files, so we reuse it rather than
+    # decoding the file again.
+    with open(
+        ballots_file_path, encoding=encoding, errors="replace", newline=None
+    ) as ballots_file:
+        return parse_ess_ballots_file(ballots_file)
+
+
+# How many CVR rows to sort in memory at a time when the ES&S CVR file isn't
+# sorted by CVR number
+ESS_CVR_SORT_RUN_SIZE = 100_000
+# How many rows to pickle at a time when spilling a sorted run to disk
+ESS_CVR_SORT_SPILL_CHUNK_SIZE = 1000
+
+
+def sort_by_cvr_number(
+    rows: Iterable[tuple[str, T]], run_size: int = ESS_CVR_SORT_RUN_SIZE
+) -> Iterator[tuple[str, T]]:
+    """
+    Sorts (CVR number, value) rows by CVR number without holding them all in
+    memory: each run of run_size rows is sorted and spilled to a tempfile, and
+    then the sorted runs are merged. Like sorted, the sort is stable.
+    """
+
+    def cvr_number_key(row: tuple[str, T]) -> int:
+        return int(row[0])
+
+    run_files: list[IO[bytes]] = []
+
+    def read_run_file(run_file: IO[bytes]) -> Iterator[tuple[str, T]]:
+        run_file.seek(0)
+        while True:
+            try:
+                chunk = pickle.load(run_file)
+            except EOFError:
+                return
+            yield from chunk
+
+    try:
+        run: list[tuple[str, T]] = []
+        for row in rows:
+            run.append(row)
+            if len(run) >= run_size:
+                run.sort(key=cvr_number_key)
+                run_file = tempfile.TemporaryFile()
+                run_files.append(run_file)
+                for start in range(0, len(run), ESS_CVR_SORT_SPILL_CHUNK_SIZE):
+                    pickle.dump(
+                        run[start : start + ESS_CVR_SORT_SPILL_CHUNK_SIZE], run_file
+                    )
+                run = []
+        run.sort(key=cvr_number_key)
+
+        # heapq.merge prefers earlier iterables when keys are equal, so passing
+        # the runs in order keeps the sort stable
+        yield from heapq.merge(
+            *(read_run_file(run_file) for run_file in run_files),
+            run,
+            key=cvr_number_key,
+        )
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
 def parse_ess_cvrs(
     jurisdiction: Jurisdiction,
     working_directory: str,
@@ -638,14 +829,18 @@ def parse_ess_cvrs(
     # Here's a rough outline of the process:
     # 1. Unzip and decode the files
     # 2. Detect and sort out which files are ballot metadata and which is the CVR data
-    # 3. For each ballot file, parse the metadata into CVRBallot objects (w/o interpretations)
+    # 3. For each ballot file, parse the ballot metadata, sorted by CVR number.
+    #    Each file is parsed in a separate process, in parallel with step 4.
     # 4. For the CVR file, make two passes:
     #   - First, parse out the contest and choice names. We have to do this in
     #     a separate pass since our storage scheme for interpretations requires
     #     knowing all of the contest and choice names up front, and the ES&S
-    #     format doesn't tell you that - you have to look at every row.
-    #   - Second, parse out the interpretations.
-    # 5. Concatenate the parsed CVRBallot lists and join that to the parsed interpretation
+    #     format doesn't tell you that - you have to look at every row. We also
+    #     check whether the rows are sorted by CVR number.
+    #   - Second, parse out the interpretations. If the rows weren't sorted,
+    #     sort them, spilling sorted runs to disk.
+    # 5. Merge the sorted ballots files by CVR number and join that to the
+    #    parsed interpretations
 
     zip_file = retrieve_file_to_buffer(jurisdiction.cvr_file, working_directory)
     file_names = unzip_files(zip_file, working_directory)
@@ -664,131 +859,43 @@ def parse_ess_cvrs(
         (batch.tabulator, batch.name): batch for batch in jurisdiction.batches
     }
 
-    def parse_ballots_file(
-        ballots_file: TextIO,
-    ) -> Iterator[tuple[str, CvrBallot]]:  # (CVR number, ballot)
-        headers, rows = read_ess_ballots_file(ballots_file)
-
-        header_indices = get_header_indices(headers)
-
-        # The rows may not be in order, but we need them sorted in order to
-        # concatenate and merge the files. For now, sort them in memory, though
-        # we may need to change this if it becomes a memory bottleneck.
-        sorted_ballot_rows = (
-            row
-            for _, row in sorted(
-                enumerate(rows),
-                key=lambda index_and_row: int(
-                    column_value(
-                        index_and_row[1],
-                        "Cast Vote Record",
-                        index_and_row[0] + 1,
-                        header_indices,
-                    )
-                ),
+    def cvr_ballot_for_ess_ballot(ballot: EssBallot) -> CvrBallot:
+        db_batch = batches_by_key.get((ballot.tabulator_number, ballot.batch_name))
+        if db_batch:
+            return CvrBallot(
+                batch=db_batch,
+                record_id=ballot.record_id,
+                imprinted_id=ballot.imprinted_id,
             )
+        close_matches = difflib.get_close_matches(
+            str((ballot.tabulator_number, ballot.batch_name)),
+            (str(batch_key) for batch_key in batches_by_key),
+            n=1,
         )
-
-        ten_digit_tabulator_cvr_regex = re.compile(r"^(\d{4})(\d{6})$")
-
-        for row_index, row in enumerate(sorted_ballot_rows):
-            cvr_number = column_value(
-                row, "Cast Vote Record", row_index + 1, header_indices
-            )
-            batch_name = column_value(row, "Batch", cvr_number, header_indices)
-
-            # Tabulator CVR is either a 10-digit string or a 16-character hex ID.
-            #
-            # When it's a 10-digit string, the first four digits are a tabulator ID, and the last
-            # six are the ballot number (record ID) within the batch. We use the full value as an
-            # imprinted ID even though it's not imprinted on the ballots.
-            #
-            # When it's a 16-character hex ID, it's actually imprinted on the ballots. We construct
-            # a ballot number (record ID) from the hex ID even though we don't know if it
-            # corresponds to ballot order.
-            #
-            # When the ballots file has a Machine column, we use that as a tabulator ID. Otherwise,
-            # we have to use the Tabulator CVR column for this purpose, and all Tabulator CVR
-            # values have to be 10-digit strings.
-            #
-            tabulator_cvr = column_value(
-                row, "Tabulator CVR", cvr_number, header_indices
-            )
-            tabulator_number = None
-            record_id = None
-            imprinted_id = tabulator_cvr
-            if "Machine" in headers:
-                tabulator_number = column_value(
-                    row, "Machine", cvr_number, header_indices
-                )
-                match = ten_digit_tabulator_cvr_regex.match(tabulator_cvr)
-                if match:
-                    _, ballot_number = match.groups()
-                    record_id = int(ballot_number)
-                else:
-                    # Convert 16-character hex to a small-ish int that fits in
-                    # the db. Based on the data we've seen, this creates a large
-                    # enough gap between ids to order them without creating any
-                    # duplicates.
-                    try:
-                        record_id = floor(int(tabulator_cvr, 16) / 10**10)
-                    except ValueError:
-                        raise UserError(
-                            "Tabulator CVR should be a ten-digit number or a sixteen-character hexadecimal string."
-                            f" Got {tabulator_cvr} for Cast Vote Record {cvr_number}."
-                            " If you opened this file in Excel, it may have changed the format of this field."
-                        )
-            else:
-                match = ten_digit_tabulator_cvr_regex.match(tabulator_cvr)
-                if not match:
-                    raise UserError(
-                        "Tabulator CVR should be a ten-digit number if there is no Machine column."
-                        f" Got {tabulator_cvr} for Cast Vote Record {cvr_number}."
-                        " Make sure any leading zeros have not been stripped from this field."
-                    )
-                tabulator_number, ballot_number = match.groups()
-                record_id = int(ballot_number)
-
-            db_batch = batches_by_key.get((tabulator_number, batch_name))
-            if db_batch:
-                yield (
-                    cvr_number,
-                    CvrBallot(
-                        batch=db_batch,
-                        record_id=record_id,
-                        imprinted_id=imprinted_id,
-                    ),
-                )
-            else:
-                close_matches = difflib.get_close_matches(
-                    str((tabulator_number, batch_name)),
-                    (str(batch_key) for batch_key in batches_by_key),
-                    n=1,
-                )
-                closest_match = (
-                    ast.literal_eval(close_matches[0]) if close_matches else None
-                )
-                raise UserError(
-                    "Couldn't find a matching batch for"
-                    f" Tabulator: {tabulator_number}, Batch: {batch_name}"
-                    f" (Cast Vote Record: {cvr_number})."
-                    " The Tabulator and Batch fields in the CVR file"
-                    " must match the Tabulator and Batch Name fields in the"
-                    " ballot manifest."
-                    + (
-                        (
-                            " The closest match we found in the ballot manifest was:"
-                            f" Tabulator: {closest_match[0]}, Batch Name: {closest_match[1]}."
-                        )
-                        if closest_match
-                        else ""
-                    )
-                    + " Please check your CVR file and ballot manifest thoroughly"
-                    " to make sure these values match - there may be a similar"
-                    " inconsistency in other rows in the CVR file."
+        closest_match = ast.literal_eval(close_matches[0]) if close_matches else None
+        raise UserError(
+            "Couldn't find a matching batch for"
+            f" Tabulator: {ballot.tabulator_number}, Batch: {ballot.batch_name}"
+            f" (Cast Vote Record: {ballot.cvr_number})."
+            " The Tabulator and Batch fields in the CVR file"
+            " must match the Tabulator and Batch Name fields in the"
+            " ballot manifest."
+            + (
+                (
+                    " The closest match we found in the ballot manifest was:"
+                    f" Tabulator: {closest_match[0]}, Batch Name: {closest_match[1]}."
                 )
+                if closest_match
+                else ""
+            )
+            + " Please check your CVR file and ballot manifest thoroughly"
+            " to make sure these values match - there may be a similar"
+            " inconsistency in other rows in the CVR file."
+        )
 
-    def parse_contest_metadata(cvr_csv: CSVIterator) -> CVR_CONTESTS_METADATA:
+    def parse_contest_metadata(
+        cvr_csv: CSVIterator,
+    ) -> tuple[CVR_CONTESTS_METADATA, bool]:  # (metadata, is sorted by CVR number)
         headers = next(cvr_csv)
         # Based on files we've seen, the first few columns are metadata, and the
         # rest are contest names. We want to figure out where the dividing line
@@ -818,7 +925,23 @@ def parse_ess_cvrs(
 
         header_indices = get_header_indices(headers)
 
+        is_sorted = True
+        previous_cvr_number = None
         for row_index, row in enumerate(cvr_csv):
+            cvr_number_value = column_value(
+                row, "Cast Vote Record", row_index + 1, header_indices
+            )
+            try:
+                cvr_number = int(cvr_number_value)
+            except ValueError as error:
+                raise UserError(
+                    "Cast Vote Record should be a number."
+                    f" Got {cvr_number_value} in row {row_index + 1}."
+                ) from error
+            if previous_cvr_number is not None and cvr_number < previous_cvr_number:
+                is_sorted = False
+            previous_cvr_number = cvr_number
+
             for contest_name in contest_names:
                 choice_name = column_value(
                     row, contest_name, row_index + 1, header_indices, required=False
@@ -836,7 +959,7 @@ def parse_ess_cvrs(
             choice: column for column, choice in enumerate(contest_choice_pairs)
         }
 
-        return {
+        contests_metadata = {
             contest_name: dict(
                 # Until we know how vote-for-n contests are serialized in the
                 # ES&S CVR, we assume vote-for-1
@@ -853,6 +976,7 @@ def parse_ess_cvrs(
             for contest_name, choices in contest_choices.items()
             if len(choices) > 0
         }
+        return contests_metadata, is_sorted
 
     def parse_interpretations(
         cvr_csv: CSVIterator, contests_metadata: CVR_CONTESTS_METADATA
@@ -901,34 +1025,22 @@ def parse_ess_cvrs(
         finally:
             cvr_file.close()
 
-    def parse_and_concat_ballots_files(
-        ballots_files: dict[str, TextIO],
-    ) -> Iterator[tuple[str, CvrBallot]]:
-        # We need to concatenate the ballot files in order of CVR number (which
-        # is ordered within each file). So we parse each file into a stream of
-        # ballots, peek at the first ballot's CVR number, and then concatenate
-        # the streams in order of the first CVR number.
-        ballot_streams = []
-        for file_name, ballots_file in ballots_files.items():
-            try:
-                ballots = parse_ballots_file(ballots_file)
-                (first_cvr_number, _), ballots = peek(ballots)
-                ballot_streams.append(
-                    (first_cvr_number, ballots, file_name, ballots_file)
-                )
-            except UserError as error:
-                raise UserError(f"{file_name}: {error}") from error
-
-        for _, ballots, file_name, ballots_file in sorted(
-            ballot_streams,
-            key=lambda stream_tuple: stream_tuple[0],  # first_cvr_number
-        ):
+    def merge_ballots_files(
+        parsed_ballots_files: dict[str, list[EssBallot]],
+    ) -> Iterator[tuple[str, CvrBallot]]:  # (CVR number, ballot)
+        # Each ballots file is sorted by CVR number, so we can merge them
+        merged_ballots = heapq.merge(
+            *(
+                zip(itertools.repeat(file_name), ballots)
+                for file_name, ballots in parsed_ballots_files.items()
+            ),
+            key=lambda file_name_and_ballot: int(file_name_and_ballot[1].cvr_number),
+        )
+        for file_name, ballot in merged_ballots:
             try:
-                yield from ballots
+                yield (ballot.cvr_number, cvr_ballot_for_ess_ballot(ballot))
             except UserError as error:
                 raise UserError(f"{file_name}: {error}") from error
-            finally:
-                ballots_file.close()
 
     def join_ballots_to_interpretations(
         all_ballots: Iterator[tuple[str, CvrBallot]],
@@ -951,19 +1063,61 @@ def parse_ess_cvrs(
             ballot.interpretations = interpretations
             yield ballot
 
-    ballots = parse_and_concat_ballots_files(ballots_files)
+    # Parse the ballots files in separate processes while we make the first
+    # pass over the CVR file
+    executor = None
+    if config.CVR_PARSING_PROCESSES > 1:
+        executor = fork_process_pool(
+            min(config.CVR_PARSING_PROCESSES, len(ballots_files))
+        )
     try:
-        validate_comma_delimited(cvr_file)
-        cvr_csv = csv.reader(cvr_file, delimiter=",")
-        contests_metadata = parse_contest_metadata(cvr_csv)
-        cvr_file.seek(0)
-        interpretations = parse_interpretations(cvr_csv, contests_metadata)
-        return (
-            contests_metadata,
-            join_ballots_to_interpretations(ballots, interpretations),
+        ballots_file_futures = (
+            {
+                file_name: executor.submit(
+                    parse_ess_ballots_file_at_path,
+                    os.path.join(working_directory, file_name),
+                    ballots_file.encoding,
+                )
+                for file_name, ballots_file in ballots_files.items()
+            }
+            if executor is not None
+            else {}
         )
-    except UserError as error:
-        raise UserError(f"{cvr_file_name}: {error}") from error
+
+        try:
+            validate_comma_delimited(cvr_file)
+            cvr_csv = csv.reader(cvr_file, delimiter=",")
+            contests_metadata, is_sorted = parse_contest_metadata(cvr_csv)
+        except UserError as error:
+            raise UserError(f"{cvr_file_name}: {error}") from error
+
+        parsed_ballots_files: dict[str, list[EssBallot]] = {}
+        for file_name, ballots_file in ballots_files.items():
+            try:
+                parsed_ballots_files[file_name] = (
+                    ballots_file_futures[file_name].result()
+                    if executor is not None
+                    else parse_ess_ballots_file(ballots_file)
+                )
+            except UserError as error:
+                raise UserError(f"{file_name}: {error}") from error
+            finally:
+                ballots_file.close()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    cvr_file.seek(0)
+    cvr_csv = csv.reader(cvr_file, delimiter=",")
+    interpretations = parse_interpretations(cvr_csv, contests_metadata)
+    if not is_sorted:
+        interpretations = sort_by_cvr_number(interpretations)
+    return (
+        contests_metadata,
+        join_ballots_to_interpretations(
+            merge_ballots_files(parsed_ballots_files), interpretations
+        ),
+    )
 
 
 def parse_scanned_ballot_information_file(
@@ -1027,6 +1181,68 @@ def parse_scanned_ballot_information_file(
     return scanned_ballot_information_rows
 
 
+# How many CVR XML files each process parses at a time
+HART_CVR_FILES_PER_CHUNK = 1000
+
+
+def parse_hart_cvr_zip_file_chunk(
+    cvr_zip_file_name: str, cvr_zip_file_path: str, cvr_file_names: list[str]
+) -> list[tuple[str, str, HartCvr]]:
+    # Runs in a separate process, so we open the ZIP file by path rather than
+    # sharing a file object
+    with ZipFile(cvr_zip_file_path, "r") as cvr_zip_archive:
+        return [
+            (
+                cvr_zip_file_name,
+                cvr_file_name,
+                parse_hart_cvr(cvr_zip_archive.open(cvr_file_name)),
+            )
+            for cvr_file_name in cvr_file_names
+        ]
+
+
+def parse_hart_cvr_zip_files(
+    cvr_zip_files: dict[str, BinaryIO],  # { file_name: file }
+) -> Iterator[list[tuple[str, str, HartCvr]]]:
+    """
+    Parses the CVR XML files in the given CVR ZIP files without extracting
+    them, yielding chunks of (zip_file_name, file_name, parsed CVR) in the
+    same order as the files in the ZIP files. Chunks are parsed in parallel
+    across config.CVR_PARSING_PROCESSES processes.
+    """
+    chunks = []
+    for cvr_zip_file_name, cvr_zip_file in cvr_zip_files.items():
+        with ZipFile(cvr_zip_file, "r") as cvr_zip_archive:
+            cvr_file_names = list(
+                dict.fromkeys(
+                    file_name
+                    for file_name in cvr_zip_archive.namelist()
+                    # ZIP files created on Macs include a hidden __MACOSX folder
+                    if not file_name.startswith("__")
+                    and not file_name.startswith(".")
+                    # Ignore extraneous files, like the WriteIn directory
+                    and file_name.lower().endswith(".xml")
+                )
+            )
+        for start in range(0, len(cvr_file_names), HART_CVR_FILES_PER_CHUNK):
+            chunks.append(
+                (
+                    cvr_zip_file_name,
+                    cvr_zip_file.name,
+                    cvr_file_names[start : start + HART_CVR_FILES_PER_CHUNK],
+                )
+            )
+
+    if config.CVR_PARSING_PROCESSES <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield parse_hart_cvr_zip_file_chunk(*chunk)
+        return
+
+    with fork_process_pool(config.CVR_PARSING_PROCESSES) as executor:
+        # map returns results in the same order as the chunks
+        yield from executor.map(parse_hart_cvr_zip_file_chunk, *zip(*chunks))
+
+
 def parse_hart_cvrs(
     jurisdiction: Jurisdiction,
     working_directory: str,
@@ -1053,13 +1269,25 @@ def parse_hart_cvrs(
     1. Unzip the wrapper ZIP file.
     2. Expect either [ CVR ZIP files ] or [ CVR ZIP files and CSVs ].
     3. If CSVs are found, parse them as scanned ballot information CSVs.
-    4. Unzip the CVR ZIP files.
-    5. Parse the contest and choice names. We have to do this in a separate pass since our storage
-       scheme for interpretations requires knowing all of the contest and choice names up front.
-    6. Parse the interpretations.
+    4. Parse each CVR XML file straight out of the CVR ZIP files, spreading the files across a
+       pool of processes. Each file is parsed once, and the results are saved to a tempfile in
+       order.
+    5. Collect the contest and choice names. We have to do this before building interpretations
+       since our storage scheme for interpretations requires knowing all of the contest and
+       choice names up front.
+    6. Build the interpretations from the saved parse results.
     """
     wrapper_zip_file = retrieve_file_to_buffer(jurisdiction.cvr_file, working_directory)
-    file_names = unzip_files(wrapper_zip_file, working_directory)
+    # Only unzip the wrapper ZIP file if it actually wraps CVR ZIP files or CSVs,
+    # otherwise we'd be extracting every CVR XML file
+    with ZipFile(wrapper_zip_file, "r") as wrapper_zip_archive:
+        is_wrapper_zip_file = any(
+            file_name.lower().endswith((".zip", ".csv"))
+            for file_name in wrapper_zip_archive.namelist()
+        )
+    file_names = (
+        unzip_files(wrapper_zip_file, working_directory) if is_wrapper_zip_file else []
+    )
 
     cvr_zip_files: dict[str, BinaryIO] = {}  # { file_name: file }
     scanned_ballot_information_files: list[BinaryIO] = []
@@ -1110,28 +1338,17 @@ def parse_hart_cvrs(
                 )
             scanned_ballot_information_by_cvr_id[cvr_id] = row
 
-    cvr_file_paths: dict[
-        tuple[str, str], str
-    ] = {}  # { (zip_file_name, file_name): file_path }
-    for cvr_zip_file_name, cvr_zip_file in cvr_zip_files.items():
-        sub_working_directory = tempfile.mkdtemp(dir=working_directory)
-        cvr_file_names = unzip_files(cvr_zip_file, sub_working_directory)
-        for cvr_file_name in cvr_file_names:
-            # Ignore extraneous files, like the WriteIn directory
-            if cvr_file_name.lower().endswith(".xml"):
-                # Don't open the files here and just prepare the paths so that they can be opened
-                # and closed one at a time later to avoid hitting "Too many open files" errors
-                cvr_file_paths[(cvr_zip_file_name, cvr_file_name)] = os.path.join(
-                    sub_working_directory, cvr_file_name
-                )
-
-    # Parse contests and choice names
+    # Parse each CVR file once, saving the results to a tempfile so we don't
+    # have to hold them all in memory. Collect the contest and choice names as
+    # we go.
+    parsed_cvrs_file = tempfile.TemporaryFile(dir=working_directory)
     # { contest_name: choice_names }
     contest_choices = defaultdict(set)
-    for cvr_file_path in cvr_file_paths.values():
-        cvr_xml = parse_xml(cvr_file_path)
-        for contest, choice_names in parse_contest_results(cvr_xml).items():
-            contest_choices[contest].update(choice_names)
+    for parsed_cvrs in parse_hart_cvr_zip_files(cvr_zip_files):
+        for _, _, hart_cvr in parsed_cvrs:
+            for contest, choice_names in hart_cvr.contest_results.items():
+                contest_choices[contest].update(choice_names)
+        pickle.dump(parsed_cvrs, parsed_cvrs_file)
 
     # Assign each choice a column index in the interpretation string
     contest_choice_pairs = [
@@ -1168,9 +1385,8 @@ def parse_hart_cvrs(
         for choice_metadata in contest_metadata["choices"].values()
     )
 
-    def parse_interpretations(cvr_xml: ElementTree):
+    def parse_interpretations(contest_results: dict[str, set[str]]):
         interpretations = ["" for _ in range(max_interpretation_column + 1)]
-        contest_results = parse_contest_results(cvr_xml)
         for contest_name, voted_for_choices in contest_results.items():
             contest_metadata = contests_metadata[contest_name]
             for choice_name, choice_metadata in contest_metadata["choices"].items():
@@ -1192,13 +1408,20 @@ def parse_hart_cvrs(
     }
     use_cvr_zip_file_names_as_tabulator_names = len(cvr_zip_files) > 1
 
+    def read_parsed_cvrs() -> Iterator[tuple[str, str, HartCvr]]:
+        parsed_cvrs_file.seek(0)
+        while True:
+            try:
+                parsed_cvrs = pickle.load(parsed_cvrs_file)
+            except EOFError:
+                parsed_cvrs_file.close()
+                return
+            yield from parsed_cvrs
+
     def parse_cvr_ballots() -> Iterable[CvrBallot]:
-        for (cvr_zip_file_name, cvr_file_name), cvr_file_path in cvr_file_paths.items():
+        for cvr_zip_file_name, cvr_file_name, hart_cvr in read_parsed_cvrs():
             cvr_zip_file_name_without_extension = cvr_zip_file_name[:-4]
-            cvr_xml = parse_xml(cvr_file_path)
-            cvr_guid = find_xml(cvr_xml, "CvrGuid").text
-            batch_number = find_xml(cvr_xml, "BatchNumber").text
-            batch_sequence = find_xml(cvr_xml, "BatchSequence").text
+            cvr_guid, batch_number, batch_sequence, contest_results = hart_cvr
 
             if use_tabulator_in_batch_key:
                 if use_cvr_zip_file_names_as_tabulator_names:
@@ -1228,7 +1451,7 @@ def parse_hart_cvrs(
                     batch=db_batch,
                     record_id=int(batch_sequence),
                     imprinted_id=imprinted_id,
-                    interpretations=parse_interpretations(cvr_xml),
+                    interpretations=parse_interpretations(contest_results),
                 )
             else:
                 if use_tabulator_in_batch_key:
@@ -1262,7 +1485,396 @@ def parse_hart_cvrs(
     return contests_metadata, parse_cvr_ballots()
 
 
-@background_task
+def tally_cvr_ballot(
+    contests_metadata: CVR_CONTESTS_METADATA, interpretations_str: str
+):
+    """
+    Adds a single CVR ballot to the running totals for ContestChoice.num_votes
+    and Contest.total_ballots_cast stored in contests_metadata.
+    """
+    interpretations = interpretations_str.split(",")
+    contests_on_ballot = set()
+    for contest_name, contest_metadata in contests_metadata.items():
+        contest_interpretations = {
+            choice_name: interpretations[choice_metadata["column"]]
+            for choice_name, choice_metadata in contest_metadata["choices"].items()
+        }
+
+        # Skip contests not on ballot
+        if any(
+            interpretation == "" for interpretation in contest_interpretations.values()
+        ):
+            continue
+        contests_on_ballot.add(contest_name)
+
+        # Skip ES&S overvotes/undervotes
+        if any(
+            interpretation in ["o", "u"]
+            for interpretation in contest_interpretations.values()
+        ):
+            continue
+
+        # Dominions CVR files sometimes contain interpretation values that can't be
+        # parsed as integers
+        parsed_contest_interpretations: dict[
+            str, int
+        ] = {}  # { choice_name: parsed_interpretation }
+        for choice_name, interpretation in contest_interpretations.items():
+            try:
+                parsed_interpretation = int(interpretation)
+            except Exception as error:
+                raise UserError(
+                    f"Unable to parse '{interpretation}' as an integer. "
+                    "Please export the CVR file with plain integer values."
+                ) from error
+            parsed_contest_interpretations[choice_name] = parsed_interpretation
+
+        # Skip overvotes
+        votes = sum(parsed_contest_interpretations.values())
+        if votes > contest_metadata["votes_allowed"]:
+            continue
+
+        for (
+            choice_name,
+            parsed_interpretation,
+        ) in parsed_contest_interpretations.items():
+            contest_metadata["choices"][choice_name]["num_votes"] += (
+                parsed_interpretation
+            )
+
+    for contest_name in contests_on_ballot:
+        contests_metadata[contest_name]["total_ballots_cast"] += 1
+
+
+class CvrContestTally:
+    """
+    Computes the running totals for ContestChoice.num_votes and
+    Contest.total_ballots_cast (stored in contests_metadata) from CVR ballots.
+    Equivalent to calling tally_cvr_ballot for each ballot, but much faster:
+    ballots are buffered into chunks and tallied with array operations.
+
+    Each chunk is parsed into a (ballots x choice columns) matrix. Since CVRs
+    only contain a handful of distinct interpretation values, we parse each
+    distinct value once (with int(), same as tally_cvr_ballot) and look up the
+    results for each cell. If a chunk has anything unusual (rows of different
+    lengths, or values that can't be parsed as integers), we fall back to
+    tally_cvr_ballot for that chunk, so errors are exactly the same.
+    """
+
+    def __init__(
+        self, contests_metadata: CVR_CONTESTS_METADATA, chunk_size: int = 10_000
+    ):
+        self.contests_metadata = contests_metadata
+        self.chunk_size = chunk_size
+        self.chunk: list[str] = []
+
+        # Only the choice columns are needed for tallying
+        self.columns = sorted(
+            {
+                choice_metadata["column"]
+                for contest_metadata in contests_metadata.values()
+                for choice_metadata in contest_metadata["choices"].values()
+            }
+        )
+        column_indices = {column: index for index, column in enumerate(self.columns)}
+        # For each contest, the indices of its choices in the columns we use
+        self.contest_column_indices = {
+            contest_name: np.array(
+                [
+                    column_indices[choice_metadata["column"]]
+                    for choice_metadata in contest_metadata["choices"].values()
+                ],
+                dtype=np.intp,
+            )
+            for contest_name, contest_metadata in contests_metadata.items()
+        }
+
+    def add_ballot(self, interpretations: str):
+        self.chunk.append(interpretations)
+        if len(self.chunk) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        chunk, self.chunk = self.chunk, []
+        if not chunk:
+            return
+        if not self.tally_chunk(chunk):
+            for interpretations in chunk:
+                tally_cvr_ballot(self.contests_metadata, interpretations)
+
+    def tally_chunk(self, chunk: list[str]) -> bool:
+        # Returns False if the chunk needs to be tallied one ballot at a time
+        rows = [interpretations.split(",") for interpretations in chunk]
+        row_length = len(rows[0])
+        if any(len(row) != row_length for row in rows) or (
+            self.columns and self.columns[-1] >= row_length
+        ):
+            return False
+        cells = np.array(rows, dtype=str)[:, self.columns].reshape(
+            len(rows), len(self.columns)
+        )
+
+        # Parse each distinct interpretation value once
+        distinct_values, value_indices = np.unique(cells, return_inverse=True)
+        value_indices = value_indices.reshape(cells.shape)
+        is_blank = distinct_values == ""
+        is_ess_over_under = np.isin(distinct_values, ["o", "u"])
+        parsed_values = []
+        for value in distinct_values:
+            try:
+                parsed_values.append(int(value))
+            except ValueError:
+                parsed_values.append(None)
+        is_unparseable = np.array(
+            [parsed_value is None for parsed_value in parsed_values], dtype=bool
+        )
+        parsed_values = [parsed_value or 0 for parsed_value in parsed_values]
+        # Leave huge values to tally_cvr_ballot, which uses Python ints
+        if any(abs(parsed_value) >= 2**31 for parsed_value in parsed_values):
+            return False
+        # Use the smallest integer type that fits the values (usually int8)
+        dtype = np.result_type(
+            np.int8, *(np.min_scalar_type(value) for value in parsed_values)
+        )
+        votes = np.array(parsed_values, dtype=dtype)[value_indices]
+        blank_cells = is_blank[value_indices]
+        ess_over_under_cells = is_ess_over_under[value_indices]
+        unparseable_cells = is_unparseable[value_indices] & ~(
+            blank_cells | ess_over_under_cells
+        )
+
+        contest_totals = {}
+        for contest_name, contest_metadata in self.contests_metadata.items():
+            column_indices = self.contest_column_indices[contest_name]
+            on_ballot = ~blank_cells[:, column_indices].any(axis=1)
+            to_tally = on_ballot & ~ess_over_under_cells[:, column_indices].any(axis=1)
+            if unparseable_cells[to_tally][:, column_indices].any():
+                return False
+            contest_votes = votes[to_tally][:, column_indices]
+            # Skip overvotes
+            contest_votes = contest_votes[
+                contest_votes.sum(axis=1, dtype=np.int64)
+                <= contest_metadata["votes_allowed"]
+            ]
+            contest_totals[contest_name] = (
+                contest_votes.sum(axis=0, dtype=np.int64),
+                int(on_ballot.sum()),
+            )
+
+        for contest_name, (choice_votes, total_ballots_cast) in contest_totals.items():
+            contest_metadata = self.contests_metadata[contest_name]
+            for choice_metadata, num_votes in zip(
+                contest_metadata["choices"].values(), choice_votes
+            ):
+                choice_metadata["num_votes"] += int(num_votes)
+            contest_metadata["total_ballots_cast"] += total_ballots_cast
+        return True
+
+
+class CvrBatchContestBallotsIndexer:
+    """
+    Builds the CvrBatchContestBallots index from CVR ballots, which must be
+    added grouped by batch (e.g. as output by assign_ballot_positions). A
+    contest is on a ballot if any of its choice interpretations are non-empty
+    (same as compute_sample_ballots).
+
+    Like CvrContestTally, ballots are processed in chunks with array
+    operations.
+    """
+
+    def __init__(
+        self, contests_metadata: CVR_CONTESTS_METADATA, chunk_size: int = 10_000
+    ):
+        self.contest_columns = {
+            contest_name: [
+                choice_metadata["column"]
+                for choice_metadata in contest_metadata["choices"].values()
+            ]
+            for contest_name, contest_metadata in contests_metadata.items()
+        }
+        self.chunk_size = chunk_size
+        self.chunk: list[tuple[int, str]] = []  # (ballot_position, interpretations)
+        self.batch_id: str | None = None
+        # { contest_name: [ballot_position] } for the current batch
+        self.batch_contest_ballot_positions: dict[str, list[np.ndarray]] = defaultdict(
+            list
+        )
+        self.index_rows: list[dict] = []
+
+    def add_ballot(self, batch_id: str, ballot_position: int, interpretations: str):
+        if batch_id != self.batch_id:
+            self.flush()
+            self.batch_id = batch_id
+        self.chunk.append((ballot_position, interpretations))
+        if len(self.chunk) >= self.chunk_size:
+            self.index_chunk()
+
+    def index_chunk(self):
+        chunk, self.chunk = self.chunk, []
+        if not chunk:
+            return
+
+        ballot_positions = np.array(
+            [ballot_position for ballot_position, _ in chunk], dtype=np.int64
+        )
+        rows = [interpretations.split(",") for _, interpretations in chunk]
+        row_length = len(rows[0])
+        if all(len(row) == row_length for row in rows):
+            non_empty_cells = np.array(rows, dtype=str) != ""
+
+            def contest_on_ballot(columns: list[int]) -> np.ndarray:
+                columns = [column for column in columns if column < row_length]
+                return non_empty_cells[:, columns].any(axis=1)
+
+        else:
+
+            def contest_on_ballot(columns: list[int]) -> np.ndarray:
+                return np.array(
+                    [
+                        any(
+                            column < len(row) and row[column] != ""
+                            for column in columns
+                        )
+                        for row in rows
+                    ],
+                    dtype=bool,
+                )
+
+        for contest_name, columns in self.contest_columns.items():
+            on_ballot = contest_on_ballot(columns)
+            if on_ballot.any():
+                self.batch_contest_ballot_positions[contest_name].append(
+                    ballot_positions[on_ballot]
+                )
+
+    def flush(self):
+        # Finishes the current batch
+        self.index_chunk()
+        for (
+            contest_name,
+            ballot_positions,
+        ) in self.batch_contest_ballot_positions.items():
+            positions = np.concatenate(ballot_positions)
+            bitmap = np.zeros(positions.max(), dtype=bool)
+            bitmap[positions - 1] = True
+            self.index_rows.append(
+                dict(
+                    batch_id=self.batch_id,
+                    contest_name=contest_name,
+                    ballot_positions=np.packbits(bitmap, bitorder="little").tobytes(),
+                )
+            )
+        self.batch_contest_ballot_positions = defaultdict(list)
+
+
+def cvr_batch_contest_ballot_positions(bitmap: bytes) -> list[int]:
+    # Decodes CvrBatchContestBallots.ballot_positions
+    bits = np.unpackbits(np.frombuffer(bitmap, dtype=np.uint8), bitorder="little")
+    return (np.flatnonzero(bits) + 1).tolist()
+
+
+# (batch_id, record_id, imprinted_id, interpretations)
+CvrBallotRow = tuple[str, int, str, str]
+
+# How many CVR ballot rows to sort in memory before spilling them to disk
+MAX_CVR_BALLOT_ROWS_IN_MEMORY = 100_000
+
+
+class CvrBallotRowsNotSorted(Exception):
+    pass
+
+
+def stream_ballot_positions(
+    cvr_ballot_rows: Iterable[CvrBallotRow],
+) -> Iterator[tuple[str, int, str, str, int]]:
+    """
+    Assigns ballot positions like assign_ballot_positions, but without
+    buffering any rows, for CVRs that list ballots grouped by batch in
+    ascending record_id order (as Dominion and ClearBallot usually export
+    them). Raises CvrBallotRowsNotSorted as soon as a batch reappears or a
+    record_id goes backwards, in which case the rows need to be sorted with
+    assign_ballot_positions instead.
+    """
+    finished_batch_ids = set()
+    current_batch_id, previous_record_id, ballot_position = None, 0, 0
+    for batch_id, record_id, imprinted_id, interpretations in cvr_ballot_rows:
+        if batch_id != current_batch_id:
+            if batch_id in finished_batch_ids:
+                raise CvrBallotRowsNotSorted()
+            if current_batch_id is not None:
+                finished_batch_ids.add(current_batch_id)
+            current_batch_id, ballot_position = batch_id, 0
+        elif record_id < previous_record_id:
+            raise CvrBallotRowsNotSorted()
+        previous_record_id = record_id
+        ballot_position += 1
+        yield (batch_id, record_id, imprinted_id, interpretations, ballot_position)
+
+
+def assign_ballot_positions(
+    cvr_ballot_rows: Iterable[CvrBallotRow],
+    max_rows_in_memory: int = MAX_CVR_BALLOT_ROWS_IN_MEMORY,
+) -> Iterator[tuple[str, int, str, str, int]]:
+    """
+    Assigns each CVR ballot row its ballot_position (its index within its
+    batch, ordering by record_id), so that we can load the final rows into
+    the db in one pass.
+
+    Ballots from the same batch aren't necessarily contiguous or in order in a
+    CVR, so we sort the rows by (batch_id, record_id). Small CVRs are sorted in
+    memory. For large CVRs, we sort chunks of rows in memory and spill each
+    sorted chunk to a tempfile, then merge the chunks.
+    """
+
+    def sort_key(row: CvrBallotRow):
+        return (row[0], row[1])
+
+    def read_sorted_chunk(chunk_file: IO[str]) -> Iterator[CvrBallotRow]:
+        chunk_file.seek(0)
+        for batch_id, record_id, imprinted_id, interpretations in csv.reader(
+            chunk_file
+        ):
+            yield (batch_id, int(record_id), imprinted_id, interpretations)
+
+    sorted_chunk_files: list[IO[str]] = []
+    try:
+        rows: list[CvrBallotRow] = []
+        for row in cvr_ballot_rows:
+            rows.append(row)
+            if len(rows) >= max_rows_in_memory:
+                rows.sort(key=sort_key)
+                chunk_file = tempfile.TemporaryFile(mode="w+", newline="")
+                csv.writer(chunk_file).writerows(rows)
+                sorted_chunk_files.append(chunk_file)
+                rows = []
+        rows.sort(key=sort_key)
+
+        sorted_rows = heapq.merge(
+            *(read_sorted_chunk(chunk_file) for chunk_file in sorted_chunk_files),
+            rows,
+            key=sort_key,
+        )
+        current_batch_id, ballot_position = None, 0
+        for batch_id, record_id, imprinted_id, interpretations in sorted_rows:
+            if batch_id != current_batch_id:
+                current_batch_id, ballot_position = batch_id, 0
+            ballot_position += 1
+            yield (batch_id, record_id, imprinted_id, interpretations, ballot_position)
+    finally:
+        for chunk_file in sorted_chunk_files:
+            chunk_file.close()
+
+
+# How many CVR ballot rows to pack at a time (see pack_interpretations_chunk)
+PACK_INTERPRETATIONS_CHUNK_SIZE = 10_000
+
+
+def packed_interpretations_copy_values(chunk: list[str]) -> list[str]:
+    # COPY expects bytea values in hex format
+    return ["\\x" + packed.hex() for packed in pack_interpretations_chunk(chunk)]
+
+
+@background_task(priority=TaskPriority.BULK)
 def process_cvr_file(
     election_id: str,
     jurisdiction_id: str,
@@ -1306,109 +1918,100 @@ def process_cvr_file(
                     f"Unsupported CVR file type: {jurisdiction.cvr_file_type}"
                 )  # pragma: no cover
 
-        contests_metadata, cvr_ballots = parse_cvrs()
-
-        # Store ballot rows as CvrBallots in the database. Since we may have
-        # millions of rows, we write this data into a tempfile and load it into
-        # the db using the COPY command (muuuuch faster than INSERT).
-        with tempfile.TemporaryFile(mode="w+") as ballots_tempfile:
-            ballots_csv = csv.writer(ballots_tempfile)
-            for i, cvr_ballot in enumerate(cvr_ballots):
-                if i % 1000 == 0:
-                    emit_progress(i, total_records)
-                # For hybrid audits, skip any batches that were marked as not
-                # having CVRs in the manifest
-                if (
-                    jurisdiction.election.audit_type == AuditType.HYBRID
-                    and not cvr_ballot.batch.has_cvrs
-                ):
-                    continue
-
-                ballots_csv.writerow(
-                    [
-                        cvr_ballot.batch.id,
-                        cvr_ballot.record_id,
-                        cvr_ballot.imprinted_id,
-                        cvr_ballot.interpretations,
-                    ]
-                )
-
-                # Add to our running totals for ContestChoice.num_votes and
-                # Contest.total_ballots_cast
-                interpretations = cvr_ballot.interpretations.split(",")
-                contests_on_ballot = set()
-                for contest_name, contest_metadata in contests_metadata.items():
-                    contest_interpretations = {
-                        choice_name: interpretations[choice_metadata["column"]]
-                        for choice_name, choice_metadata in contest_metadata[
-                            "choices"
-                        ].items()
-                    }
-
-                    # Skip contests not on ballot
-                    if any(
-                        interpretation == ""
-                        for interpretation in contest_interpretations.values()
-                    ):
-                        continue
-                    contests_on_ballot.add(contest_name)
-
-                    # Skip ES&S overvotes/undervotes
-                    if any(
-                        interpretation in ["o", "u"]
-                        for interpretation in contest_interpretations.values()
-                    ):
-                        continue
-
-                    # Dominions CVR files sometimes contain interpretation values that can't be
-                    # parsed as integers
-                    parsed_contest_interpretations: dict[
-                        str, int
-                    ] = {}  # { choice_name: parsed_interpretation }
-                    for choice_name, interpretation in contest_interpretations.items():
-                        try:
-                            parsed_interpretation = int(interpretation)
-                        except Exception as error:
-                            raise UserError(
-                                f"Unable to parse '{interpretation}' as an integer. "
-                                "Please export the CVR file with plain integer values."
-                            ) from error
-                        parsed_contest_interpretations[choice_name] = (
-                            parsed_interpretation
+        def load_cvr_ballots(
+            ballot_positions: Callable[
+                [Iterable[CvrBallotRow]], Iterator[tuple[str, int, str, str, int]]
+            ],
+        ) -> CVR_CONTESTS_METADATA:
+            contests_metadata, cvr_ballots = parse_cvrs()
+
+            # Store ballot rows as CvrBallots in the database. Since we may have
+            # millions of rows, we load them into the db using the COPY command
+            # (muuuuch faster than INSERT), streaming rows to COPY so that we
+            # never have to hold the whole file in memory. Before loading, we
+            # assign each ballot's ballot_position (see ballot_positions), so
+            # each row is written once with its final values.
+            #
+            # While the COPY is in progress, we can't run any other queries on
+            # the db_session's connection, so make sure everything the rows
+            # depend on is loaded up front.
+            is_hybrid = jurisdiction.election.audit_type == AuditType.HYBRID
+
+            tally = CvrContestTally(contests_metadata)
+
+            def cvr_ballot_rows():
+                try:
+                    for i, cvr_ballot in enumerate(cvr_ballots):
+                        if i % 1000 == 0:
+                            emit_progress(i, total_records)
+                        # For hybrid audits, skip any batches that were marked as
+                        # not having CVRs in the manifest
+                        if is_hybrid and not cvr_ballot.batch.has_cvrs:
+                            continue
+
+                        # Add to our running totals for ContestChoice.num_votes
+                        # and Contest.total_ballots_cast
+                        tally.add_ballot(cvr_ballot.interpretations)
+
+                        yield (
+                            cvr_ballot.batch.id,
+                            cvr_ballot.record_id,
+                            cvr_ballot.imprinted_id,
+                            cvr_ballot.interpretations,
                         )
-
-                    # Skip overvotes
-                    votes = sum(parsed_contest_interpretations.values())
-                    if votes > contest_metadata["votes_allowed"]:
-                        continue
-
+                finally:
+                    # Tally any remaining buffered ballots. If parsing the file
+                    # failed, this makes sure we still report any errors in the
+                    # ballots before the failure first, as if we'd tallied each
+                    # ballot as we parsed it.
+                    tally.flush()
+
+            contest_ballots_indexer = CvrBatchContestBallotsIndexer(contests_metadata)
+            rows = cvr_ballot_rows()
+
+            def cvr_ballot_copy_rows():
+                for chunk in chunked(
+                    ballot_positions(rows), PACK_INTERPRETATIONS_CHUNK_SIZE
+                ):
+                    # Only the packed interpretations are stored, since they're
+                    # much smaller than the text
+                    packed_interpretations = packed_interpretations_copy_values(
+                        [interpretations for _, _, _, interpretations, _ in chunk]
+                    )
                     for (
-                        choice_name,
-                        parsed_interpretation,
-                    ) in parsed_contest_interpretations.items():
-                        contest_metadata["choices"][choice_name]["num_votes"] += (
-                            parsed_interpretation
+                        batch_id,
+                        record_id,
+                        imprinted_id,
+                        interpretations,
+                        ballot_position,
+                    ), packed in zip(chunk, packed_interpretations):
+                        contest_ballots_indexer.add_ballot(
+                            batch_id, ballot_position, interpretations
                         )
-
-                for contest_name in contests_on_ballot:
-                    contests_metadata[contest_name]["total_ballots_cast"] += 1
-
-            jurisdiction.cvr_contests_metadata = contests_metadata
+                        yield (
+                            batch_id,
+                            record_id,
+                            imprinted_id,
+                            ballot_position,
+                            packed,
+                        )
+                contest_ballots_indexer.flush()
 
             # In order to use the COPY command, we have to get the raw psycopg2
             # connection. Note that we use the underlying connection from the
             # db_session, so the operation will occur within the same
             # transaction.
             cursor = db_session.connection().connection.cursor()
-            ballots_tempfile.seek(0)
             try:
-                cursor.copy_expert(
+                copy_rows(
+                    cursor,
                     """
                     COPY cvr_ballot (
                         batch_id,
                         record_id,
                         imprinted_id,
-                        interpretations
+                        ballot_position,
+                        packed_interpretations
                     )
                     FROM STDIN
                     WITH (
@@ -1416,38 +2019,34 @@ def process_cvr_file(
                         DELIMITER ','
                     )
                     """,
-                    ballots_tempfile,
+                    cvr_ballot_copy_rows(),
                 )
-            except Exception as exc:
-                raise exc
             finally:
                 cursor.close()
-
-        # Assign ballot_position for each CvrBallot by counting each ballot's
-        # index within the batch in the CVR, ordering by record_id within the
-        # batch
-        ballot_position = (
-            CvrBallot.query.join(Batch)
-            .filter_by(jurisdiction_id=jurisdiction.id)
-            .with_entities(
-                CvrBallot.batch_id,
-                CvrBallot.record_id,
-                func.row_number()
-                .over(partition_by=CvrBallot.batch_id, order_by=CvrBallot.record_id)
-                .label("ballot_position"),
-            )
-            .subquery()
-        )
-        db_session.execute(
-            CvrBallot.__table__.update()
-            .values(ballot_position=ballot_position.c.ballot_position)
-            .where(
-                and_(
-                    CvrBallot.batch_id == ballot_position.c.batch_id,
-                    CvrBallot.record_id == ballot_position.c.record_id,
+                # If we stopped early, finish tallying the rows we parsed (see
+                # cvr_ballot_rows)
+                rows.close()
+
+            if contest_ballots_indexer.index_rows:
+                db_session.execute(
+                    CvrBatchContestBallots.__table__.insert(),
+                    contest_ballots_indexer.index_rows,
                 )
-            )
-        )
+
+            return contests_metadata
+
+        # Most CVRs are already grouped by batch in record_id order, so first
+        # try streaming rows straight into COPY. If the rows turn out not to be
+        # in order, we can't fix the positions we already loaded, so roll back
+        # and load the file again, sorting the rows first.
+        try:
+            with db_session.begin_nested():
+                contests_metadata = load_cvr_ballots(stream_ballot_positions)
+        except CvrBallotRowsNotSorted:
+            contests_metadata = load_cvr_ballots(assign_ballot_positions)
+
+        # The running totals are complete once all of the rows have been loaded
+        jurisdiction.cvr_contests_metadata = contests_metadata
 
         contests.set_contest_metadata(jurisdiction.election)
 
@@ -1533,6 +2132,13 @@ def clear_cvr_ballots(election_id: str, jurisdiction_id: str):
     # Note that this query can be slow due to the query planner sometimes
     # choosing to not use the relevant index on CvrBallot.batch_id. So it should
     # only be run in background tasks.
+    CvrBatchContestBallots.query.filter(
+        CvrBatchContestBallots.batch_id.in_(
+            Batch.query.filter_by(jurisdiction_id=jurisdiction_id)
+            .with_entities(Batch.id)
+            .subquery()
+        )
+    ).delete(synchronize_session=False)
     CvrBallot.query.filter(
         CvrBallot.batch_id.in_(
             Batch.query.filter_by(jurisdiction_id=jurisdiction_id)
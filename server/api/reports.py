@@ -1,7 +1,6 @@
-import io
-import csv
+from itertools import islice
 from typing import cast as typing_cast
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, OrderedDict
 from sqlalchemy import func, and_
 from sqlalchemy.dialects.postgresql import aggregate_order_by
 from werkzeug.exceptions import Conflict, BadRequest
@@ -11,7 +10,7 @@ from . import api
 from ..models import *
 from ..auth import restrict_access, UserType
 from ..util.csv_download import (
-    csv_response,
+    csv_stream_response,
     election_timestamp_name,
     jurisdiction_timestamp_name,
 )
@@ -648,13 +647,47 @@ def full_hand_tally_result_rows(
     return rows
 
 
+# How many jurisdictions' ballot comparison data to keep around while
+# generating the sampled ballot rows of a report. Each jurisdiction's ballots
+# come up again in every round, so we keep more than just the current
+# jurisdiction's data, but bound it so a large audit doesn't hold the CVRs for
+# every sampled ballot in memory at once.
+BALLOT_COMPARISON_DATA_CACHE_SIZE = 200
+
+
+def ballot_comparison_data(election: Election, jurisdiction: Jurisdiction):
+    """
+    Loads the reported CVRs, audited CVRs, and discrepancies for each contest
+    for the sampled ballots in one jurisdiction. Discrepancies are computed
+    ballot by ballot, so we don't need the rest of the contest's ballots.
+    """
+    cvrs_by_contest = {
+        contest.id: cvrs_for_contest(contest, jurisdiction)
+        for contest in election.contests
+    }
+    audited_cvrs_by_contest = {
+        contest.id: sampled_ballot_interpretations_to_cvrs(contest, jurisdiction)
+        for contest in election.contests
+    }
+    discrepancies_by_contest = {
+        contest.id: supersimple.compute_discrepancies(
+            sampler_contest.from_db_contest(contest),
+            cvrs_by_contest[contest.id],
+            audited_cvrs_by_contest[contest.id],
+        )
+        for contest in election.contests
+    }
+    return cvrs_by_contest, audited_cvrs_by_contest, discrepancies_by_contest
+
+
 def sampled_ballot_rows(election: Election, jurisdiction: Jurisdiction | None = None):
     # Special case: if we sampled all ballots, don't show this section
     rounds = list(election.rounds)
     if len(rounds) > 0 and is_full_hand_tally(rounds[0], election):
-        return full_hand_tally_result_rows(election, jurisdiction)
+        yield from full_hand_tally_result_rows(election, jurisdiction)
+        return
 
-    rows = [heading("SAMPLED BALLOTS")]
+    yield heading("SAMPLED BALLOTS")
 
     # In order to avoid loading all of the ballots into memory at once (there
     # may be 10-100k), we use yield_per(n), which streams n ballots at a
@@ -804,7 +837,7 @@ def sampled_ballot_rows(election: Election, jurisdiction: Jurisdiction | None =
                 result_columns.append(f"Change in Results: {contest.name}")
                 result_columns.append(f"Change in Margin: {contest.name}")
 
-    rows.append(
+    yield (
         ["Jurisdiction Name"]
         + (["Container"] if show_container else [])
         + (["Tabulator"] if show_tabulator else [])
@@ -814,22 +847,10 @@ def sampled_ballot_rows(election: Election, jurisdiction: Jurisdiction | None =
         + result_columns
     )
 
-    if show_cvrs:
-        cvrs_by_contest = {
-            contest.id: cvrs_for_contest(contest) for contest in election.contests
-        }
-        audited_cvrs_by_contest = {
-            contest.id: sampled_ballot_interpretations_to_cvrs(contest)
-            for contest in election.contests
-        }
-        discrepancies_by_contest = {
-            contest.id: supersimple.compute_discrepancies(
-                sampler_contest.from_db_contest(contest),
-                cvrs_by_contest[contest.id],
-                audited_cvrs_by_contest[contest.id],
-            )
-            for contest in election.contests
-        }
+    # { jurisdiction_id: comparison data (CVRs, audited CVRs, discrepancies) }
+    # for recently seen jurisdictions. We load each jurisdiction's data when we
+    # reach its ballots rather than for all ballots up front.
+    ballot_comparison_data_cache: OrderedDict[str, tuple] = OrderedDict()
 
     for ballot in ballots:
         (
@@ -850,6 +871,29 @@ def sampled_ballot_rows(election: Election, jurisdiction: Jurisdiction | None =
                 result_values = ["NOT_AUDITED"] + ([""] * (len(result_columns) - 1))
             else:
                 result_values.append(ballot.status)
+                if show_cvrs:
+                    comparison_data = ballot_comparison_data_cache.get(
+                        batch.jurisdiction_id
+                    )
+                    if comparison_data is not None:
+                        ballot_comparison_data_cache.move_to_end(batch.jurisdiction_id)
+                    else:
+                        comparison_data = ballot_comparison_data(
+                            election, batch.jurisdiction
+                        )
+                        ballot_comparison_data_cache[batch.jurisdiction_id] = (
+                            comparison_data
+                        )
+                        while (
+                            len(ballot_comparison_data_cache)
+                            > BALLOT_COMPARISON_DATA_CACHE_SIZE
+                        ):
+                            ballot_comparison_data_cache.popitem(last=False)
+                    (
+                        cvrs_by_contest,
+                        audited_cvrs_by_contest,
+                        discrepancies_by_contest,
+                    ) = comparison_data
                 for contest in election.contests:
                     if show_cvrs:
                         cvr_interpretation = pretty_cvr_interpretation(
@@ -875,7 +919,7 @@ def sampled_ballot_rows(election: Election, jurisdiction: Jurisdiction | None =
                             )
                         )
 
-        rows.append(
+        yield (
             [jurisdiction_name]
             + ([batch.container] if show_container else [])
             + ([batch.tabulator] if show_tabulator else [])
@@ -887,11 +931,10 @@ def sampled_ballot_rows(election: Election, jurisdiction: Jurisdiction | None =
             + pretty_ballot_ticket_numbers(ticket_numbers, targeted_contests)
             + result_values
         )
-    return rows
 
 
 def sampled_batch_rows(election: Election, jurisdiction: Jurisdiction | None = None):
-    header_rows = [heading("SAMPLED BATCHES")]
+    yield heading("SAMPLED BATCHES")
 
     batches_query = (
         Batch.query.join(SampledBatchDraw)
@@ -971,7 +1014,7 @@ def sampled_batch_rows(election: Election, jurisdiction: Jurisdiction | None = N
         column_headers.append("Combined Batch")
     if has_required_batches:
         column_headers.append("Precinct Audit Batch")
-    header_rows.append(column_headers)
+    yield column_headers
 
     total_reported_results: dict = {
         contest.id: {choice.id: 0 for choice in contest.choices} for contest in contests
@@ -984,9 +1027,7 @@ def sampled_batch_rows(election: Election, jurisdiction: Jurisdiction | None = N
         show_batch_comparison_discrepancies_by_jurisdiction(election)
     )
 
-    sampled_batch_rows: list[list[str | int]] = []
-
-    def add_combined_batch_row(combined_batch: CombinedBatch):
+    def combined_batch_row(combined_batch: CombinedBatch) -> list[str | int]:
         sub_batches = combined_batch["sub_batches"]
         combines_description = f"Combines {', '.join(sub_batch.name for sub_batch in sorted(sub_batches, key=lambda batch: batch.name))}"
         representative_batch = combined_batch["representative_batch"]
@@ -1000,7 +1041,7 @@ def sampled_batch_rows(election: Election, jurisdiction: Jurisdiction | None = N
             if required_sub_batch_names
             else ""
         )
-        combined_batch_row = [
+        row: list[str | int] = [
             representative_batch.jurisdiction.name,
             representative_batch.combined_batch_name,
             sum(batch.num_ballots for batch in sub_batches),
@@ -1009,16 +1050,15 @@ def sampled_batch_rows(election: Election, jurisdiction: Jurisdiction | None = N
             ),
         ]
         if not show_discrepancies_by_jurisdiction[representative_batch.jurisdiction.id]:
-            combined_batch_row += [pretty_boolean(False)]
-            combined_batch_row += [""] * (len(result_columns) + 1)
-            combined_batch_row += [combines_description]
+            row += [pretty_boolean(False)]
+            row += [""] * (len(result_columns) + 1)
+            row += [combines_description]
             if has_required_batches:
-                combined_batch_row.append(required_label)
-            sampled_batch_rows.append(combined_batch_row)
-            return
+                row.append(required_label)
+            return row
 
         is_audited = representative_batch.id in audit_results_by_batch
-        combined_batch_row += [pretty_boolean(is_audited)]
+        row += [pretty_boolean(is_audited)]
         for contest in contests:
             sub_batch_reported_results = list(
                 sub_batch.jurisdiction.batch_tallies[sub_batch.name].get(contest.id)  # type: ignore
@@ -1071,7 +1111,7 @@ def sampled_batch_rows(election: Election, jurisdiction: Jurisdiction | None = N
                 else None
             )
 
-            combined_batch_row += [
+            row += [
                 pretty_choice_votes(reported_results_by_name),
                 (
                     pretty_choice_votes(audit_results_by_name)
@@ -1089,13 +1129,13 @@ def sampled_batch_rows(election: Election, jurisdiction: Jurisdiction | None = N
                 error["counted_as"] if error else "",
             ]
 
-        combined_batch_row += [
+        row += [
             construct_batch_last_edited_by_string(representative_batch),
             combines_description,
         ]
         if has_required_batches:
-            combined_batch_row.append(required_label)
-        sampled_batch_rows.append(combined_batch_row)
+            row.append(required_label)
+        return row
 
     seen_combined_batch_names: set[str] = set()
     for batch in batches:
@@ -1110,7 +1150,7 @@ def sampled_batch_rows(election: Election, jurisdiction: Jurisdiction | None = N
                     if cb["name"] == batch.combined_batch_name
                 )
             )
-            add_combined_batch_row(combined_batch)
+            yield combined_batch_row(combined_batch)
             continue
 
         row = [
@@ -1126,7 +1166,7 @@ def sampled_batch_rows(election: Election, jurisdiction: Jurisdiction | None = N
                 row.append("")
             if has_required_batches:
                 row.append("Yes" if batch.required else "")
-            sampled_batch_rows.append(row)
+            yield row
             continue
 
         is_audited = batch.id in audit_results_by_batch
@@ -1201,7 +1241,7 @@ def sampled_batch_rows(election: Election, jurisdiction: Jurisdiction | None = N
         if has_required_batches:
             row.append("Yes" if batch.required else "")
 
-        sampled_batch_rows.append(row)
+        yield row
 
     total_ballots = sum(
         batch.num_ballots for batch in batches if batch.id not in combined_sub_batch_ids
@@ -1231,7 +1271,7 @@ def sampled_batch_rows(election: Election, jurisdiction: Jurisdiction | None = N
             "",  # change in margin not calculated for totals
         ]
     totals_row += ""  # last edited col
-    return header_rows + sampled_batch_rows + [totals_row]
+    yield totals_row
 
 
 @api.route("/election/<election_id>/report", methods=["GET"])
@@ -1255,17 +1295,14 @@ def audit_admin_audit_report(election: Election):
     ]
     row_sets = [row_set for row_set in row_sets if row_set]
 
-    csv_io = io.StringIO()
-    report = csv.writer(csv_io)
-
-    for row_set in row_sets[:-1]:
-        report.writerows(row_set)
-        report.writerow([])
-    report.writerows(row_sets[-1])
+    def report_rows():
+        for row_set in row_sets[:-1]:
+            yield from row_set
+            yield []
+        yield from row_sets[-1]
 
-    csv_io.seek(0)
-    return csv_response(
-        csv_io,
+    return csv_stream_response(
+        report_rows(),
         filename=f"audit-report-{election_timestamp_name(election)}.csv",
     )
 
@@ -1278,20 +1315,12 @@ def jursdiction_admin_audit_report(election: Election, jurisdiction: Jurisdictio
     if len(list(election.rounds)) == 0:
         raise Conflict("Cannot generate report until audit starts")
 
-    csv_io = io.StringIO()
-    report = csv.writer(csv_io)
-
-    report.writerows(
+    return csv_stream_response(
         (
             sampled_batch_rows(election, jurisdiction)
             if election.audit_type == AuditType.BATCH_COMPARISON
             else sampled_ballot_rows(election, jurisdiction)
         ),
-    )
-
-    csv_io.seek(0)
-    return csv_response(
-        csv_io,
         filename=f"audit-report-{jurisdiction_timestamp_name(election, jurisdiction)}.csv",
     )
 
@@ -1309,14 +1338,8 @@ def audit_admin_discrepancy_report(election: Election):
     else:
         raise BadRequest("Discrepancy report not supported for this audit type")
 
-    csv_io = io.StringIO()
-    report = csv.writer(csv_io)
-    report.writerows(
-        rows[1:]  # Remove section heading, since this report only has one section
-    )
-
-    csv_io.seek(0)
-    return csv_response(
-        csv_io,
+    return csv_stream_response(
+        # Remove section heading, since this report only has one section
+        islice(rows, 1, None),
         filename=f"discrepancy-report-{election_timestamp_name(election)}.csv",
     )
@@ -14,6 +14,7 @@ from .shared import (
     SampleSize,
     active_targeted_contests,
     batch_tallies,
+    batch_tallies_version,
     combined_batch_keys,
     compute_sample_ballots,
     compute_sample_batches,
@@ -43,6 +44,7 @@ from ..audit_math import (
 )
 from .ballot_manifest import hybrid_contest_total_ballots
 from ..worker.tasks import (
+    TaskPriority,
     background_task,
     create_background_task,
     serialize_background_task,
@@ -300,6 +302,7 @@ def calculate_risk_measurements(election: Election, round: Round):
                 sampled_batch_results(contest),
                 sampled_batches_by_ticket_number(contest),
                 combined_batch_keys(election.id),
+                batch_tallies_version(contest),
             )
         elif election.audit_type == AuditType.BALLOT_COMPARISON:
             p_value, is_complete = supersimple.compute_risk(
@@ -322,7 +325,7 @@ def calculate_risk_measurements(election: Election, round: Round):
         round_contest.is_complete = is_complete
 
 
-@background_task
+@background_task(priority=TaskPriority.INTERACTIVE)
 def draw_sample(round_id: str, election_id: str):
     round = Round.query.filter_by(id=round_id, election_id=election_id).one()
     election = round.election
@@ -378,7 +381,9 @@ def draw_sample_ballots(
     # the default filter is None.
     filter_has_cvrs: bool | None = None,
 ):
-    sample = compute_sample_ballots(election, contest_sample_sizes, filter_has_cvrs)
+    sample = compute_sample_ballots(
+        election, contest_sample_sizes, filter_has_cvrs, round=round
+    )
 
     # Group all sample draws by ballot
     sample_draws_by_ballot: dict[tuple[str, int], list[BallotDraw]] = group_by(
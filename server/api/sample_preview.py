@@ -16,6 +16,7 @@ from ..auth.auth_helpers import UserType, restrict_access
 from ..database import db_session
 from ..models import *
 from ..worker.tasks import (
+    TaskPriority,
     background_task,
     create_background_task,
     serialize_background_task,
@@ -23,7 +24,7 @@ from ..worker.tasks import (
 from ..util.get_json import safe_get_json_dict
 
 
-@background_task
+@background_task(priority=TaskPriority.INTERACTIVE)
 def compute_sample_preview(election_id: str, sample_sizes: dict[str, SampleSize]):
     election = Election.query.get(election_id)
     contest_sample_sizes = [
@@ -7,6 +7,7 @@ from werkzeug.exceptions import BadRequest
 
 from . import api
 from ..models import *
+from .. import config
 from ..database import db_session
 from .shared import BatchTallies, combined_batch_keys, samples_not_found_by_round
 from ..auth import restrict_access, UserType
@@ -25,6 +26,7 @@ from ..worker.tasks import (
     serialize_background_task,
     create_background_task,
     background_task,
+    TaskPriority,
     UserError,
 )
 from .. import activity_log
@@ -153,6 +155,7 @@ def sample_size_options(election: Election) -> dict[str, dict[str, SampleSizeOpt
                 rounds.sampled_batch_results(contest),
                 rounds.sampled_batches_by_ticket_number(contest),
                 combined_batch_keys(election.id),
+                rounds.batch_tallies_version(contest),
             )
             return {"macro": {"key": "macro", "size": sample_size, "prob": None}}
 
@@ -199,6 +202,7 @@ def sample_size_options(election: Election) -> dict[str, dict[str, SampleSizeOpt
                 sampler_contest.from_db_contest(contest),
                 non_cvr_stratum,
                 cvr_stratum,
+                max_workers=config.SUITE_PROCESSES,
             )
 
             return {
@@ -220,7 +224,7 @@ def sample_size_options(election: Election) -> dict[str, dict[str, SampleSizeOpt
         raise UserError(exc) from exc  # pragma: no cover
 
 
-@background_task
+@background_task(priority=TaskPriority.INTERACTIVE)
 def next_round_sample_size_options(election_id: str):
     election = Election.query.get(election_id)
     current_round = rounds.get_current_round(election)
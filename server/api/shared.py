@@ -1,10 +1,12 @@
 from collections import defaultdict
 import random
-from typing import TypedDict
-from sqlalchemy import and_, func, literal
+from typing import Sequence, TypedDict
+from sqlalchemy import and_, case, func, inspect, literal, or_, true
 from sqlalchemy.orm import joinedload, load_only
 
 
+from .. import config
+from ..database import db_session
 from ..models import *
 from ..audit_math import (
     ballot_polling_types,
@@ -15,8 +17,14 @@ from ..audit_math import (
     supersimple,
 )
 from ..util.collections import group_by
+from ..util.cvr_interpretations import interpretation_columns
 from .ballot_manifest import CountingGroup, hybrid_contest_total_ballots
-from .cvrs import cvr_contests_metadata, hybrid_contest_choice_vote_counts
+from .cvrs import (
+    cvr_batch_contest_ballot_positions,
+    cvr_contest_name,
+    cvr_contests_metadata,
+    hybrid_contest_choice_vote_counts,
+)
 from ..feature_flags import (
     is_enabled_sample_extra_batches_by_counting_group,
     is_enabled_sample_extra_batches_to_ensure_one_per_jurisdiction,
@@ -96,6 +104,23 @@ def batch_tallies(contest: Contest) -> BatchTallies:
     }
 
 
+def batch_tallies_version(contest: Contest) -> tuple | None:
+    """
+    Identifies the current version of batch_tallies(contest), so that audit
+    math computations on the tallies can be cached until they change.
+    Jurisdiction.updated_at changes whenever the batch tallies are changed.
+    Returns None (i.e. don't cache) if there are unflushed changes.
+    """
+    jurisdictions = list(contest.jurisdictions)
+    if any(inspect(jurisdiction).modified for jurisdiction in jurisdictions):
+        return None
+    return tuple(
+        sorted(
+            (jurisdiction.id, jurisdiction.updated_at) for jurisdiction in jurisdictions
+        )
+    )
+
+
 class CombinedBatch(TypedDict):
     name: str
     representative_batch: Batch
@@ -302,10 +327,22 @@ def round_sizes(contest: Contest) -> ballot_polling_types.BALLOT_POLLING_ROUND_S
         }
 
 
-def cvrs_for_contest(contest: Contest) -> sampler_contest.CVRS:
+def cvr_ballot_interpretations():
+    # Read the packed interpretations, and only read the (much larger) text
+    # interpretations for CVR ballots that haven't been packed
+    return (
+        CvrBallot.packed_interpretations,
+        case([(CvrBallot.packed_interpretations.is_(None), CvrBallot.interpretations)]),
+    )
+
+
+def cvrs_for_contest(
+    contest: Contest, jurisdiction: Jurisdiction | None = None
+) -> sampler_contest.CVRS:
+    # If a jurisdiction is given, only load the CVRs for its sampled ballots
     cvrs: sampler_contest.CVRS = {}
 
-    ballot_interpretations = (
+    ballot_interpretations_query = (
         CvrBallot.query.join(Batch)
         .join(Jurisdiction)
         .join(Jurisdiction.contests)
@@ -317,27 +354,48 @@ def cvrs_for_contest(contest: Contest) -> sampler_contest.CVRS:
                 CvrBallot.ballot_position == SampledBallot.ballot_position,
             ),
         )
-        .values(Jurisdiction.id, SampledBallot.id, CvrBallot.interpretations)
+    )
+    if jurisdiction:
+        ballot_interpretations_query = ballot_interpretations_query.filter(
+            Jurisdiction.id == jurisdiction.id
+        )
+    ballot_interpretations = ballot_interpretations_query.values(
+        Jurisdiction.id, SampledBallot.id, *cvr_ballot_interpretations()
     )
 
     metadata_by_jurisdictions = {
-        jurisdiction.id: cvr_contests_metadata(jurisdiction)
-        for jurisdiction in contest.jurisdictions
+        contest_jurisdiction.id: cvr_contests_metadata(contest_jurisdiction)
+        for contest_jurisdiction in (
+            [jurisdiction] if jurisdiction else contest.jurisdictions
+        )
     }
 
-    for jurisdiction_id, ballot_key, interpretations_str in ballot_interpretations:
+    for (
+        jurisdiction_id,
+        ballot_key,
+        packed_interpretations,
+        interpretations_str,
+    ) in ballot_interpretations:
         metadata = metadata_by_jurisdictions[jurisdiction_id]
         assert metadata is not None
         choices_metadata = metadata[contest.name]["choices"]
 
-        # interpretations is the raw CVR string: 1,0,0,1,0,1,0. We need to
-        # pick out the interpretation for each contest choice. We saved the
-        # column index for each choice when we parsed the CVR.
-        interpretations = interpretations_str.split(",")
-        choice_interpretations = {
-            choice_name: interpretations[choice_metadata["column"]]
-            for choice_name, choice_metadata in choices_metadata.items()
-        }
+        # interpretations is the CVR row: 1,0,0,1,0,1,0. We need to pick out
+        # the interpretation for each contest choice. We saved the column
+        # index for each choice when we parsed the CVR.
+        choice_interpretations = dict(
+            zip(
+                choices_metadata.keys(),
+                interpretation_columns(
+                    packed_interpretations,
+                    interpretations_str,
+                    [
+                        choice_metadata["column"]
+                        for choice_metadata in choices_metadata.values()
+                    ],
+                ),
+            )
+        )
 
         # If the interpretations are empty, it means the contest wasn't
         # on the ballot, so we should skip this contest entirely for
@@ -363,9 +421,12 @@ def cvrs_for_contest(contest: Contest) -> sampler_contest.CVRS:
 
 
 def sampled_ballot_interpretations_to_cvrs(
-    contest: Contest,
+    contest: Contest, jurisdiction: Jurisdiction | None = None
 ) -> sampler_contest.SAMPLECVRS:
+    # If a jurisdiction is given, only load its sampled ballots
     ballots_query = SampledBallot.query.join(Batch)
+    if jurisdiction:
+        ballots_query = ballots_query.filter(Batch.jurisdiction_id == jurisdiction.id)
 
     # In hybrid audits, only count CVR ballots
     if contest.election.audit_type == AuditType.HYBRID:
@@ -678,6 +739,7 @@ def compute_sample_batches_for_contest(
         contest_sample_size["size"],
         previously_sampled_batch_keys,
         batch_tallies(contest),
+        batch_tallies_version(contest),
     )
 
     sample_batches = [
@@ -895,6 +957,9 @@ def compute_sample_ballots(
     # Batch.has_cvrs. Since Batch.has_cvrs is None for all other audit types,
     # the default filter is None.
     filter_has_cvrs: bool | None = None,
+    # When drawing the sample for a round, pass the round to save the sampler
+    # state for each contest, so the next round's sample can resume from it.
+    round: Round | None = None,
 ) -> list[BallotDraw]:
     participating_jurisdictions = {
         jurisdiction
@@ -930,25 +995,79 @@ def compute_sample_ballots(
             .count()
         )
 
+        manifest: dict[tuple[str, str | None, str], Sequence[int]]
         if election.audit_math_type == AuditMathType.CARD_STYLE_DATA:
             # The sampling pool will be all ballots in the audit with the contest
-            manifest: dict[tuple[str, str | None, str], list[int]] = defaultdict(
-                list  # { batch_key: [ballot_position] }
+            contest_manifest: dict[tuple[str, str | None, str], list[int]] = (
+                defaultdict(list)  # { batch_key: [ballot_position] }
             )
-            # Filter down to only ballots in jurisdictions with the contest, and then
-            # filter to ballots that have a CVR interpretation for the contest
+            manifest = contest_manifest
+            # For jurisdictions that have an index of which ballots contain
+            # each contest (built when the CVR was parsed), read the ballots
+            # that contain the contest straight from the index
+            contest_jurisdiction_ids = [
+                jurisdiction.id for jurisdiction in contest.jurisdictions
+            ]
+            indexed_jurisdiction_ids = {
+                jurisdiction_id
+                for (jurisdiction_id,) in CvrBatchContestBallots.query.join(Batch)
+                .filter(Batch.jurisdiction_id.in_(contest_jurisdiction_ids))
+                .with_entities(Batch.jurisdiction_id)
+                .distinct()
+            }
+            indexed_jurisdictions = [
+                jurisdiction
+                for jurisdiction in contest.jurisdictions
+                if jurisdiction.id in indexed_jurisdiction_ids
+            ]
+            if indexed_jurisdictions:
+                # The index is keyed by the contest name in each jurisdiction's
+                # CVR file, which may differ from the contest name if the AA
+                # standardized it
+                indexed_batches = (
+                    CvrBatchContestBallots.query.join(Batch)
+                    .filter(
+                        or_(
+                            *(
+                                and_(
+                                    Batch.jurisdiction_id == jurisdiction.id,
+                                    CvrBatchContestBallots.contest_name
+                                    == cvr_contest_name(jurisdiction, contest.name),
+                                )
+                                for jurisdiction in indexed_jurisdictions
+                            )
+                        )
+                    )
+                    .with_entities(
+                        CvrBatchContestBallots.batch_id,
+                        CvrBatchContestBallots.ballot_positions,
+                    )
+                    .order_by(CvrBatchContestBallots.batch_id)
+                )
+                for batch_id, ballot_positions in indexed_batches:
+                    contest_manifest[batch_id_to_key[batch_id]].extend(
+                        cvr_batch_contest_ballot_positions(ballot_positions)
+                    )
+
+            # For any other jurisdictions (e.g. CVRs parsed before we built the
+            # index), filter down to only ballots in jurisdictions with the
+            # contest, and then filter to ballots that have a CVR
+            # interpretation for the contest
             ballots_in_jurisdictions_with_contest = (
                 CvrBallot.query.join(Batch)
                 .join(Jurisdiction)
                 .join(Jurisdiction.contests)
                 .filter(
                     Contest.id == contest.id,
+                    Jurisdiction.id.notin_(indexed_jurisdiction_ids)
+                    if indexed_jurisdiction_ids
+                    else true(),
                 )
                 .with_entities(
                     Jurisdiction.id,
                     CvrBallot.batch_id,
                     CvrBallot.ballot_position,
-                    CvrBallot.interpretations,
+                    *cvr_ballot_interpretations(),
                 )
                 .order_by(CvrBallot.batch_id, CvrBallot.ballot_position)
             )
@@ -960,19 +1079,23 @@ def compute_sample_ballots(
                 jurisdiction_id,
                 batch_id,
                 ballot_position,
+                packed_interpretations,
                 interpretations_str,
             ) in ballots_in_jurisdictions_with_contest.yield_per(100):
                 metadata = metadata_by_jurisdictions[jurisdiction_id]
                 assert metadata is not None
                 choices_metadata = metadata[contest.name]["choices"]
-                # interpretations is the raw CVR string: 1,0,0,1,0,1,0. We need to
+                # interpretations is the CVR row: 1,0,0,1,0,1,0. We need to
                 # pick out the interpretation for each contest choice to see if
                 # any are non-empty, indicating the ballot has the contest
-                interpretations = interpretations_str.split(",")
-                choice_interpretations = [
-                    interpretations[choice_metadata["column"]]
-                    for choice_metadata in choices_metadata.values()
-                ]
+                choice_interpretations = interpretation_columns(
+                    packed_interpretations,
+                    interpretations_str,
+                    [
+                        choice_metadata["column"]
+                        for choice_metadata in choices_metadata.values()
+                    ],
+                )
 
                 # If the interpretations are empty, it means the contest wasn't
                 # on the ballot, so we don't add it to the manifest
@@ -980,11 +1103,11 @@ def compute_sample_ballots(
                     interpretation == "" for interpretation in choice_interpretations
                 ):
                     continue
-                manifest[batch_id_to_key[batch_id]].append(ballot_position)
+                contest_manifest[batch_id_to_key[batch_id]].append(ballot_position)
         else:
             # The sampling pool will be all ballots in the audit
             manifest = {
-                batch_id_to_key[batch.id]: list(range(1, batch.num_ballots + 1))
+                batch_id_to_key[batch.id]: range(1, batch.num_ballots + 1)
                 for jurisdiction in contest.jurisdictions
                 for batch in jurisdiction.batches
                 if batch.has_cvrs == filter_has_cvrs
@@ -997,17 +1120,44 @@ def compute_sample_ballots(
         else:
             sample_size_num = sample_size["sizeNonCvr"]
 
-        # Do the math! i.e. compute the actual sample
-        sample = sampler.draw_sample(
+        # In hybrid audits, sample without replacement for the non-CVR
+        # ballots, and with replacement for the CVR ballots.
+        # All other audit types sample with replacement.
+        with_replacement = True if filter_has_cvrs is None else filter_has_cvrs
+
+        # Do the math! i.e. compute the actual sample, picking up where the
+        # previous round's sample left off if we can
+        sample_pool = {None: "all", True: "cvr", False: "non_cvr"}[filter_has_cvrs]
+        previous_sample_state = ContestSampleState.query.get((contest.id, sample_pool))
+        sample, sample_state = sampler.draw_sample_resumable(
             str(election.random_seed),
             dict(manifest),
             sample_size_num,
             num_previously_sampled,
-            # In hybrid audits, sample without replacement for the non-CVR
-            # ballots, and with replacement for the CVR ballots.
-            # All other audit types sample with replacement.
-            with_replacement=(True if filter_has_cvrs is None else filter_has_cvrs),
+            with_replacement=with_replacement,
+            previous_state=previous_sample_state and previous_sample_state.state,
         )
+        if previous_sample_state and config.VERIFY_RESUMED_SAMPLES:
+            full_sample = sampler.draw_sample(
+                str(election.random_seed),
+                dict(manifest),
+                sample_size_num,
+                num_previously_sampled,
+                with_replacement=with_replacement,
+            )
+            if sample != full_sample:
+                raise Exception(
+                    f"Resumed sample for contest {contest.id} does not match full sample"
+                )
+        if round:
+            db_session.merge(
+                ContestSampleState(
+                    contest_id=contest.id,
+                    sample_pool=sample_pool,
+                    round_id=round.id,
+                    state=sample_state,
+                )
+            )
         return [
             BallotDraw(
                 batch_id=batch_key_to_id[batch_key],
@@ -11,6 +11,7 @@ from decimal import Decimal
 from collections import defaultdict
 import logging
 from typing import TypedDict
+import numpy as np
 from scipy import stats
 
 from .sampler_contest import Contest
@@ -166,6 +167,89 @@ def get_test_statistics(
     return T
 
 
+# How many sizes we compute test statistics for at once, once we've narrowed
+# down the search to a small enough range
+SIZE_SEARCH_BLOCK = 64
+
+
+def first_size_meeting_threshold(
+    start: int,
+    total_ballots: int,
+    p_completion: float,
+    p_w2: Decimal,
+    plus: Decimal,
+    minus: Decimal,
+    threshold: Decimal,
+) -> int:
+    """
+    Finds the smallest size >= start whose test statistic (at the
+    1-p_completion quantile of winner votes) meets the threshold, or
+    total_ballots if no smaller size does.
+
+    The test statistic isn't monotone in size (it drops every time the
+    quantile doesn't increase), so we can't bisect on it directly. But the
+    quantile is monotone, so for a range of sizes [low, high] the statistic is
+    at most quantile(high) * (plus - minus) + low * minus. We search ranges of
+    exponentially growing length, using that bound to skip (halves of) ranges
+    that can't contain a passing size, and compute the statistic for every
+    size in small enough ranges at once.
+
+    The statistic is computed with floats, and only recomputed with Decimals
+    (the way it was originally defined) when it's too close to the threshold
+    to tell.
+    """
+    q = 1.0 - p_completion
+    p_w2_float = float(p_w2)
+    plus_float, minus_float = float(plus), float(minus)
+    threshold_float = float(threshold)
+
+    # Bound on the float rounding error of a test statistic
+    def tolerance(size):
+        return 1e-9 * (
+            1 + abs(threshold_float) + size * (abs(plus_float) + abs(minus_float))
+        )
+
+    def meets_threshold(size: int, x_c: float, test_stat: float, tol: float) -> bool:
+        if test_stat >= threshold_float + tol:
+            return True
+        if test_stat < threshold_float - tol:
+            return False
+        x_c_exact = Decimal(x_c)
+        return bool(x_c_exact * plus + (size - x_c_exact) * minus >= threshold)
+
+    def search(low: int, high: int) -> int | None:
+        if high - low < SIZE_SEARCH_BLOCK:
+            sizes = np.arange(low, high + 1)
+            x_c = stats.binom.ppf(q, sizes, p_w2_float)
+            test_stats = x_c * plus_float + (sizes - x_c) * minus_float
+            tols = tolerance(sizes)
+            with np.errstate(invalid="ignore"):
+                candidates = np.flatnonzero(test_stats >= threshold_float - tols)
+            for i in candidates:
+                if meets_threshold(int(sizes[i]), x_c[i], test_stats[i], tols[i]):
+                    return int(sizes[i])
+            return None
+
+        x_c_high = stats.binom.ppf(q, high, p_w2_float)
+        upper_bound = x_c_high * (plus_float - minus_float) + low * minus_float
+        if upper_bound < threshold_float - tolerance(high):
+            return None
+
+        mid = (low + high) // 2
+        found = search(low, mid)
+        return found if found is not None else search(mid + 1, high)
+
+    # The initial estimate is usually close, so start with a small range
+    low, step = start, 8
+    while low < total_ballots:
+        high = min(low + step - 1, total_ballots)
+        found = search(low, high)
+        if found is not None:
+            return found
+        low, step = high + 1, step * 2
+    return total_ballots
+
+
 def bravo_sample_sizes(
     alpha: Decimal,
     p_w: Decimal,
@@ -250,18 +334,20 @@ def bravo_sample_sizes(
     # Get a guarantee. (Perhaps contrary to intuition, using
     # math.ceil instead of math.floor can lead to a
     # larger sample.)
-    test_stat = Decimal(0)
-    while test_stat.is_nan() or (
-        test_stat < threshold
-        # In extreme cases, the test_stat never reaches the threshold (or at least doesn't do so in
-        # a reasonable amount of time). This second check prevents this loop from hanging in those
-        # cases.
-        and size < total_ballots
-    ):
-        x_c = Decimal(stats.binom.ppf(1.0 - p_completion, size, float(p_w2)))
-        test_stat = x_c * plus + (size - x_c) * minus
-        if test_stat.is_nan() or test_stat < threshold:
-            size += 1
+    #
+    # In extreme cases, the test_stat never reaches the threshold (or at least
+    # doesn't do so in a reasonable amount of time), so we stop searching once
+    # we reach total_ballots.
+    if size < total_ballots:
+        size = first_size_meeting_threshold(
+            max(size, 0),
+            total_ballots,
+            p_completion,
+            p_w2,
+            plus,
+            minus,
+            threshold,
+        )
 
     # The preceding fussiness notwithstanding, we use a simple
     # adjustment to account for "other" votes beyond p_w and p_r.
@@ -10,9 +10,13 @@ https://papers.ssrn.com/sol3/papers.cfm?abstract_id=1443314 for the
 publication).
 """
 
+from collections import OrderedDict
 from decimal import Decimal, ROUND_CEILING
 import math
-from typing import TypeVar, TypedDict
+import threading
+from typing import Hashable, TypeVar, TypedDict
+import numpy as np
+
 from .sampler_contest import Contest
 
 BatchKey = TypeVar("BatchKey")
@@ -281,6 +285,180 @@ def compute_max_error(
     return error
 
 
+class ContestBatchErrors:
+    """
+    The reported batch tallies for one contest in columnar form (a batches x
+    choices array of votes, plus an index of batch keys), along with the max
+    error of each batch and U, computed with vectorized operations.
+
+    Equivalent to calling compute_unauditable_ballots, compute_max_error, and
+    compute_U, and produces exactly the same Decimal values.
+    """
+
+    def __init__(
+        self, reported_results: dict[BatchKey, BatchResults], contest: Contest
+    ):
+        self.batch_keys = list(reported_results.keys())
+        self.batch_index = {key: i for i, key in enumerate(self.batch_keys)}
+
+        candidates = list(contest.candidates)
+        num_batches = len(self.batch_keys)
+        has_contest = np.array(
+            [contest.name in results for results in reported_results.values()],
+            dtype=bool,
+        )
+        contest_results = [
+            results.get(contest.name, {}) for results in reported_results.values()
+        ]
+        votes = np.array(
+            [
+                [choice_votes.get(choice, 0) for choice in candidates]
+                for choice_votes in contest_results
+            ],
+            # Tallies are usually ints, but float64 represents those exactly
+            dtype=np.float64,
+        ).reshape(num_batches, len(candidates))
+        ballots = np.array(
+            [
+                choice_votes["ballots"] if is_in_batch else 0
+                for choice_votes, is_in_batch in zip(contest_results, has_contest)
+            ],
+            dtype=np.float64,
+        )
+
+        self.unauditable_ballots = math.ceil(
+            (sum(contest.candidates.values()) - votes.sum().item())
+            / contest.votes_allowed
+        )
+
+        # Each candidate pair (and threshold check) compares a linear
+        # combination of the batch's votes against the reported margin V_wl.
+        # Build a column of coefficients and a margin for each one.
+        coefficients, margins = [], []
+        candidate_index = {choice: i for i, choice in enumerate(candidates)}
+        for winner in contest.margins["winners"]:
+            for loser in contest.margins["losers"]:
+                coefficient = np.zeros(len(candidates), dtype=np.int64)
+                coefficient[candidate_index[winner]] += 1
+                coefficient[candidate_index[loser]] -= 1
+                coefficients.append(coefficient)
+                margins.append(contest.candidates[winner] - contest.candidates[loser])
+        if contest.is_subject_to_runoff:
+            valid_votes = sum(contest.candidates.values())
+            for winner in contest.margins["winners"]:
+                w_total = contest.candidates[winner]
+                # See max_error_for_threshold in compute_max_error
+                sign = 1 if w_total > valid_votes - w_total else -1
+                coefficient = np.full(len(candidates), -sign, dtype=np.int64)
+                coefficient[candidate_index[winner]] = sign
+                coefficients.append(coefficient)
+                margins.append(sign * (2 * w_total - valid_votes))
+        V_wl = (
+            np.array(margins, dtype=np.int64)
+            - contest.pending_ballots
+            - self.unauditable_ballots
+        )
+
+        self.max_errors: list[Decimal] = [Decimal(0.0)] * num_batches
+        if len(margins) > 0 and (V_wl <= 0).any():
+            for i in np.flatnonzero(has_contest):
+                self.max_errors[i] = Decimal("inf")
+        elif len(margins) > 0:
+            error_numerators = (
+                votes @ np.array(coefficients, dtype=np.float64).T + ballots[:, None]
+            )
+            # Find the largest error using floats, then compute it exactly as
+            # a Decimal. Float division is monotonic, so the float max is the
+            # exact max unless there's a tie in the floats.
+            float_errors = error_numerators / V_wl
+            max_float_errors = float_errors.max(axis=1)
+            num_maxes = (float_errors == max_float_errors[:, None]).sum(axis=1)
+            best_pairs = float_errors.argmax(axis=1)
+            # Many batches have the same error, so only compute each once
+            exact_errors: dict[tuple[float, int], Decimal] = {}
+
+            def exact_error(i: int, j: int) -> Decimal:
+                key = (error_numerators[i, j].item(), int(V_wl[j]))
+                if key not in exact_errors:
+                    exact_errors[key] = Decimal(key[0]) / Decimal(key[1])
+                return exact_errors[key]
+
+            for i in np.flatnonzero(has_contest & (max_float_errors > 0)).tolist():
+                if num_maxes[i] == 1:
+                    self.max_errors[i] = exact_error(i, best_pairs[i])
+                else:
+                    self.max_errors[i] = max(
+                        exact_error(i, j)
+                        for j in np.flatnonzero(float_errors[i] == max_float_errors[i])
+                    )
+
+        self.U = Decimal(0.0)
+        for max_error in self.max_errors:
+            self.U += max_error
+
+        self._weighted_errors: list[float] | None = None
+
+    def max_error(self, batch_key: BatchKey) -> Decimal:
+        return self.max_errors[self.batch_index[batch_key]]
+
+    def weighted_errors(self) -> list[float]:
+        """
+        Each batch's probability of being picked in PPEB sampling.
+        """
+        if self._weighted_errors is None:
+            weights = {
+                max_error: float(max_error / self.U)
+                for max_error in set(self.max_errors)
+            }
+            self._weighted_errors = [
+                weights[max_error] for max_error in self.max_errors
+            ]
+        return self._weighted_errors
+
+
+# Recently computed ContestBatchErrors, keyed on the contest and a version of
+# the batch tallies they were computed from (see contest_batch_errors)
+BATCH_ERRORS_CACHE_SIZE = 16
+batch_errors_cache: OrderedDict[Hashable, ContestBatchErrors] = OrderedDict()
+batch_errors_cache_lock = threading.Lock()
+
+
+def contest_batch_errors(
+    reported_results: dict[BatchKey, BatchResults],
+    contest: Contest,
+    tallies_version: Hashable | None = None,
+) -> ContestBatchErrors:
+    """
+    Returns the ContestBatchErrors for the given reported results. If
+    tallies_version is given, it should change whenever the reported results
+    change, and the ContestBatchErrors are cached until then.
+    """
+    if tallies_version is None:
+        return ContestBatchErrors(reported_results, contest)
+
+    cache_key = (
+        contest.name,
+        tuple(contest.candidates.items()),
+        contest.num_winners,
+        contest.votes_allowed,
+        contest.pending_ballots,
+        contest.is_subject_to_runoff,
+        tallies_version,
+    )
+    with batch_errors_cache_lock:
+        batch_errors = batch_errors_cache.get(cache_key)
+        if batch_errors is not None:
+            batch_errors_cache.move_to_end(cache_key)
+            return batch_errors
+
+    batch_errors = ContestBatchErrors(reported_results, contest)
+    with batch_errors_cache_lock:
+        batch_errors_cache[cache_key] = batch_errors
+        while len(batch_errors_cache) > BATCH_ERRORS_CACHE_SIZE:
+            batch_errors_cache.popitem(last=False)
+    return batch_errors
+
+
 def compute_U(
     reported_results: dict[BatchKey, BatchResults],
     contest: Contest,
@@ -307,12 +485,7 @@ def compute_U(
     Outputs:
         U - the sum of the maximum possible overstatement for each batch
     """
-    unauditable_ballots = compute_unauditable_ballots(reported_results, contest)
-    U = Decimal(0.0)
-    for batch in reported_results:
-        U += compute_max_error(reported_results[batch], contest, unauditable_ballots)
-
-    return U
+    return ContestBatchErrors(reported_results, contest).U
 
 
 def get_sample_sizes(
@@ -322,6 +495,7 @@ def get_sample_sizes(
     sample_results: dict[BatchKey, BatchResults],
     ticket_numbers: dict[str, BatchKey],
     combined_batches: list[set[BatchKey]],
+    tallies_version: Hashable | None = None,
 ) -> int:
     """
     Computes a sample size expected to confirm the election result
@@ -351,6 +525,8 @@ def get_sample_sizes(
         combined_batches - a list of combined batches, where each combined batch
                            is a set of the sub-batch keys (may include
                            non-sampled batches)
+        tallies_version  - if given, used to cache computations on
+                           reported_results (see contest_batch_errors)
 
     Outputs:
         sample_size - sample size (currently a single integer value)
@@ -361,7 +537,7 @@ def get_sample_sizes(
     if len(reported_results) == len(sample_results):
         raise ValueError("All ballots have already been counted!")
 
-    U = compute_U(reported_results, contest)
+    U = contest_batch_errors(reported_results, contest, tallies_version).U
     if U.is_infinite():
         return len(reported_results)  # tied: full hand count
     p_mult = 1 - 1 / U
@@ -373,6 +549,7 @@ def get_sample_sizes(
         sample_results,
         ticket_numbers,
         combined_batches,
+        tallies_version,
     )
     if risk_attained is True:
         return 0
@@ -400,6 +577,7 @@ def compute_risk(
     sample_results: dict[BatchKey, BatchResults],
     sample_ticket_numbers: dict[str, BatchKey],
     combined_batches: list[set[BatchKey]],
+    tallies_version: Hashable | None = None,
 ) -> tuple[float, bool]:
     """
     Computes the risk-value of <sample_results> based on results in <contest>.
@@ -428,6 +606,8 @@ def compute_risk(
         combined_batches - a list of combined batches, where each combined batch
                            is a set of the sub-batch keys (may include
                            non-sampled batches)
+        tallies_version  - if given, used to cache computations on
+                           reported_results (see contest_batch_errors)
     Outputs:
         measurements    - the p-value of the hypotheses that the election
                           result is correct based on the sample for each
@@ -443,9 +623,9 @@ def compute_risk(
 
     p = Decimal(1.0)
 
-    U = compute_U(reported_results, contest)
-
-    unauditable_ballots = compute_unauditable_ballots(reported_results, contest)
+    batch_errors = contest_batch_errors(reported_results, contest, tallies_version)
+    U = batch_errors.U
+    unauditable_ballots = batch_errors.unauditable_ballots
 
     for _, batch in sorted(
         sample_ticket_numbers.items(),
@@ -489,7 +669,7 @@ def compute_risk(
             error["weighted_error"] if error and error["counted_as"] > 0 else Decimal(0)
         )
 
-        u_p = compute_max_error(reported_results[batch], contest, unauditable_ballots)
+        u_p = batch_errors.max_error(batch)
 
         # If this happens, we need a full hand recount
         if e_p == Decimal("inf") or u_p == Decimal("inf"):
@@ -8,8 +8,10 @@ from .raire_utils import (
     RaireAssertion,
     RaireFrontier,
     RaireNode,
+    RankedBallots,
     find_best_audit,
     perform_dive,
+    ranked_ballots,
     CVRS,
 )
 
@@ -17,7 +19,12 @@ from .raire_utils import (
 NEBMatrix = dict[str, dict[str, NEBAssertion | None]]
 
 
-def make_neb_matrix(contest: Contest, cvrs: CVRS, asn_func) -> NEBMatrix:
+def make_neb_matrix(
+    contest: Contest,
+    cvrs: CVRS,
+    asn_func,
+    ballots: RankedBallots | None = None,
+) -> NEBMatrix:
     """
     Builds the NEB matrix for use by find_best_audit.
 
@@ -25,28 +32,34 @@ def make_neb_matrix(contest: Contest, cvrs: CVRS, asn_func) -> NEBMatrix:
         contest     - the contest being audited
         cvrs        - a list of CVRS to be audited
         asn_func    - the asn function to find assertion difficulty
+        ballots     - the contest's rankings from cvrs, if already indexed
     Output:
         neb_matrix  - a dict of dicts mapping candidate pairs to assertions
     """
+    if ballots is None:
+        contest_rankings = []
+        for cvr in cvrs.values():
+            assert cvr is not None  # for type checker
+            if contest.name in cvr:
+                contest_rankings.append(cvr[contest.name])
+        ballots = RankedBallots(contest, contest_rankings)
+
     nebs: NEBMatrix = {
         c: {d: None for d in contest.candidates} for c in contest.candidates
     }
 
-    for cand in contest.candidates:
-        for other in contest.candidates:
+    first_preferences, loser_tallies = ballots.neb_tallies()
+
+    for i, cand in enumerate(ballots.candidates):
+        for j, other in enumerate(ballots.candidates):
             if cand == other:
                 continue
 
-            asrn: NEBAssertion = NEBAssertion(contest.name, cand, other)
-
-            tally_cand: int = 0
-            tally_other: int = 0
-            for _, cvr in cvrs.items():
-                assert cvr is not None  # for type checker
-                tally_cand += asrn.is_vote_for_winner(cvr)
-                tally_other += asrn.is_vote_for_loser(cvr)
+            tally_cand = int(first_preferences[i])
+            tally_other = int(loser_tallies[i, j])
 
             if tally_cand > tally_other and other not in contest.winners:
+                asrn = NEBAssertion(contest.name, cand, other)
                 margin = tally_cand - tally_other
                 asrn.difficulty = asn_func(margin)
 
@@ -57,7 +70,7 @@ def make_neb_matrix(contest: Contest, cvrs: CVRS, asn_func) -> NEBMatrix:
 
 def make_frontier(
     contest: Contest,
-    ballots: list[dict[str, int]],
+    ballots: RankedBallots | list[dict[str, int]],
     nebs: NEBMatrix,
     asn_func,
 ) -> RaireFrontier:
@@ -65,6 +78,7 @@ def make_frontier(
     Constructs the frontier for the search for the best audit
 
     """
+    ballots = ranked_ballots(contest, ballots)
     frontier = RaireFrontier()
 
     # Our frontier initially has a node for each alternate election outcome
@@ -89,7 +103,7 @@ def make_frontier(
 
 def find_assertions(
     contest: Contest,
-    ballots: list[dict[str, int]],
+    ballots: RankedBallots | list[dict[str, int]],
     nebs: NEBMatrix,
     asn_func: Callable,
     frontier: RaireFrontier,
@@ -100,23 +114,24 @@ def find_assertions(
     Find the best assertions for frontier, and mutate frontier accordingly.
 
     """
+    ballots = ranked_ballots(contest, ballots)
     audit_possible = True
     while audit_possible:
         # Check whether we can stop searching for assertions.
-        max_on_frontier = max(node.estimate for node in frontier.nodes)
+        max_on_frontier = frontier.max_estimate()
 
         if agap > 0 and lowerbound > 0 and max_on_frontier - lowerbound <= agap:
             # We can rule out all branches of the tree with assertions that
             # have a difficulty that is <= lowerbound.
             return True
 
-        to_expand = frontier.nodes[0]
+        to_expand = frontier.first()
 
         # We can also stop searching if all nodes on our frontier are leaves.
         if not to_expand.expandable:
             return True
 
-        frontier.nodes.pop(0)
+        frontier.pop_first()
 
         if to_expand.best_ancestor and to_expand.best_ancestor.estimate <= lowerbound:
             frontier.replace_descendents(to_expand.best_ancestor)
@@ -237,11 +252,18 @@ def compute_raire_assertions(
         assertions is found to hold, then all alternate outcomes, in which
         an alternate candidate to 'winner' wins, can be ruled out.
     """
+    # Index the rankings on the ballots so we can quickly compute tallies
+    # for any set of eliminated candidates.
+    ballots = RankedBallots(
+        contest,
+        (blt[contest.name] for _, blt in cvrs.items() if blt and contest.name in blt),
+    )
+
     # First look at all of the NEB assertions that could be formed for
     # this contest. We will refer to this matrix when examining the best
     # way to prune branches of the "alternate outcome space".
     nebs: dict[str, dict[str, NEBAssertion | None]] = make_neb_matrix(
-        contest, cvrs, asn_func
+        contest, cvrs, asn_func, ballots
     )
 
     # The RAIRE algorithm progressively searches through the space of
@@ -253,9 +275,6 @@ def compute_raire_assertions(
     # already been eliminated.
 
     # Construct initial frontier.
-    ballots = [
-        blt[contest.name] for _, blt in cvrs.items() if blt and contest.name in blt
-    ]
     frontier = make_frontier(contest, ballots, nebs, asn_func)
 
     # This is a running lowerbound on the overall difficulty of the
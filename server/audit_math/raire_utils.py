@@ -1,5 +1,7 @@
 from __future__ import annotations
-from typing import Type, Callable, Any, Literal, TypedDict
+from collections import Counter
+import heapq
+from typing import Type, Callable, Any, Iterable, Literal, TypedDict
 import numpy as np
 
 from .sampler_contest import Contest
@@ -78,6 +80,89 @@ def vote_for_cand(
     return 1
 
 
+class RankedBallots:
+    """
+    An index of a contest's ballot rankings that lets us compute tallies
+    without looping over every ballot each time.
+
+    Ballots with identical rankings are collapsed into one row with a weight
+    (the number of ballots with that ranking). The rankings are stored as a
+    matrix with one row per unique ranking and one column per candidate
+    (ordered like contest.candidates), where unranked candidates get a rank
+    of infinity. Keys in a ballot that aren't candidates in the contest are
+    ignored.
+
+    Tallies for a given set of eliminated candidates are memoized, since the
+    search for assertions asks for the same sets repeatedly.
+    """
+
+    def __init__(self, contest: Contest, ballots: Iterable[dict[str, int]]):
+        self.candidates = list(contest.candidates)
+        self.candidate_index = {cand: i for i, cand in enumerate(self.candidates)}
+
+        ranking_counts = Counter(
+            tuple(ranking(cand, ballot) or np.inf for cand in self.candidates)
+            for ballot in ballots
+        )
+        self.ranks = np.array(list(ranking_counts.keys()), dtype=float).reshape(
+            len(ranking_counts), len(self.candidates)
+        )
+        self.weights = np.array(list(ranking_counts.values()), dtype=np.int64)
+
+        # { eliminated bitmask: tally per candidate }
+        self._tallies: dict[int, np.ndarray] = {}
+
+    def tallies(self, eliminated: set[str]) -> dict[str, int]:
+        """
+        Returns each candidate's tally in the context where the candidates
+        in 'eliminated' have been eliminated, i.e. the same as summing
+        vote_for_cand over all ballots for each candidate.
+        """
+        standing = np.array([cand not in eliminated for cand in self.candidates])
+        eliminated_mask = sum(
+            1 << i for i, is_standing in enumerate(standing) if not is_standing
+        )
+        if eliminated_mask not in self._tallies:
+            standing_ranks = np.where(standing, self.ranks, np.inf)
+            # A ballot is a vote for each standing candidate it ranks highest
+            # (more than one if there's a tie in the ranking).
+            top_rank = standing_ranks.min(axis=1, initial=np.inf)
+            is_vote = (standing_ranks == top_rank[:, None]) & np.isfinite(
+                standing_ranks
+            )
+            self._tallies[eliminated_mask] = self.weights @ is_vote
+
+        tallies = self._tallies[eliminated_mask]
+        return {cand: int(tallies[i]) for i, cand in enumerate(self.candidates)}
+
+    def neb_tallies(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the tallies used for NEB assertions for every pair of
+        candidates, indexed like self.candidates:
+            - first_preferences[w]: ballots that rank w first
+            - loser_tallies[w, l]: ballots that rank l, and either don't rank
+              w or rank l higher than w
+        """
+        first_preferences = self.weights @ (self.ranks == 1)
+        winner_ranks = self.ranks[:, :, None]
+        loser_ranks = self.ranks[:, None, :]
+        is_vote_for_loser = np.isfinite(loser_ranks) & (
+            np.isinf(winner_ranks) | (loser_ranks < winner_ranks)
+        )
+        loser_tallies = np.tensordot(self.weights, is_vote_for_loser, axes=1)
+        return first_preferences, loser_tallies
+
+
+def ranked_ballots(
+    contest: Contest, ballots: RankedBallots | Iterable[dict[str, int]]
+) -> RankedBallots:
+    return (
+        ballots
+        if isinstance(ballots, RankedBallots)
+        else RankedBallots(contest, ballots)
+    )
+
+
 class RaireAssertion:
     def __init__(self, contest: str, winner: str, loser: str):
         """
@@ -357,9 +442,140 @@ class RaireNode:
         return f"tail: {self.tail}\nestimate: {self.estimate}\nbest_assertion: {self.best_assertion}\nbest_ancestor:\n\n{self.best_ancestor}"
 
 
+class FrontierEntry:
+    __slots__ = ["node", "estimate", "removed"]
+
+    def __init__(self, node: RaireNode):
+        self.node = node
+        self.estimate = node.estimate
+        self.removed = False
+
+
+class TailTrie:
+    """
+    Indexes frontier entries by their node's tail, read from the last
+    candidate backwards, so that the descendents of a node (nodes whose tail
+    ends with its tail) are all in one subtree.
+    """
+
+    def __init__(self):
+        self.children: dict[str, TailTrie] = {}
+        self.entries: list[FrontierEntry] = []
+
+    def find(self, tail: list[str]) -> TailTrie | None:
+        trie: TailTrie | None = self
+        for cand in reversed(tail):
+            trie = trie.children.get(cand)  # type: ignore
+            if trie is None:
+                return None
+        return trie
+
+    def insert(self, entry: FrontierEntry):
+        trie = self
+        for cand in reversed(entry.node.tail):
+            trie = trie.children.setdefault(cand, TailTrie())
+        trie.entries.append(entry)
+
+    def pop_descendents(self) -> list[FrontierEntry]:
+        descendents = []
+        stack = list(self.children.values())
+        while stack:
+            trie = stack.pop()
+            descendents.extend(trie.entries)
+            stack.extend(trie.children.values())
+        self.children = {}
+        return descendents
+
+
+class FrontierBlock:
+    def __init__(self, entries: list[FrontierEntry]):
+        self.entries = entries
+        # A lower bound on the estimates of the entries in this block (it's
+        # not updated when entries are removed)
+        self.min_estimate = min((entry.estimate for entry in entries), default=np.inf)
+
+
 class RaireFrontier:
+    """
+    The frontier is conceptually a single list, ordered as described in
+    insert_node, and the order determines which node we expand next. To avoid
+    scanning the whole list for every operation, we split the list into
+    blocks and keep the minimum estimate of each block (so we can skip most
+    blocks when finding where to insert a node), index entries by tail (so we
+    can find descendents), and keep a heap of estimates (so we can find the
+    max estimate).
+
+    Note that the order isn't quite a priority order, since leaf nodes are
+    appended to the end without regard for their estimate, so we keep the
+    list order rather than using a heap for it. Removed entries are marked
+    and skipped, and cleared out of the blocks periodically.
+    """
+
+    BLOCK_SIZE = 128
+
     def __init__(self):
-        self.nodes = []
+        self.blocks: list[FrontierBlock] = []
+        self.tails = TailTrie()
+        # Max heap of entry estimates: (-estimate, insertion count, entry)
+        self.estimates: list[tuple[float, int, FrontierEntry]] = []
+        self.num_inserted = 0
+        self.num_entries = 0
+        self.num_removed_entries = 0
+
+    @property
+    def nodes(self) -> list[RaireNode]:
+        return [
+            entry.node
+            for block in self.blocks
+            for entry in block.entries
+            if not entry.removed
+        ]
+
+    def _insert_entry(self, block_index: int, index: int, node: RaireNode):
+        entry = FrontierEntry(node)
+        if not self.blocks:
+            self.blocks.append(FrontierBlock([]))
+        block = self.blocks[block_index]
+        block.entries.insert(index, entry)
+        block.min_estimate = min(block.min_estimate, entry.estimate)
+        if len(block.entries) > 2 * self.BLOCK_SIZE:
+            self.blocks[block_index : block_index + 1] = [
+                FrontierBlock(block.entries[: self.BLOCK_SIZE]),
+                FrontierBlock(block.entries[self.BLOCK_SIZE :]),
+            ]
+
+        self.tails.insert(entry)
+        self.num_inserted += 1
+        heapq.heappush(self.estimates, (-entry.estimate, self.num_inserted, entry))
+        self.num_entries += 1
+
+    def _remove_entries(self, entries: list[FrontierEntry]):
+        for entry in entries:
+            entry.removed = True
+        self.num_entries -= len(entries)
+        self.num_removed_entries += len(entries)
+
+        # Once most of the entries in the blocks have been removed, rebuild
+        # the blocks without them
+        if self.num_removed_entries > max(self.num_entries, self.BLOCK_SIZE):
+            live_entries = [
+                entry
+                for block in self.blocks
+                for entry in block.entries
+                if not entry.removed
+            ]
+            self.blocks = [
+                FrontierBlock(live_entries[i : i + self.BLOCK_SIZE])
+                for i in range(0, len(live_entries), self.BLOCK_SIZE)
+            ]
+            self.num_removed_entries = 0
+
+    def _append(self, node: RaireNode):
+        last_block = len(self.blocks) - 1
+        if last_block < 0:
+            self._insert_entry(0, 0, node)
+        else:
+            self._insert_entry(last_block, len(self.blocks[last_block].entries), node)
 
     def insert_node(self, node: RaireNode):
         """
@@ -375,36 +591,73 @@ class RaireFrontier:
                                 outcome, to add to the frontier.
         """
         if not node.expandable:
-            self.nodes.append(node)
+            self._append(node)
 
         elif node.estimate == np.inf:
-            self.nodes.insert(0, node)
+            self._insert_entry(0, 0, node)
 
         else:
-            i = 0
-            while i < len(self.nodes):
-                n_est = self.nodes[i].estimate
-
-                if n_est <= node.estimate:
-                    break
-
-                i += 1
-
-            self.nodes.insert(i, node)
+            # Insert before the first node with an estimate <= node.estimate
+            for block_index, block in enumerate(self.blocks):
+                if block.min_estimate > node.estimate:
+                    continue
+                for i, entry in enumerate(block.entries):
+                    if not entry.removed and entry.estimate <= node.estimate:
+                        self._insert_entry(block_index, i, node)
+                        return
+            self._append(node)
 
     def replace_descendents(self, node: RaireNode):
         """
         Remove all descendents of the input 'node' from the frontier, and
         insert 'node' to the frontier in the appropriate position.
         """
-
-        self.nodes = [
-            other_node
-            for other_node in self.nodes
-            if not other_node.is_descendent_of(node)
-        ]
+        trie = self.tails.find(node.tail)
+        if trie is not None:
+            self._remove_entries(trie.pop_descendents())
         self.insert_node(node)
 
+    def _first_entry(self) -> FrontierEntry:
+        while self.blocks:
+            entries = self.blocks[0].entries
+            while entries and entries[0].removed:
+                entries.pop(0)
+                self.num_removed_entries -= 1
+            if entries:
+                return entries[0]
+            self.blocks.pop(0)
+        raise IndexError("frontier is empty")
+
+    def first(self) -> RaireNode:
+        """
+        Returns the node at the front of the frontier (the next node to
+        expand).
+        """
+        return self._first_entry().node
+
+    def pop_first(self) -> RaireNode:
+        """
+        Removes and returns the node at the front of the frontier.
+        """
+        entry = self._first_entry()
+        self.blocks[0].entries.pop(0)
+        entry.removed = True
+        self.num_entries -= 1
+        trie = self.tails.find(entry.node.tail)
+        assert trie is not None
+        trie.entries = [other for other in trie.entries if other is not entry]
+        return entry.node
+
+    def max_estimate(self) -> float:
+        """
+        Returns the largest estimate of any node in the frontier.
+        """
+        while self.estimates and self.estimates[0][2].removed:
+            heapq.heappop(self.estimates)
+        if not self.estimates:
+            raise ValueError("frontier is empty")
+        return self.estimates[0][2].estimate
+
     def __eq__(self, other):
         return self.nodes == other.nodes
 
@@ -414,7 +667,7 @@ class RaireFrontier:
 
 def find_best_audit(
     contest: Contest,
-    ballots: list[dict[str, int]],
+    ballots: RankedBallots | list[dict[str, int]],
     neb_matrix,
     node: RaireNode,
     asn_func: Callable,
@@ -424,7 +677,8 @@ def find_best_audit(
 
     contest: Contest   -  Contest being audited.
 
-    cvrs: list of CVRs -  Details of reported ballots for this contest.
+    ballots            -  Rankings on the reported ballots for this contest
+                          (ideally already indexed as RankedBallots).
 
     neb_matrix         -  |Candidates| x |Candidates| dictionary where
                           neb_matrix[c1][c2] returns a NEBAssertion stating
@@ -478,14 +732,11 @@ def find_best_audit(
     # remain, 'first_in_tail' is not the candidate with the least number
     # of votes. This means that 'first_in_tail' should not be eliminated next.
     # Tally of the candidate 'first_in_tail'
-    tally_first_in_tail = sum(
-        vote_for_cand(first_in_tail, eliminated, blt) for blt in ballots
-    )
+    tallies = ranked_ballots(contest, ballots).tallies(eliminated)
+    tally_first_in_tail = tallies[first_in_tail]
 
     for later_cand in node.tail[1:]:
-        tally_later_cand = sum(
-            vote_for_cand(later_cand, eliminated, blt) for blt in ballots
-        )
+        tally_later_cand = tallies[later_cand]
 
         margin = tally_first_in_tail - tally_later_cand
 
@@ -513,7 +764,7 @@ def find_best_audit(
 def perform_dive(
     node: RaireNode,
     contest: Contest,
-    ballots: list[dict[str, int]],
+    ballots: RankedBallots | list[dict[str, int]],
     neb_matrix,
     asn_func: Callable,
 ):
@@ -524,7 +775,8 @@ def perform_dive(
 
     contest: Contest   -  Contest being audited.
 
-    cvrs: list of CVR  -  Details of reported ballots for this contest.
+    ballots            -  Rankings on the reported ballots for this contest
+                          (ideally already indexed as RankedBallots).
 
     neb_matrix         -  |Candidates| x |Candidates| dictionary where
                           neb_matrix[c1][c2] returns a NEBAssertion stating
@@ -541,6 +793,8 @@ def perform_dive(
     starting at the input 'node'.
     """
 
+    ballots = ranked_ballots(contest, ballots)
+
     rem_cands = [c for c in contest.candidates if c not in node.tail]
     next_cand = rem_cands[0]
 
@@ -1,5 +1,7 @@
 # Handles generating sample sizes and taking samples
-from typing import cast, Any
+import hashlib
+import heapq
+from typing import cast, Any, Hashable, Iterator, Sequence, TypedDict
 from numpy.random import default_rng
 import consistent_sampler
 
@@ -9,10 +11,13 @@ from .sampler_contest import Contest
 
 BatchKey = tuple[str, str]  # (jurisdiction name, batch name)
 
+# How many digits of each ticket number to keep
+TICKET_NUMBER_DIGITS = 18
+
 
 def draw_sample(
     seed: str,
-    manifest: dict[Any, list[int]],
+    manifest: dict[Any, Sequence[int]],
     sample_size: int,
     num_sampled: int = 0,
     with_replacement: bool = True,
@@ -23,10 +28,10 @@ def draw_sample(
 
     Inputs:
         seed - random seed
-        manifest - mapping of batches to the ballots they contain:
+        manifest - mapping of batches to the ballot positions they contain:
                     {
-                        batch1: num_balots,
-                        batch2: num_ballots,
+                        batch1: [1, 2, ...],
+                        batch2: range(1, num_ballots + 1),
                         ...
                     }
         sample_size - number of tickets to randomly draw
@@ -42,30 +47,194 @@ def draw_sample(
                     ),
                     ...
                 ]
+
+    This produces exactly the same sample as passing a list of all of the
+    ballots to consistent_sampler.sampler, but without ever holding every
+    ballot (or every ticket) in memory at once.
+
+    consistent_sampler gives each ballot a first ticket and repeatedly draws
+    the lowest ticket, replacing it with a higher ticket for the same ballot
+    when sampling with replacement. Any ballot that doesn't have one of the
+    lowest <num_draws> first tickets will have at least <num_draws> other
+    tickets drawn before it, so we only need to keep those lowest first tickets
+    around, which we do by generating the tickets lazily and keeping the lowest
+    ones in a bounded heap.
     """
+    num_draws = sample_size + num_sampled
+    tickets, max_first_ticket = lowest_first_tickets(seed, manifest, num_draws)
+    sample = draw_tickets(tickets, max_first_ticket, num_draws, with_replacement)
+    assert sample is not None
+    return [format_ticket(ticket) for ticket in sample[num_sampled:]]
+
+
+Ticket = consistent_sampler.Ticket
+
+
+def lowest_first_tickets(
+    seed: str, manifest: dict[Any, Sequence[int]], num_tickets: int
+) -> tuple[list[Ticket], Ticket | None]:
+    """
+    Returns the lowest <num_tickets> first tickets of the ballots in the
+    manifest as a heap, along with the highest of those tickets (or None if
+    that's all of the ballots).
+    """
+    seed_hash = consistent_sampler.sha256_hex(seed)
+    num_ballots = 0
+
+    def first_tickets() -> Iterator[Ticket]:
+        nonlocal num_ballots
+        for batch, ballot_positions in manifest.items():
+            # consistent_sampler requires distinct ids
+            if not isinstance(ballot_positions, range):
+                assert len(ballot_positions) == len(set(ballot_positions)), (
+                    f"Duplicate ballot positions in batch {batch}"
+                )
+            num_ballots += len(ballot_positions)
+            for ballot_position in ballot_positions:
+                yield consistent_sampler.first_ticket(
+                    (batch, ballot_position), seed, seed_hash
+                )
+
+    # A sorted list is a valid heap. Always keep at least one ticket so that
+    # there's a max_first_ticket if there are any ballots.
+    tickets = heapq.nsmallest(max(num_tickets, 1), first_tickets())
+    max_first_ticket = tickets[-1] if num_ballots > len(tickets) else None
+    return tickets, max_first_ticket
+
+
+def draw_tickets(
+    tickets: list[Ticket],
+    max_first_ticket: Ticket | None,
+    num_draws: int,
+    with_replacement: bool,
+) -> list[Ticket] | None:
+    """
+    Draws the next <num_draws> tickets from a heap of tickets, the same way
+    consistent_sampler.sampler does. Mutates the heap.
+
+    The heap only has tickets for some of the ballots: any ballot without a
+    ticket in the heap must have a first ticket higher than max_first_ticket.
+    So as long as the lowest ticket in the heap is below max_first_ticket, it's
+    the next ticket. Returns None if we run out of tickets we can be sure of.
+    """
+    drawn = []
+    while len(drawn) < num_draws and len(tickets) > 0:
+        if max_first_ticket is not None and tickets[0] > max_first_ticket:
+            return None
+        ticket = heapq.heappop(tickets)
+        if with_replacement:
+            heapq.heappush(tickets, consistent_sampler.next_ticket(ticket))
+        drawn.append(ticket)
+    if len(drawn) < num_draws and max_first_ticket is not None:
+        return None
+    return drawn
+
+
+def format_ticket(ticket: Ticket) -> tuple[str, tuple[Any, int], int]:
+    return (
+        consistent_sampler.trim(ticket.ticket_number, TICKET_NUMBER_DIGITS),
+        ticket.id,
+        ticket.generation,
+    )
 
-    # First build a list of ballots
-    ballots: list[tuple[Any, int]] = [
-        (batch, ballot_position)
-        for batch, ballot_positions in manifest.items()
-        for ballot_position in ballot_positions
-    ]
 
-    return cast(
-        # The signature of `consistent_sampler.sampler` can't be represented by
-        # mypy yet, so it is typed as a less specific version of what it really
-        # is. This casts it back to the more specific version.
-        list[tuple[str, tuple[Any, int], int]],
-        list(
-            consistent_sampler.sampler(
-                ballots,
-                seed=seed,
-                take=sample_size + num_sampled,
-                with_replacement=with_replacement,
-                output="tuple",
-                digits=18,
+class SampleState(TypedDict):
+    # Identifies the inputs to the sampler, so we only resume with the same
+    # seed and manifest
+    fingerprint: str
+    # How many tickets have been drawn
+    num_drawn: int
+    # A heap of the next ticket for each ballot being tracked
+    tickets: list[tuple[str, Any, int]]
+    # The highest first ticket of the ballots being tracked. Every other ballot
+    # has a higher first ticket. None if all ballots are being tracked.
+    max_first_ticket: tuple[str, Any, int] | None
+
+
+def sample_fingerprint(
+    seed: str, manifest: dict[Any, Sequence[int]], with_replacement: bool
+) -> str:
+    fingerprint = hashlib.sha256()
+    fingerprint.update(f"{seed}\n{with_replacement}\n".encode("utf-8"))
+    for batch, ballot_positions in manifest.items():
+        fingerprint.update(f"{batch}: {ballot_positions}\n".encode("utf-8"))
+    return fingerprint.hexdigest()
+
+
+def to_tuple(value: Any) -> Any:
+    # Ticket ids are tuples, which get turned into lists when the state is
+    # saved as JSON
+    if isinstance(value, (list, tuple)):
+        return tuple(to_tuple(item) for item in value)
+    return value
+
+
+def draw_sample_resumable(
+    seed: str,
+    manifest: dict[Any, Sequence[int]],
+    sample_size: int,
+    num_sampled: int = 0,
+    with_replacement: bool = True,
+    previous_state: SampleState | None = None,
+    num_extra_tickets: int | None = None,
+) -> tuple[list[tuple[str, tuple[Any, int], int]], SampleState]:
+    """
+    Same as draw_sample, but also returns the state of the sampler after
+    drawing, which can be passed back in as previous_state to draw the next
+    sample (e.g. for the next round) without starting over.
+
+    To resume, the previous state must be from the same seed and manifest, and
+    must have drawn exactly <num_sampled> tickets. Otherwise (or if the state
+    doesn't track enough ballots to draw the full sample), we start over.
+
+    The state tracks the lowest <num_extra_tickets> first tickets beyond the
+    ones needed for this sample (by default, as many as this sample needs), so
+    that the next sample can usually be drawn from the state alone.
+    """
+    fingerprint = sample_fingerprint(seed, manifest, with_replacement)
+
+    def sample_state(
+        tickets: list[Ticket], max_first_ticket: Ticket | None
+    ) -> SampleState:
+        return SampleState(
+            fingerprint=fingerprint,
+            num_drawn=num_sampled + sample_size,
+            tickets=[tuple(ticket) for ticket in tickets],
+            max_first_ticket=max_first_ticket and tuple(max_first_ticket),
+        )
+
+    if (
+        previous_state is not None
+        and previous_state["fingerprint"] == fingerprint
+        and previous_state["num_drawn"] == num_sampled
+    ):
+        tickets = [
+            Ticket(ticket_number, to_tuple(ballot), generation)
+            for ticket_number, ballot, generation in previous_state["tickets"]
+        ]
+        max_first_ticket = previous_state["max_first_ticket"] and Ticket(
+            previous_state["max_first_ticket"][0],
+            to_tuple(previous_state["max_first_ticket"][1]),
+            previous_state["max_first_ticket"][2],
+        )
+        sample = draw_tickets(tickets, max_first_ticket, sample_size, with_replacement)
+        if sample is not None:
+            return (
+                [format_ticket(ticket) for ticket in sample],
+                sample_state(tickets, max_first_ticket),
             )
-        )[num_sampled:],
+
+    num_draws = sample_size + num_sampled
+    if num_extra_tickets is None:
+        num_extra_tickets = num_draws
+    tickets, max_first_ticket = lowest_first_tickets(
+        seed, manifest, num_draws + num_extra_tickets
+    )
+    sample = draw_tickets(tickets, max_first_ticket, num_draws, with_replacement)
+    assert sample is not None
+    return (
+        [format_ticket(ticket) for ticket in sample[num_sampled:]],
+        sample_state(tickets, max_first_ticket),
     )
 
 
@@ -75,6 +244,7 @@ def draw_ppeb_sample(
     sample_size: int,
     previously_sampled_batch_keys: list[BatchKey],
     batch_results: dict[BatchKey, dict[str, dict[str, int]]],
+    tallies_version: Hashable | None = None,
 ) -> list[tuple[Any, BatchKey]]:
     """
     Draws sample with replacement of size <sample_size> from the
@@ -98,6 +268,8 @@ def draw_ppeb_sample(
                             }
                             ...
                         }
+        tallies_version - if given, used to cache computations on
+                        batch_results (see macro.contest_batch_errors)
 
     Outputs:
         sample - list of 'tickets', consisting of:
@@ -116,21 +288,14 @@ def draw_ppeb_sample(
     int_seed = int(consistent_sampler.sha256_hex(seed), 16)  # type: ignore
     generator = default_rng(int_seed)
 
-    U = macro.compute_U(batch_results, contest)
+    batch_errors = macro.contest_batch_errors(batch_results, contest, tallies_version)
 
     # Should only be possible if the specified contest isn't in any batches
-    if U == 0:
+    if batch_errors.U == 0:
         return []
 
     # Map each batch to its weighted probability of being picked
-    unauditable_ballots = macro.compute_unauditable_ballots(batch_results, contest)
-    weighted_errors = [
-        float(
-            macro.compute_max_error(batch_results[batch], contest, unauditable_ballots)
-            / U
-        )
-        for batch in batch_results
-    ]
+    weighted_errors = batch_errors.weighted_errors()
 
     num_previously_sampled_batches = len(previously_sampled_batch_keys)
     cumulative_sample_size = num_previously_sampled_batches + sample_size
@@ -152,7 +317,7 @@ def draw_ppeb_sample(
                 # back to a tuple
                 tuple(sampled_batch_key)
                 for sampled_batch_key in generator.choice(
-                    list(batch_results.keys()),
+                    batch_errors.batch_keys,
                     num_previously_sampled_batches + sample_size,
                     p=weighted_errors,
                     replace=True,
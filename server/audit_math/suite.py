@@ -8,18 +8,21 @@ This code borrows heavily from code already written by Stark and Ottoboni here:
 https://github.com/pbstark/CORLA18
 """
 
+from functools import partial
 from itertools import product
 import math
-from typing import TypedDict, NamedTuple
+from typing import Callable, Hashable, Iterator, TypedDict, NamedTuple, TypeVar
 from collections import Counter
 
 from decimal import Decimal
 import numpy as np
 import scipy as sp
+from scipy.special import digamma, gammaln
 
 
 from .sampler_contest import Contest, CVRS, SAMPLECVRS
 from . import bravo, supersimple
+from ..util.process_pool import fork_process_pool
 
 
 class HybridPair(NamedTuple):
@@ -31,6 +34,27 @@ GAMMA = 1.03905  # This GAMMA is used in Stark's tool, AGI, and CORLA
 MIN_SAMPLE_SIZE = 5  # The smallest sample size we want to take
 
 
+def log_falling_factorial(x, n: int):
+    """
+    Computes sum(log(x - i) for i in range(n)) in constant time, for x (which
+    may be a non-integer or an array) greater than n - 1.
+    """
+    if n == 0:
+        return np.zeros_like(x, dtype=float)
+    return gammaln(x + 1) - gammaln(x - n + 1)
+
+
+def falling_harmonic_sum(x, n: int):
+    """
+    Computes sum(1 / (x - i) for i in range(n)) in constant time, for x (which
+    may be a non-integer or an array) greater than n - 1. This is the
+    derivative of log_falling_factorial with respect to x.
+    """
+    if n == 0:
+        return np.zeros_like(x, dtype=float)
+    return digamma(x + 1) - digamma(x - n + 1)
+
+
 class BallotPollingStratum:
     """
     A class encapsulating a stratum of ballots in an election. Each stratum is its
@@ -172,6 +196,110 @@ class BallotPollingStratum:
         # Note if this value overflows, the p-value becomes 0.
         return min(1.0 / LR, 1.0)
 
+    def compute_pvalues(
+        self, reported_margin: int, winner: str, loser: str, null_lambdas: np.ndarray
+    ) -> np.ndarray:
+        """
+        Approximates compute_pvalue for an array of null lambdas at once, using
+        closed forms for the log likelihood sums instead of summing over the
+        sample. The results are accurate to about 1e-10 relative error, which
+        is enough to find where the p-value is maximized, but compute_pvalue
+        should be used for any p-value we report.
+        """
+        pvalues = np.ones(len(null_lambdas))
+
+        if self.sample_size == 0 or reported_margin == 0:
+            return pvalues
+
+        sample = bravo.compute_cumulative_sample(self.sample)
+        n_w = sample[winner]
+        n_l = sample[loser]
+        n_u = self.sample_size - n_w - n_l
+
+        v_w = self.vote_totals[winner]
+        v_l = self.vote_totals[loser]
+        v_u = self.num_ballots - v_w - v_l
+
+        if not (v_w >= n_w and v_l >= n_l and v_u >= n_u):
+            return pvalues
+
+        null_margins = (v_w - v_l) - null_lambdas * reported_margin
+
+        alt_logLR = (
+            log_falling_factorial(v_w, n_w)
+            + log_falling_factorial(v_l, n_l)
+            + log_falling_factorial(v_u, n_u)
+        )
+
+        def null_logLR(Nw, null_margin):
+            return (
+                log_falling_factorial(Nw, n_w)
+                + log_falling_factorial(Nw - null_margin, n_l)
+                + log_falling_factorial(self.num_ballots - 2 * Nw + null_margin, n_u)
+            )
+
+        def LR_derivative(Nw, null_margin):
+            return (
+                falling_harmonic_sum(Nw, n_w)
+                + falling_harmonic_sum(Nw - null_margin, n_l)
+                - 2 * falling_harmonic_sum(self.num_ballots - 2 * Nw + null_margin, n_u)
+            )
+
+        upper_n_w_limits = (self.num_ballots - n_u + null_margins) / 2.0
+        lower_n_w_limits = np.maximum(n_w, n_l + null_margins)
+
+        # For extremely small or large null_margins, the limits do not
+        # make sense with the sample values.
+        invalid = (upper_n_w_limits < n_w) | ((upper_n_w_limits - null_margins) < n_l)
+        pvalues[invalid] = 0
+        valid = ~invalid
+        if not valid.any():
+            return pvalues
+
+        null_margins = null_margins[valid]
+        upper_n_w_limits = upper_n_w_limits[valid]
+        lower_n_w_limits = lower_n_w_limits[valid]
+
+        # Check if the maximum occurs at an endpoint: deriv has no sign change
+        upper_derivatives = LR_derivative(upper_n_w_limits, null_margins)
+        lower_derivatives = LR_derivative(lower_n_w_limits, null_margins)
+        at_endpoint = upper_derivatives * lower_derivatives > 0
+        nuisance_params = np.where(
+            null_logLR(upper_n_w_limits, null_margins)
+            >= null_logLR(lower_n_w_limits, null_margins),
+            upper_n_w_limits,
+            lower_n_w_limits,
+        )
+
+        # Otherwise, find the (unique) root of the derivative of the log
+        # likelihood ratio. The derivative is decreasing, so we can bisect all
+        # of the brackets at once, to the same tolerance brentq uses.
+        lows = lower_n_w_limits[~at_endpoint]
+        highs = upper_n_w_limits[~at_endpoint]
+        root_null_margins = null_margins[~at_endpoint]
+        while True:
+            # Stop bisecting each bracket once it's narrow enough, so that each
+            # root doesn't depend on the other lambdas in the grid
+            unconverged = highs - lows > 2e-12 + 4 * np.finfo(float).eps * np.abs(highs)
+            if not unconverged.any():
+                break
+            mids = (lows + highs) / 2
+            move_low = unconverged & (LR_derivative(mids, root_null_margins) > 0)
+            move_high = unconverged & ~move_low
+            lows = np.where(move_low, mids, lows)
+            highs = np.where(move_high, mids, highs)
+        nuisance_params[~at_endpoint] = (lows + highs) / 2
+
+        logLRs = alt_logLR - null_logLR(nuisance_params, null_margins)
+        # Note if this value overflows, the p-value becomes 0.
+        with np.errstate(over="ignore"):
+            LRs = np.exp(logLRs)
+        # Fail the same way compute_pvalue does if it underflows
+        if np.any(LRs == 0):
+            raise ZeroDivisionError("float division by zero")
+        pvalues[valid] = np.minimum(1.0 / LRs, 1.0)
+        return pvalues
+
 
 class MisstatementCounts(TypedDict):
     o1: int
@@ -270,6 +398,46 @@ class BallotComparisonStratum:
         pvalue = (log_pvalue).exp()
         return float(np.min([float(pvalue), 1.0]))  # cast for the typechecker
 
+    def compute_pvalues(
+        self, reported_margin, winner, loser, null_lambdas: np.ndarray
+    ) -> np.ndarray:
+        """
+        Approximates compute_pvalue for an array of null lambdas at once, using
+        floats instead of Decimals. As with BallotPollingStratum, use
+        compute_pvalue for any p-value we report.
+        """
+        if self.sample_size == 0 or reported_margin == 0:
+            return np.ones(len(null_lambdas))
+
+        if self.sample_size == self.num_ballots:
+            return np.zeros(len(null_lambdas))
+
+        o1, o2, u1, u2 = (
+            self.misstatements[(winner, loser)]["o1"],
+            self.misstatements[(winner, loser)]["o2"],
+            self.misstatements[(winner, loser)]["u1"],
+            self.misstatements[(winner, loser)]["u2"],
+        )
+
+        U_s = 2 * self.num_ballots / reported_margin
+        multipliers = 1 - null_lambdas / (GAMMA * U_s)
+
+        # A multiplier <= 0 represents an invalid alternative, because lambda
+        # is too big.
+        invalid = multipliers <= 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_pvalues = (
+                self.sample_size * np.log(multipliers)
+                - o1 * np.log(1 - 1 / (2 * GAMMA))
+                - o2 * np.log(1 - 1 / GAMMA)
+                - u1 * np.log(1 + 1 / (2 * GAMMA))
+                - u2 * np.log(1 + 1 / GAMMA)
+            )
+        with np.errstate(over="ignore"):
+            pvalues = np.minimum(np.exp(log_pvalues), 1.0)
+        pvalues[invalid] = 1.0
+        return pvalues
+
 
 def maximize_fisher_combined_pvalue(
     alpha: float,
@@ -361,40 +529,99 @@ def maximize_fisher_combined_pvalue(
             + T2(delta)
         )
 
-    while True:
-        test_lambdas = np.arange(lambda_lower, lambda_upper + stepsize, stepsize)
-        if len(test_lambdas) < 5:
-            stepsize = (lambda_upper + 1 - lambda_lower) / 5
-            test_lambdas = np.arange(lambda_lower, lambda_upper + stepsize, stepsize)
+    def fisher_pvalue(pvalue1: float, pvalue2: float) -> float:
+        if pvalue1 == 0 or pvalue2 == 0:
+            return 0.0
+        obs = -2 * np.sum(np.log([pvalue1, pvalue2]))
+        return 1 - sp.stats.chi2.cdf(obs, df=4)
 
-        fisher_pvalues = np.empty_like(test_lambdas)
-        for i, test_lambda in enumerate(test_lambdas):
-            pvalue1: float = np.min(
+    def approximate_fisher_pvalues(test_lambdas: np.ndarray) -> np.ndarray:
+        pvalues1 = np.minimum(
+            1,
+            cvr_stratum.compute_pvalues(reported_margin, winner, loser, test_lambdas),
+        )
+        pvalues2 = np.minimum(
+            1,
+            bp_stratum.compute_pvalues(
+                reported_margin, winner, loser, 1 - test_lambdas
+            ),
+        )
+        with np.errstate(divide="ignore"):
+            obs = -2 * (np.log(pvalues1) + np.log(pvalues2))
+        return np.where(
+            (pvalues1 == 0) | (pvalues2 == 0), 0, 1 - sp.stats.chi2.cdf(obs, df=4)
+        )
+
+    def exact_fisher_pvalue(test_lambda: float) -> float:
+        return fisher_pvalue(
+            np.min(
                 [
                     1,
                     cvr_stratum.compute_pvalue(
                         reported_margin, winner, loser, test_lambda
                     ),
                 ]
-            )
-            pvalue2: float = np.min(
+            ),
+            np.min(
                 [
                     1,
                     bp_stratum.compute_pvalue(
                         reported_margin, winner, loser, 1 - test_lambda
                     ),
                 ]
-            )
+            ),
+        )
 
-            pvalues = [pvalue1, pvalue2]
-            if np.any(np.array(pvalues) == 0):
-                fisher_pvalues[i] = 0
-            else:
-                obs = -2 * np.sum(np.log(pvalues))
-                fisher_pvalues[i] = 1 - sp.stats.chi2.cdf(obs, df=2 * len(pvalues))
+    # We identify each lambda we look at by its index on the grid, counting
+    # in steps of the current stepsize from the first grid's lower bound.
+    # Each refined grid lines up with the points of the previous grid, but
+    # recomputing a lambda with different arithmetic can give a slightly
+    # different float, so we can't use the lambdas themselves as keys.
+    lower_index = 0
+    # { grid index: approximate fisher_pvalue }, so that we don't recompute
+    # p-values for lambdas we've already looked at when refining the grid
+    approximate_pvalue_cache: dict[int, float] = {}
+
+    while True:
+        test_lambdas = np.arange(lambda_lower, lambda_upper + stepsize, stepsize)
+        if len(test_lambdas) < 5:
+            stepsize = (lambda_upper + 1 - lambda_lower) / 5
+            test_lambdas = np.arange(lambda_lower, lambda_upper + stepsize, stepsize)
+        test_indices = range(lower_index, lower_index + len(test_lambdas))
+
+        # Evaluate the whole grid at once with the fast approximate p-values,
+        # just to find where the maximum is
+        new_points = [
+            (test_index, test_lambda)
+            for test_index, test_lambda in zip(test_indices, test_lambdas)
+            if test_index not in approximate_pvalue_cache
+        ]
+        if new_points:
+            new_indices, new_lambdas = zip(*new_points)
+            approximate_pvalue_cache.update(
+                zip(
+                    new_indices,
+                    approximate_fisher_pvalues(np.array(new_lambdas)).tolist(),
+                )
+            )
+        approximate_pvalues = np.array(
+            [approximate_pvalue_cache[test_index] for test_index in test_indices]
+        )
 
-        pvalue = np.max(fisher_pvalues)
-        alloc_lambda: float = test_lambdas[np.argmax(fisher_pvalues)]  # type: ignore
+        # Then compute the exact p-value for the lambdas that could be the
+        # maximum, allowing for the error in the approximation. The exact
+        # p-values aren't cached, so that each one is computed from the same
+        # lambda as it would be if we computed the exact p-value for every
+        # lambda in the grid.
+        candidates = np.flatnonzero(
+            approximate_pvalues >= np.max(approximate_pvalues) * (1 - 1e-6)
+        )
+        exact_pvalues = [
+            exact_fisher_pvalue(test_lambdas[candidate]) for candidate in candidates
+        ]
+        max_candidate = candidates[np.argmax(exact_pvalues)]
+        pvalue = np.max(exact_pvalues)
+        alloc_lambda: float = test_lambdas[max_candidate]  # type: ignore
 
         # If p-value is over the risk limit, then there's no need to refine the
         # maximization. We have a lower bound on the maximum.
@@ -414,11 +641,15 @@ def maximize_fisher_combined_pvalue(
             break
 
         # We haven't found a good enough max yet, keep looking
-        # TODO memoize the p-values we've already looked at
-        # to make it faster.
         lambda_lower = alloc_lambda - 2 * stepsize
         lambda_upper = alloc_lambda + 2 * stepsize
         stepsize /= 10
+        # Count grid indexes in steps of the new stepsize
+        lower_index = (test_indices[max_candidate] - 2) * 10
+        approximate_pvalue_cache = {
+            test_index * 10: cached_pvalue
+            for test_index, cached_pvalue in approximate_pvalue_cache.items()
+        }
 
     return min(maximized_pvalue, 1.0)
 
@@ -559,6 +790,98 @@ def try_n(
     )
 
 
+def wl_pair_key(
+    contest: Contest,
+    bp_stratum: BallotPollingStratum,
+    cvr_stratum: BallotComparisonStratum,
+    winner: str,
+    loser: str,
+) -> Hashable:
+    """
+    Returns everything that the computations for a winner-loser pair depend
+    on, other than the parts of the contest and strata that are shared by all
+    pairs. Pairs with the same key (e.g. two losers that both got no votes)
+    are guaranteed to get the same sample size and p-value, so we only need
+    to evaluate one of them.
+    """
+    bp_sample = bravo.compute_cumulative_sample(bp_stratum.sample)
+    pair_misstatements = cvr_stratum.misstatements.get((winner, loser))
+    return (
+        contest.candidates[winner] - contest.candidates[loser],
+        bp_stratum.vote_totals[winner],
+        bp_stratum.vote_totals[loser],
+        bp_sample[winner],
+        bp_sample[loser],
+        cvr_stratum.vote_totals[winner],
+        cvr_stratum.vote_totals[loser],
+        pair_misstatements and tuple(sorted(pair_misstatements.items())),
+    )
+
+
+R = TypeVar("R")
+
+
+def evaluate_wl_pairs(
+    evaluate_pair: Callable[[str, str], R],
+    contest: Contest,
+    bp_stratum: BallotPollingStratum,
+    cvr_stratum: BallotComparisonStratum,
+    is_max: Callable[[R], bool],
+    max_workers: int,
+) -> list[R]:
+    """
+    Evaluates each winner-loser pair of the contest, returning the results in
+    the same order as product(contest.winners, contest.losers), so that the
+    caller can reduce them deterministically.
+
+    Pairs that are equivalent (see wl_pair_key) are only evaluated once. If
+    max_workers > 1, pairs are evaluated in parallel in a process pool, which
+    should only be done from a background task, not while handling a request.
+
+    Once a pair's result is the largest possible result (according to is_max),
+    no other pair can be the binding constraint, so we stop evaluating pairs
+    and only return the results up to and including that pair.
+    """
+    pairs = list(product(contest.winners, contest.losers))
+    pair_keys = [
+        wl_pair_key(contest, bp_stratum, cvr_stratum, winner, loser)
+        for winner, loser in pairs
+    ]
+    # { pair_key: (winner, loser) }, in order of first appearance
+    unique_pairs = {}
+    for pair_key, pair in zip(pair_keys, pairs):
+        unique_pairs.setdefault(pair_key, pair)
+
+    results_by_key: dict[Hashable, R] = {}
+
+    def record_results(results: Iterator[R]) -> None:
+        for pair_key, result in zip(unique_pairs, results):
+            results_by_key[pair_key] = result
+            if is_max(result):
+                break
+
+    if max_workers <= 1 or len(unique_pairs) <= 1:
+        record_results(evaluate_pair(*pair) for pair in unique_pairs.values())
+    else:
+        executor = fork_process_pool(min(max_workers, len(unique_pairs)))
+        try:
+            winners, losers = zip(*unique_pairs.values())
+            # map returns results in the same order as the pairs
+            record_results(executor.map(evaluate_pair, winners, losers))
+        finally:
+            # Don't start any pairs we no longer need, but wait for the ones
+            # that are already running, so they don't keep using CPU after
+            # we return
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    results = []
+    for pair_key in pair_keys:
+        if pair_key not in results_by_key:
+            break
+        results.append(results_by_key[pair_key])
+    return results
+
+
 def get_sample_size_for_wl_pair(
     alpha: float,
     contest: Contest,
@@ -567,9 +890,14 @@ def get_sample_size_for_wl_pair(
     winner: str,
     loser: str,
 ) -> tuple[int, int]:
+    """
+    Finds the sample size needed for a winner-loser pair to meet the risk
+    limit.
+    """
     n_ratio = cvr_stratum.num_ballots / (
         cvr_stratum.num_ballots + bp_stratum.num_ballots
     )
+
     ballots_to_sample = max(
         MIN_SAMPLE_SIZE, cvr_stratum.sample_size + bp_stratum.sample_size
     )
@@ -635,6 +963,7 @@ def get_sample_size(
     contest: Contest,
     bp_stratum: BallotPollingStratum,
     cvr_stratum: BallotComparisonStratum,
+    max_workers: int = 1,
 ) -> HybridPair:
     """
     Estimate the initial sample sizes for the audit.
@@ -644,6 +973,7 @@ def get_sample_size(
         contest         - the overall contest information
         bp_stratum: a stratum object containing the ballot polling stratum
         cvr_stratum: a stratum object containing the ballot comparison stratum
+        max_workers: how many processes to use to evaluate winner-loser pairs
     Outputs:
         sample_sizes    - A Tuple of (cvr_strata_size, no_cvr_strata_size).
     """
@@ -670,13 +1000,23 @@ def get_sample_size(
             alpha, contest, bp_stratum, cvr_stratum, worst_winner, best_loser
         )
     else:
-        sample_sizes: list[tuple[int, int]] = []
-        for winner, loser in product(contest.winners, contest.losers):
-            sample_sizes.append(
-                get_sample_size_for_wl_pair(
-                    alpha, contest, bp_stratum, cvr_stratum, winner, loser
-                )
-            )
+        # No pair can need more than the whole contest, which is what
+        # get_sample_size_for_wl_pair returns once the sample size exceeds the
+        # number of ballots
+        sample_sizes = evaluate_wl_pairs(
+            partial(
+                get_sample_size_for_wl_pair,
+                alpha,
+                contest,
+                bp_stratum,
+                cvr_stratum,
+            ),
+            contest,
+            bp_stratum,
+            cvr_stratum,
+            is_max=lambda sample_size: sum(sample_size) >= contest.ballots,
+            max_workers=max_workers,
+        )
 
         sample_size = sorted(sample_sizes, key=sum, reverse=True)[0]
 
@@ -690,7 +1030,7 @@ def get_sample_size(
 
 
 def compute_risk(
-    risk_limit: int, contest: Contest, bp_stratum, cvr_stratum
+    risk_limit: int, contest: Contest, bp_stratum, cvr_stratum, max_workers: int = 1
 ) -> tuple[float, bool]:
     """
     Computes a risk measurement for a given sample, using fisher's combining
@@ -703,6 +1043,7 @@ def compute_risk(
         contest         - the overall contest information
         bp_stratum: a stratum object containing the ballot polling stratum
         cvr_stratum: a stratum object containing the ballot comparison stratum
+        max_workers: how many processes to use to evaluate winner-loser pairs
 
     Outputs:
         a maximized Fisher's combined p-value over all winner-loser pairs, and
@@ -712,29 +1053,36 @@ def compute_risk(
     alpha = float(risk_limit) / 100
     assert alpha < 1
 
-    pvalues = []
-
-    exception = False
-    for winner, loser in product(contest.winners, contest.losers):
-        if (
-            bp_stratum.sample_size >= bp_stratum.num_ballots
-            and cvr_stratum.sample_size >= cvr_stratum.num_ballots
-        ):
-            # We did a full recount already!
-            exception = True
-            pvalues.append(0.0)
-        elif bp_stratum.sample_size >= bp_stratum.num_ballots:
-            exception = True
-            pvalues.append(cvr_stratum.compute_pvalue(alpha, winner, loser, 1))
-        elif cvr_stratum.sample_size >= cvr_stratum.num_ballots:
-            exception = True
-            pvalues.append(bp_stratum.compute_pvalue(alpha, winner, loser, 1))
-        else:
-            pvalues.append(
-                maximize_fisher_combined_pvalue(
-                    alpha, contest, bp_stratum, cvr_stratum, winner, loser
-                )
-            )
+    pairs = list(product(contest.winners, contest.losers))
+    bp_recounted = bp_stratum.sample_size >= bp_stratum.num_ballots
+    cvr_recounted = cvr_stratum.sample_size >= cvr_stratum.num_ballots
+
+    pvalues: list[float]
+    exception = bp_recounted or cvr_recounted
+    if bp_recounted and cvr_recounted:
+        # We did a full recount already!
+        pvalues = [0.0 for _ in pairs]
+    elif bp_recounted:
+        pvalues = [
+            cvr_stratum.compute_pvalue(alpha, winner, loser, 1)
+            for winner, loser in pairs
+        ]
+    elif cvr_recounted:
+        pvalues = [
+            bp_stratum.compute_pvalue(alpha, winner, loser, 1)
+            for winner, loser in pairs
+        ]
+    else:
+        pvalues = evaluate_wl_pairs(
+            partial(
+                maximize_fisher_combined_pvalue, alpha, contest, bp_stratum, cvr_stratum
+            ),
+            contest,
+            bp_stratum,
+            cvr_stratum,
+            is_max=lambda pvalue: pvalue >= 1.0,
+            max_workers=max_workers,
+        )
 
     max_p = max(pvalues)
 
@@ -168,6 +168,51 @@ RUN_BACKGROUND_TASKS_IMMEDIATELY = parse_bool(
     read_env_var("RUN_BACKGROUND_TASKS_IMMEDIATELY", default="False")
 )
 
+# Number of background tasks each worker dyno runs concurrently. Each task slot
+# runs in its own process, since most tasks are CPU-bound.
+WORKER_TASK_SLOTS = int(read_env_var("ARLO_WORKER_TASK_SLOTS", default="1"))
+
+# Number of processes to use when parsing CVR files that can be parsed in
+# parallel (e.g. Hart CVR XML files). Defaults to the number of CPUs.
+CVR_PARSING_PROCESSES = int(
+    read_env_var(
+        "ARLO_CVR_PARSING_PROCESSES",
+        default=str(os.cpu_count() or 1),
+        env_defaults=dict(test="2"),
+    )
+)
+
+# Number of processes to use when decoding and tokenizing large CSV files in
+# parallel. Defaults to the number of CPUs.
+CSV_PARSING_PROCESSES = int(
+    read_env_var(
+        "ARLO_CSV_PARSING_PROCESSES",
+        default=str(os.cpu_count() or 1),
+        env_defaults=dict(test="2"),
+    )
+)
+
+# Number of processes to use when evaluating the winner-loser pairs of a SUITE
+# (hybrid) contest in parallel to compute sample sizes (which runs in a
+# background task). Defaults to the number of CPUs.
+SUITE_PROCESSES = int(
+    read_env_var(
+        "ARLO_SUITE_PROCESSES",
+        default=str(os.cpu_count() or 1),
+        env_defaults=dict(test="2"),
+    )
+)
+
+# When drawing a round's sample by resuming from the previous round's sampler
+# state, also draw it from scratch and check that the samples match.
+VERIFY_RESUMED_SAMPLES = parse_bool(
+    read_env_var(
+        "ARLO_VERIFY_RESUMED_SAMPLES",
+        default="False",
+        env_defaults=dict(development="True", test="True"),
+    )
+)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("arlo.config")
 
@@ -0,0 +1,31 @@
+"""CvrBallot.packed_interpretations
+
+Revision ID: 3e9a4c7f2d15
+Revises: 8d3f6b2a1c07
+Create Date: 2026-10-18 00:00:00.000000+00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3e9a4c7f2d15"
+down_revision = "8d3f6b2a1c07"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows are left null (readers fall back to the text
+    # interpretations) and can be backfilled with
+    # scripts/pack-cvr-interpretations.py
+    op.add_column(
+        "cvr_ballot",
+        sa.Column("packed_interpretations", sa.LargeBinary(), nullable=True),
+    )
+
+
+def downgrade():  # pragma: no cover
+    pass
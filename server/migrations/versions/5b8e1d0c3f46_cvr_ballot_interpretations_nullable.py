@@ -0,0 +1,27 @@
+"""CvrBallot.interpretations nullable
+
+Revision ID: 5b8e1d0c3f46
+Revises: c4d2e8f17a63
+Create Date: 2026-10-18 00:00:00.000000+00:00
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "5b8e1d0c3f46"
+down_revision = "c4d2e8f17a63"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # New CVR ballots only store packed_interpretations. Once
+    # scripts/pack-cvr-interpretations.py has packed (and cleared) the text
+    # interpretations of all existing rows, the column can be dropped.
+    op.alter_column("cvr_ballot", "interpretations", nullable=True)
+
+
+def downgrade():  # pragma: no cover
+    pass
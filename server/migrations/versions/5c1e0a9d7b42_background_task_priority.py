@@ -0,0 +1,33 @@
+"""BackgroundTask.priority
+
+Revision ID: 5c1e0a9d7b42
+Revises: 233f4348c3bc
+Create Date: 2026-10-18 00:00:00.000000+00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5c1e0a9d7b42"
+down_revision = "233f4348c3bc"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "background_task",
+        sa.Column(
+            "priority",
+            sa.Integer(),
+            nullable=False,
+            server_default="1",
+        ),
+    )
+
+
+def downgrade():  # pragma: no cover
+    pass
@@ -0,0 +1,28 @@
+"""BackgroundTask.work_started_at
+
+Revision ID: 8d3f6b2a1c07
+Revises: 5c1e0a9d7b42
+Create Date: 2026-10-18 00:00:00.000000+00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8d3f6b2a1c07"
+down_revision = "5c1e0a9d7b42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "background_task",
+        sa.Column("work_started_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():  # pragma: no cover
+    pass
@@ -0,0 +1,41 @@
+"""CvrBatchContestBallots table
+
+Revision ID: a71c5e2f9b38
+Revises: 3e9a4c7f2d15
+Create Date: 2026-10-18 00:00:00.000000+00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a71c5e2f9b38"
+down_revision = "3e9a4c7f2d15"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Jurisdictions whose CVRs were parsed before this table existed won't have
+    # any rows, so sampling falls back to scanning their CVR ballots
+    op.create_table(
+        "cvr_batch_contest_ballots",
+        sa.Column("batch_id", sa.String(length=200), nullable=False),
+        sa.Column("contest_name", sa.String(length=200), nullable=False),
+        sa.Column("ballot_positions", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["batch_id"],
+            ["batch.id"],
+            name=op.f("cvr_batch_contest_ballots_batch_id_fkey"),
+            ondelete="cascade",
+        ),
+        sa.PrimaryKeyConstraint(
+            "batch_id", "contest_name", name=op.f("cvr_batch_contest_ballots_pkey")
+        ),
+    )
+
+
+def downgrade():  # pragma: no cover
+    pass
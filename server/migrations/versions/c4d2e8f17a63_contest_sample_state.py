@@ -0,0 +1,48 @@
+"""ContestSampleState table
+
+Revision ID: c4d2e8f17a63
+Revises: a71c5e2f9b38
+Create Date: 2026-10-18 00:00:00.000000+00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c4d2e8f17a63"
+down_revision = "a71c5e2f9b38"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "contest_sample_state",
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("contest_id", sa.String(length=200), nullable=False),
+        sa.Column("sample_pool", sa.String(length=20), nullable=False),
+        sa.Column("round_id", sa.String(length=200), nullable=False),
+        sa.Column("state", sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["contest_id"],
+            ["contest.id"],
+            name=op.f("contest_sample_state_contest_id_fkey"),
+            ondelete="cascade",
+        ),
+        sa.ForeignKeyConstraint(
+            ["round_id"],
+            ["round.id"],
+            name=op.f("contest_sample_state_round_id_fkey"),
+            ondelete="cascade",
+        ),
+        sa.PrimaryKeyConstraint(
+            "contest_id", "sample_pool", name=op.f("contest_sample_state_pkey")
+        ),
+    )
+
+
+def downgrade():  # pragma: no cover
+    pass
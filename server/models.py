@@ -14,6 +14,7 @@ from sqlalchemy import (
     Float,
     JSON,
     Boolean,
+    LargeBinary,
     Enum,
     ForeignKey,
     ForeignKeyConstraint,
@@ -745,6 +746,25 @@ class SampledBallotDraw(BaseModel):
     )
 
 
+# Saves where the ballot sampler left off for a contest after drawing a round's
+# sample, so the next round's sample can pick up from there instead of redrawing
+# every previous round's tickets (see sampler.draw_sample_resumable).
+class ContestSampleState(BaseModel):
+    contest_id = Column(
+        String(200), ForeignKey("contest.id", ondelete="cascade"), nullable=False
+    )
+    # For hybrid audits, ballots with and without CVRs are sampled separately,
+    # so each has its own state. One of: "all", "cvr", "non_cvr".
+    sample_pool = Column(String(20), nullable=False)
+    # The round whose sample produced this state
+    round_id = Column(
+        String(200), ForeignKey("round.id", ondelete="cascade"), nullable=False
+    )
+    state = Column(JSON, nullable=False)
+
+    __table_args__ = (PrimaryKeyConstraint("contest_id", "sample_pool"),)
+
+
 class Interpretation(str, enum.Enum):
     BLANK = "BLANK"
     CANT_AGREE = "CANT_AGREE"
@@ -1024,10 +1044,18 @@ class CvrBallot(Base):
     ballot_position = Column(Integer)
     # imprinted_id is a field in the CVR that uniquely identifies the ballot
     imprinted_id = Column(String(200), nullable=False)
-    # We store the raw string of 0s and 1s from the CVR row to make insertion
-    # fast. We parse them when needed by the audit math using the contest
-    # headers saved in Juridsiction.cvr_contests_metadata.
-    interpretations = Column(Text, nullable=False)
+    # The raw string of 0s and 1s from the CVR row. Only set for CVRs uploaded
+    # before we added packed_interpretations that haven't been backfilled yet
+    # (see scripts/pack-cvr-interpretations.py). Once all rows are packed,
+    # this column will be dropped.
+    interpretations = Column(Text)
+    # The CVR row interpretations in a compact binary encoding (see
+    # server/util/cvr_interpretations.py), which is much smaller to read and
+    # lets us decode a single contest's columns. We parse them when needed by
+    # the audit math using the contest headers saved in
+    # Juridsiction.cvr_contests_metadata. Null for CVRs uploaded before we
+    # added this column that haven't been backfilled yet.
+    packed_interpretations = Column(LargeBinary)
 
     __table_args__ = (
         PrimaryKeyConstraint("batch_id", "record_id"),
@@ -1035,6 +1063,27 @@ class CvrBallot(Base):
     )
 
 
+# An index of which CVR ballots in a batch contain each contest, built when the
+# CVR is parsed. For card style data audits, we sample only from ballots that
+# contain the contest, so this saves us from scanning every CvrBallot to build
+# the sampling manifest. Only batches with at least one ballot containing the
+# contest have a row.
+class CvrBatchContestBallots(Base):
+    batch_id = Column(
+        String(200),
+        ForeignKey("batch.id", ondelete="cascade"),
+        nullable=False,
+    )
+    # Matches the contest name in Jurisdiction.cvr_contests_metadata
+    contest_name = Column(String(200), nullable=False)
+    # A bitmap of ballot positions: bit i (starting from the least significant
+    # bit of the first byte) is set if the ballot at ballot_position i + 1
+    # contains the contest
+    ballot_positions = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (PrimaryKeyConstraint("batch_id", "contest_name"),)
+
+
 class File(BaseModel):
     id = Column(String(200), primary_key=True)
     name = Column(String(250), nullable=False)
@@ -1055,6 +1104,8 @@ class BackgroundTask(BaseModel):
     task_name = Column(String(200), nullable=False)
     payload = Column(JSON, nullable=False)
     lock_key = Column(String(200))
+    # Lower numbers are claimed first (see TaskPriority in worker/tasks.py)
+    priority = Column(Integer, nullable=False, server_default="1")
 
     worker_id = Column(String(200))
     started_at = Column(UTCDateTime)
@@ -1064,6 +1115,8 @@ class BackgroundTask(BaseModel):
     # Tasks can record progress in the work unit of their choosing
     work_total = Column(Integer)
     work_progress = Column(Integer)
+    # When the task first recorded progress (used to estimate throughput)
+    work_started_at = Column(UTCDateTime)
 
 
 class BatchFileBundle(BaseModel):
@@ -1,6 +1,9 @@
 import json
 from flask.testing import FlaskClient
 
+from ... import config
+from ...audit_math import sampler
+from ...database import db_session
 from ...models import *
 from ...auth import UserType
 from ..helpers import *
@@ -184,6 +187,158 @@ def test_rounds_create_two(
     assert sorted(sampled_jurisdictions) == sorted(jurisdiction_ids[:2])
 
 
+def start_round_2_with_custom_sample_size(
+    client: FlaskClient, election_id: str, contest_id: str, sample_size: int
+):
+    rv = client.post(f"/api/election/{election_id}/round/current/finish")
+    assert_ok(rv)
+    rv = post_json(
+        client,
+        f"/api/election/{election_id}/round",
+        {
+            "roundNum": 2,
+            "sampleSizes": {
+                contest_id: {"key": "custom", "size": sample_size, "prob": None}
+            },
+        },
+    )
+    assert_ok(rv)
+    rv = client.get(f"/api/election/{election_id}/round")
+    return json.loads(rv.data)["rounds"][1]["id"]
+
+
+def spy_on_full_sample_draws(monkeypatch) -> list[int]:
+    # Drawing a sample from scratch always starts by finding the lowest first
+    # tickets in the whole manifest, which resuming from a saved state skips
+    full_draws: list[int] = []
+    lowest_first_tickets = sampler.lowest_first_tickets
+
+    def spy(seed, manifest, num_tickets):
+        full_draws.append(num_tickets)
+        return lowest_first_tickets(seed, manifest, num_tickets)
+
+    monkeypatch.setattr(sampler, "lowest_first_tickets", spy)
+    # Don't check the resumed sample against a full redraw
+    monkeypatch.setattr(config, "VERIFY_RESUMED_SAMPLES", False)
+    return full_draws
+
+
+def round_sample(round_id: str) -> list[tuple[str, str, int]]:
+    return (
+        SampledBallotDraw.query.filter_by(round_id=round_id)
+        .join(SampledBallot)
+        .with_entities(
+            SampledBallotDraw.ticket_number,
+            SampledBallot.batch_id,
+            SampledBallot.ballot_position,
+        )
+        .order_by(SampledBallotDraw.ticket_number)
+        .all()
+    )
+
+
+def expected_round_sample(
+    election_id: str, contest_id: str, sample_size: int, num_sampled: int
+) -> list[tuple[str, str, int]]:
+    election = Election.query.get(election_id)
+    batches = (
+        Batch.query.join(Jurisdiction)
+        .join(Jurisdiction.contests)
+        .filter(Contest.id == contest_id)
+        .all()
+    )
+    manifest = {
+        (batch.jurisdiction.name, batch.tabulator, batch.name): range(
+            1, batch.num_ballots + 1
+        )
+        for batch in batches
+    }
+    batch_key_to_id = {
+        (batch.jurisdiction.name, batch.tabulator, batch.name): batch.id
+        for batch in batches
+    }
+    return sorted(
+        (ticket_number, batch_key_to_id[batch_key], ballot_position)
+        for ticket_number, (batch_key, ballot_position), _ in sampler.draw_sample(
+            str(election.random_seed), manifest, sample_size, num_sampled
+        )
+    )
+
+
+def test_rounds_resume_sample(
+    client: FlaskClient,
+    election_id: str,
+    contest_ids: list[str],
+    round_1_id: str,
+    monkeypatch,
+):
+    # Drawing round 1 saves where the sampler left off
+    round_1_draws = SampledBallotDraw.query.filter_by(round_id=round_1_id).count()
+    sample_state = ContestSampleState.query.get((contest_ids[0], "all"))
+    assert sample_state.round_id == round_1_id
+    assert sample_state.state["num_drawn"] == round_1_draws
+    round_1_fingerprint = sample_state.state["fingerprint"]
+
+    full_draws = spy_on_full_sample_draws(monkeypatch)
+
+    run_audit_round(round_1_id, contest_ids[0], contest_ids, 0.5)
+    # The saved state tracks enough tickets to draw as many ballots as round 1
+    # without starting over
+    round_2_id = start_round_2_with_custom_sample_size(
+        client, election_id, contest_ids[0], round_1_draws
+    )
+
+    # Round 2 was drawn from the saved state, and matches a full redraw
+    assert full_draws == []
+    assert round_sample(round_2_id) == expected_round_sample(
+        election_id, contest_ids[0], round_1_draws, round_1_draws
+    )
+
+    db_session.expire_all()
+    sample_state = ContestSampleState.query.get((contest_ids[0], "all"))
+    assert sample_state.round_id == round_2_id
+    assert sample_state.state["num_drawn"] == 2 * round_1_draws
+    assert sample_state.state["fingerprint"] == round_1_fingerprint
+
+
+def test_rounds_resume_sample_manifest_changed(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: list[str],
+    contest_ids: list[str],
+    round_1_id: str,
+    monkeypatch,
+):
+    round_1_draws = SampledBallotDraw.query.filter_by(round_id=round_1_id).count()
+    round_1_fingerprint = ContestSampleState.query.get((contest_ids[0], "all")).state[
+        "fingerprint"
+    ]
+
+    full_draws = spy_on_full_sample_draws(monkeypatch)
+
+    # Change the manifest, so the saved state no longer applies
+    batch = Batch.query.filter_by(jurisdiction_id=jurisdiction_ids[0], name="4").one()
+    batch.num_ballots += 1
+    db_session.commit()
+
+    run_audit_round(round_1_id, contest_ids[0], contest_ids, 0.5)
+    round_2_id = start_round_2_with_custom_sample_size(
+        client, election_id, contest_ids[0], round_1_draws
+    )
+
+    # Round 2 was drawn from scratch, including every ticket drawn in round 1
+    assert full_draws == [4 * round_1_draws]
+    assert round_sample(round_2_id) == expected_round_sample(
+        election_id, contest_ids[0], round_1_draws, round_1_draws
+    )
+
+    db_session.expire_all()
+    sample_state = ContestSampleState.query.get((contest_ids[0], "all"))
+    assert sample_state.round_id == round_2_id
+    assert sample_state.state["num_drawn"] == 2 * round_1_draws
+    assert sample_state.state["fingerprint"] != round_1_fingerprint
+
+
 def test_rounds_complete_audit(
     client: FlaskClient,
     election_id: str,
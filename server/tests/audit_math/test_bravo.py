@@ -2,6 +2,7 @@ from decimal import Decimal
 import math
 from unittest.mock import patch
 import pytest
+from scipy import stats
 
 from ...audit_math import bravo
 from ...audit_math.sampler_contest import Contest
@@ -255,6 +256,38 @@ def test_bravo_sample_sizes_round1_incomplete():
     )
 
 
+def test_first_size_meeting_threshold():
+    # Compare against stepping through every size one at a time
+    def first_size_by_stepping(
+        start, total_ballots, p_completion, p_w2, plus, minus, threshold
+    ):
+        size = start
+        while size < total_ballots:
+            x_c = Decimal(stats.binom.ppf(1.0 - p_completion, size, float(p_w2)))
+            if x_c * plus + (size - x_c) * minus >= threshold:
+                break
+            size += 1
+        return size
+
+    for p_w, p_r, sample_w, sample_r, p_completion in [
+        (Decimal(0.52), Decimal(0.47), 0, 0, 0.9),
+        (Decimal(0.36), Decimal(0.32), 0, 0, 0.6),
+        (Decimal(0.4), Decimal(0.32), 0, 0, 0.4),
+        (Decimal(0.501), Decimal(0.499), 20, 30, 0.7),
+        (Decimal(0.6), Decimal(0.39), 100, 400, 0.9),
+    ]:
+        p_w2 = p_w / (p_w + p_r)
+        plus = (p_w2 / Decimal(0.5)).ln()
+        minus = ((1 - p_w2) / Decimal(0.5)).ln()
+        threshold = (1 / ALPHA).ln() - (sample_w * plus + sample_r * minus)
+        for start in [0, 100, 500]:
+            assert bravo.first_size_meeting_threshold(
+                start, 1000, p_completion, p_w2, plus, minus, threshold
+            ) == first_size_by_stepping(
+                start, 1000, p_completion, p_w2, plus, minus, threshold
+            )
+
+
 def test_get_sample_size(contests):
     for contest in contests:
         if contest in ["test3", "test4", "test9"]:
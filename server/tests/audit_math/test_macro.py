@@ -1281,3 +1281,60 @@ def test_runoff_exact_tie_threshold_returns_infinite_max_error():
     )
 
     assert max_err == Decimal("inf")
+
+
+@pytest.mark.parametrize(
+    "per_batch,is_subject_to_runoff",
+    [
+        ({"alice": 40, "bob": 35, "carla": 15, "dan": 10}, True),
+        ({"alice": 55, "bob": 25, "carla": 15, "dan": 5}, True),
+        ({"alice": 50, "bob": 30, "carla": 15, "dan": 5}, True),
+        ({"alice": 48, "bob": 25, "carla": 15, "dan": 12}, False),
+    ],
+)
+def test_contest_batch_errors_matches_max_error(per_batch, is_subject_to_runoff):
+    contest, batches = _runoff_fixtures(
+        per_batch, num_batches=20, is_subject_to_runoff=is_subject_to_runoff
+    )
+    # Vary the batches so they don't all have the same error, and include
+    # batches that don't have the contest and tallies that leave some ballots
+    # unauditable.
+    for i, batch_key in enumerate(list(batches)[:10]):
+        tallies = batches[batch_key]["runoff_contest"]
+        tallies["alice"] -= i
+        tallies["dan"] += i // 2
+    batches["Other-contest batch"] = {
+        "other_contest": {"x": 50, "y": 50, "ballots": 100},
+    }
+
+    batch_errors = macro.ContestBatchErrors(batches, contest)
+
+    unauditable_ballots = macro.compute_unauditable_ballots(batches, contest)
+    assert batch_errors.unauditable_ballots == unauditable_ballots
+    expected_U = Decimal(0.0)
+    for batch_key, batch_results in batches.items():
+        max_error = macro.compute_max_error(batch_results, contest, unauditable_ballots)
+        assert batch_errors.max_error(batch_key) == max_error
+        expected_U += max_error
+    assert batch_errors.U == expected_U
+    assert macro.compute_U(batches, contest) == expected_U
+
+
+def test_contest_batch_errors_cache():
+    contest, batches = _runoff_fixtures(
+        {"alice": 40, "bob": 35, "carla": 15, "dan": 10}, num_batches=10
+    )
+
+    assert macro.contest_batch_errors(batches, contest) is not (
+        macro.contest_batch_errors(batches, contest)
+    )
+
+    batch_errors = macro.contest_batch_errors(batches, contest, tallies_version=1)
+    assert macro.contest_batch_errors(batches, contest, 1) is batch_errors
+
+    # A new version of the tallies should be recomputed
+    batches["Batch 0"]["runoff_contest"]["alice"] -= 10
+    new_batch_errors = macro.contest_batch_errors(batches, contest, 2)
+    assert new_batch_errors is not batch_errors
+    assert new_batch_errors.U > batch_errors.U
+    assert new_batch_errors.U == macro.compute_U(batches, contest)
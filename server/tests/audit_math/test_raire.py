@@ -155,7 +155,7 @@ def test_find_assertions_infinite_to_expand(
     newn.estimate = np.inf
     newn.expandable = True
 
-    frontier.nodes.insert(0, newn)
+    frontier.insert_node(newn)
 
     assert not find_assertions(
         contest, ballots, nebs, asn_func, frontier, lowerbound, 0
@@ -210,7 +210,7 @@ def test_find_assertions_infinite_branch(
     newn.estimate = np.inf
     newn.expandable = True
 
-    frontier.nodes.insert(0, newn)
+    frontier.insert_node(newn)
 
     assert not find_assertions(
         contest, ballots, nebs, asn_func, frontier, lowerbound, 0
@@ -232,7 +232,7 @@ def test_find_assertions_many_children(
     newn.estimate = 0.0006
     newn.expandable = True
 
-    frontier.nodes.insert(0, newn)
+    frontier.insert_node(newn)
     assert find_assertions(contest, ballots, nebs, asn_func, frontier, lowerbound, 0)
 
 
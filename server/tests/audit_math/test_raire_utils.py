@@ -1,3 +1,5 @@
+from itertools import combinations
+import random
 from typing import Callable
 import pytest
 import numpy as np
@@ -61,6 +63,58 @@ def test_vote_for_eliminated_cand():
     assert raire_utils.vote_for_cand(cand, eliminated, ballot) == 0
 
 
+def test_ranked_ballots_tallies():
+    contest = Contest(
+        "Contest A",
+        {
+            "A": 3,
+            "B": 2,
+            "C": 1,
+            "D": 0,
+            "ballots": 7,
+            "numWinners": 1,
+            "votesAllowed": 1,
+        },
+    )
+    ballots = [
+        {"A": 1, "B": 2, "C": 3},
+        {"A": 1, "B": 2, "C": 3},
+        {"A": 1, "C": 2},
+        {"B": 1, "A": 0, "D": 2},
+        {"B": 1, "C": 1},  # Tied ranking
+        {"C": 1, "A": 3, "B": 2},
+        {},
+    ]
+    ranked_ballots = raire_utils.RankedBallots(contest, ballots)
+
+    # Identical rankings are collapsed
+    assert len(ranked_ballots.weights) == 6
+    assert ranked_ballots.weights.sum() == len(ballots)
+
+    for num_eliminated in range(len(contest.candidates) + 1):
+        for eliminated in combinations(contest.candidates, num_eliminated):
+            assert ranked_ballots.tallies(set(eliminated)) == {
+                cand: sum(
+                    raire_utils.vote_for_cand(cand, set(eliminated), ballot)
+                    for ballot in ballots
+                )
+                for cand in contest.candidates
+            }
+
+    first_preferences, loser_tallies = ranked_ballots.neb_tallies()
+    for i, winner in enumerate(contest.candidates):
+        for j, loser in enumerate(contest.candidates):
+            neb = NEBAssertion("Contest A", winner, loser)
+            cvrs = [{"Contest A": ballot} for ballot in ballots]
+            assert first_preferences[i] == sum(
+                neb.is_vote_for_winner(cvr) for cvr in cvrs
+            )
+            if winner != loser:
+                assert loser_tallies[i, j] == sum(
+                    neb.is_vote_for_loser(cvr) for cvr in cvrs
+                )
+
+
 def test_raire_assertion_comparator():
     contest = Contest(
         "Contest A",
@@ -321,6 +375,62 @@ def test_raire_frontier():
     assert str(other) == str([node3, node3])
 
 
+def test_raire_frontier_matches_list_order():
+    # Compare against the frontier as a single list
+    class ListFrontier:
+        def __init__(self):
+            self.nodes = []
+
+        def insert_node(self, node):
+            if not node.expandable:
+                self.nodes.append(node)
+            elif node.estimate == np.inf:
+                self.nodes.insert(0, node)
+            else:
+                i = 0
+                while i < len(self.nodes) and self.nodes[i].estimate > node.estimate:
+                    i += 1
+                self.nodes.insert(i, node)
+
+        def replace_descendents(self, node):
+            self.nodes = [
+                other for other in self.nodes if not other.is_descendent_of(node)
+            ]
+            self.insert_node(node)
+
+    rand = random.Random(12345)
+    candidates = ["a", "b", "c", "d", "e"]
+    frontier = raire_utils.RaireFrontier()
+    frontier.BLOCK_SIZE = 2
+    expected = ListFrontier()
+    for _ in range(1000):
+        action = rand.random()
+        if action < 0.6:
+            tail = rand.sample(candidates, rand.randint(1, len(candidates)))
+            node = raire_utils.RaireNode(tail)
+            node.expandable = len(tail) < len(candidates) and rand.random() < 0.8
+            node.estimate = rand.choice([np.inf, rand.randint(1, 10)])
+            frontier.insert_node(node)
+            expected.insert_node(node)
+        elif action < 0.8 and expected.nodes:
+            node = rand.choice(expected.nodes)
+            frontier.replace_descendents(node)
+            expected.replace_descendents(node)
+        elif expected.nodes:
+            assert frontier.first() is expected.nodes[0]
+            assert frontier.pop_first() is expected.nodes.pop(0)
+
+        assert frontier.nodes == expected.nodes
+        assert all(
+            node is expected_node
+            for node, expected_node in zip(frontier.nodes, expected.nodes)
+        )
+        if expected.nodes:
+            assert frontier.max_estimate() == max(
+                node.estimate for node in expected.nodes
+            )
+
+
 def test_find_best_audit_simple():
     contest = Contest(
         "Contest A",
@@ -1,5 +1,7 @@
+import json
 import random
 import pytest
+import consistent_sampler
 from ...audit_math import sampler
 from ...audit_math.sampler_contest import Contest
 
@@ -106,6 +108,73 @@ def test_draw_more_samples(snapshot):
     snapshot.assert_match(sample)
 
 
+def test_draw_sample_matches_consistent_sampler():
+    manifest = {
+        ("J1", "pct 1"): range(1, 101),
+        ("J1", "pct 2"): [3, 1, 2, 7],
+        ("J2", "pct 1"): range(1, 51),
+        ("J2", "pct 2"): [],
+    }
+    ballots = [
+        (batch, ballot_position)
+        for batch, ballot_positions in manifest.items()
+        for ballot_position in ballot_positions
+    ]
+
+    for with_replacement in [True, False]:
+        for sample_size, num_sampled in [(0, 0), (10, 0), (20, 30), (200, 0)]:
+            expected = list(
+                consistent_sampler.sampler(
+                    ballots,
+                    seed=SEED,
+                    take=sample_size + num_sampled,
+                    with_replacement=with_replacement,
+                    output="tuple",
+                    digits=18,
+                )
+            )[num_sampled:]
+            assert (
+                sampler.draw_sample(
+                    SEED, manifest, sample_size, num_sampled, with_replacement
+                )
+                == expected
+            )
+
+
+def test_draw_sample_resumable():
+    manifest = {
+        ("J1", "pct 1"): range(1, 101),
+        ("J1", "pct 2"): [3, 1, 2, 7],
+        ("J2", "pct 1"): range(1, 51),
+    }
+
+    for with_replacement in [True, False]:
+        state = None
+        num_sampled = 0
+        for sample_size in [10, 5, 20, 0, 200]:
+            sample, state = sampler.draw_sample_resumable(
+                SEED,
+                manifest,
+                sample_size,
+                num_sampled,
+                with_replacement,
+                # Simulate saving the state as JSON in the db
+                previous_state=json.loads(json.dumps(state)),
+            )
+            assert sample == sampler.draw_sample(
+                SEED, manifest, sample_size, num_sampled, with_replacement
+            )
+            num_sampled += sample_size
+
+    # Mismatched states are ignored
+    _, state = sampler.draw_sample_resumable(SEED, manifest, 10)
+    for seed, num_sampled in [(SEED, 5), ("other seed", 10)]:
+        sample, _ = sampler.draw_sample_resumable(
+            seed, manifest, 10, num_sampled, previous_state=state
+        )
+        assert sample == sampler.draw_sample(seed, manifest, 10, num_sampled)
+
+
 def test_draw_macro_sample(macro_batches, macro_contest, snapshot):
     # Test getting a sample
     sample = sampler.draw_ppeb_sample(
@@ -1,5 +1,7 @@
 from decimal import Decimal
 from itertools import product
+import math
+import numpy as np
 import pytest
 
 
@@ -8,8 +10,11 @@ from ...audit_math.suite import (
     BallotPollingStratum,
     BallotComparisonStratum,
     compute_risk,
+    evaluate_wl_pairs,
+    falling_harmonic_sum,
     get_sample_size,
     HybridPair,
+    log_falling_factorial,
     maximize_fisher_combined_pvalue,
     try_n,
     misstatements,
@@ -1586,6 +1591,154 @@ def test_ess_misstatements():
     }
 
 
+def test_log_falling_factorial():
+    for x, n in [
+        (10, 0),
+        (10, 1),
+        (10, 10),
+        (1000, 37),
+        (123.456, 50),
+        (5e5 + 0.25, 300),
+    ]:
+        assert log_falling_factorial(x, n) == pytest.approx(
+            sum(math.log(x - i) for i in range(n)), rel=1e-9, abs=1e-9
+        )
+        assert falling_harmonic_sum(x, n) == pytest.approx(
+            sum(1 / (x - i) for i in range(n)), rel=1e-9, abs=1e-12
+        )
+
+
+def test_compute_pvalues_approximates_compute_pvalue():
+    bp_stratum = BallotPollingStratum(
+        10000,
+        {"winner": 5000, "loser": 4000},
+        {"round1": {"winner": 30, "loser": 20}, "round2": {"winner": 12, "loser": 9}},
+        80,
+    )
+    cvr_stratum = BallotComparisonStratum(
+        20000,
+        {"winner": 11000, "loser": 8000},
+        {("winner", "loser"): {"o1": 2, "o2": 1, "u1": 1, "u2": 0}},
+        100,
+    )
+    reported_margin = 4000
+    null_lambdas = np.linspace(-3, 3, 61)
+
+    for stratum in [bp_stratum, cvr_stratum]:
+        pvalues = stratum.compute_pvalues(
+            reported_margin, "winner", "loser", null_lambdas
+        )
+        assert list(pvalues) == pytest.approx(
+            [
+                stratum.compute_pvalue(reported_margin, "winner", "loser", null_lambda)
+                for null_lambda in null_lambdas
+            ],
+            rel=1e-8,
+        )
+        assert np.all((pvalues >= 0) & (pvalues <= 1))
+
+
+def multi_winner_strata():
+    contest = Contest(
+        "ex1",
+        {
+            "winner1": 400,
+            "winner2": 350,
+            "loser1": 150,
+            "loser2": 150,
+            "loser3": 100,
+            "ballots": 1200,
+            "numWinners": 2,
+            "votesAllowed": 2,
+        },
+    )
+    no_misstatements = {"o1": 0, "o2": 0, "u1": 0, "u2": 0}
+    cvr_stratum = BallotComparisonStratum(
+        800,
+        {"winner1": 270, "winner2": 230, "loser1": 100, "loser2": 100, "loser3": 60},
+        {
+            (winner, loser): dict(no_misstatements)
+            for winner, loser in product(contest.winners, contest.losers)
+        },
+        sample_size=0,
+    )
+    bp_stratum = BallotPollingStratum(
+        400,
+        {"winner1": 130, "winner2": 120, "loser1": 50, "loser2": 50, "loser3": 40},
+        {},
+        sample_size=0,
+    )
+    return contest, bp_stratum, cvr_stratum
+
+
+def test_evaluate_wl_pairs_dedupes_equivalent_pairs():
+    contest, bp_stratum, cvr_stratum = multi_winner_strata()
+    evaluated = []
+
+    def evaluate_pair(winner, loser):
+        evaluated.append((winner, loser))
+        return contest.candidates[winner] - contest.candidates[loser]
+
+    results = evaluate_wl_pairs(
+        evaluate_pair,
+        contest,
+        bp_stratum,
+        cvr_stratum,
+        is_max=lambda _: False,
+        max_workers=1,
+    )
+
+    # loser1 and loser2 have identical vote totals in each stratum, so only one
+    # of them needs to be evaluated
+    assert evaluated == [
+        ("winner1", "loser1"),
+        ("winner1", "loser3"),
+        ("winner2", "loser1"),
+        ("winner2", "loser3"),
+    ]
+    assert results == [250, 250, 300, 200, 200, 250]
+
+
+def test_evaluate_wl_pairs_stops_at_max():
+    contest, bp_stratum, cvr_stratum = multi_winner_strata()
+    evaluated = []
+
+    def evaluate_pair(winner, loser):
+        evaluated.append((winner, loser))
+        return contest.candidates[winner] - contest.candidates[loser]
+
+    results = evaluate_wl_pairs(
+        evaluate_pair,
+        contest,
+        bp_stratum,
+        cvr_stratum,
+        is_max=lambda margin: margin >= 300,
+        max_workers=1,
+    )
+
+    assert evaluated == [("winner1", "loser1"), ("winner1", "loser3")]
+    assert results == [250, 250, 300]
+
+
+def test_parallel_matches_sequential():
+    contest, bp_stratum, cvr_stratum = multi_winner_strata()
+
+    sequential_size = get_sample_size(5, contest, bp_stratum, cvr_stratum)
+    parallel_size = get_sample_size(5, contest, bp_stratum, cvr_stratum, max_workers=2)
+    assert sequential_size == parallel_size
+
+    cvr_stratum.sample_size = sequential_size.cvr
+    cvr_stratum.misstatements[("winner2", "loser3")]["o1"] = 1
+    bp_stratum.sample = {
+        "round1": {"winner1": 10, "winner2": 9, "loser1": 4, "loser2": 3, "loser3": 2}
+    }
+    bp_stratum.sample_size = sequential_size.non_cvr
+
+    assert compute_risk(5, contest, bp_stratum, cvr_stratum) == compute_risk(
+        5, contest, bp_stratum, cvr_stratum, max_workers=2
+    )
+
+
 expected_p_values = {
     "no_discrepancies": {
         "Contest A": 0.06507,
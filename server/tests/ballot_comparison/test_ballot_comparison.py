@@ -4,8 +4,10 @@ import csv
 from flask.testing import FlaskClient
 from sqlalchemy import and_
 
+from ...api import reports
 from ...models import *
 from ..helpers import *
+from ...util.cvr_interpretations import unpack_interpretations
 from .conftest import (
     TEST_CVRS,
     TEST_CVRS_WITH_CHOICE_REMOVED,
@@ -1003,6 +1005,144 @@ def test_ballot_comparison_two_rounds(
     check_discrepancies(discrepancy_report, round_2_audit_results)
 
 
+def test_ballot_comparison_report_multiple_rounds(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: list[str],
+    election_settings,
+    manifests,
+    cvrs,
+    monkeypatch,
+):
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+    target_contest_id = str(uuid.uuid4())
+    opportunistic_contest_id = str(uuid.uuid4())
+    rv = put_json(
+        client,
+        f"/api/election/{election_id}/contest",
+        [
+            {
+                "id": target_contest_id,
+                "name": "Contest 1",
+                "numWinners": 1,
+                "jurisdictionIds": jurisdiction_ids[:2],
+                "isTargeted": True,
+            },
+            {
+                "id": opportunistic_contest_id,
+                "name": "Contest 2",
+                "numWinners": 1,
+                "jurisdictionIds": jurisdiction_ids[:2],
+                "isTargeted": False,
+            },
+        ],
+    )
+    assert_ok(rv)
+
+    def run_round(round_num: int, sample_size) -> str:
+        set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+        rv = post_json(
+            client,
+            f"/api/election/{election_id}/round",
+            {"roundNum": round_num, "sampleSizes": {target_contest_id: sample_size}},
+        )
+        assert_ok(rv)
+        rv = client.get(f"/api/election/{election_id}/round")
+        round_id = json.loads(rv.data)["rounds"][round_num - 1]["id"]
+
+        set_logged_in_user(
+            client, UserType.JURISDICTION_ADMIN, default_ja_email(election_id)
+        )
+        for jurisdiction_id in jurisdiction_ids[:2]:
+            rv = post_json(
+                client,
+                f"/api/election/{election_id}/jurisdiction/{jurisdiction_id}/round/{round_id}/audit-board",
+                [{"name": "Audit Board #1"}],
+            )
+            assert_ok(rv)
+        return round_id
+
+    def finish_round(round_id: str):
+        for audit_board in AuditBoard.query.filter_by(round_id=round_id):
+            audit_board.signed_off_at = datetime.now(timezone.utc)
+        db_session.commit()
+        set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+        rv = client.post(f"/api/election/{election_id}/round/current/finish")
+        assert_ok(rv)
+
+    # Round 1 has the same sample and audit results as
+    # test_ballot_comparison_two_rounds, which aren't enough to finish the audit
+    rv = client.get(f"/api/election/{election_id}/sample-sizes/1")
+    sample_size = json.loads(rv.data)["sampleSizes"][target_contest_id][0]
+    round_1_id = run_round(1, sample_size)
+    round_1_audit_results = {
+        ("J1", "TABULATOR1", "BATCH1", 1): ("0,1,1,1,0", (None, None)),
+        ("J1", "TABULATOR1", "BATCH2", 2): ("0,1,1,1,0", (None, None)),
+        ("J1", "TABULATOR1", "BATCH2", 3): ("1,1,0,1,1", (1, 2)),
+        ("J1", "TABULATOR2", "BATCH2", 2): ("1,1,1,1,1", (None, None)),
+        ("J1", "TABULATOR2", "BATCH2", 3): ("1,0,,,", (-1, 1)),
+        ("J1", "TABULATOR2", "BATCH2", 4): ("blank", (None, None)),
+        ("J1", "TABULATOR2", "BATCH2", 5): ("not on ballot", (None, 1)),
+        ("J1", "TABULATOR2", "BATCH2", 6): ("not found", (2, 2)),
+        ("J2", "TABULATOR1", "BATCH1", 1): ("1,0,1,0,0", (-2, -1)),
+        ("J2", "TABULATOR1", "BATCH1", 3): ("0,1,1,1,0", (None, None)),
+        ("J2", "TABULATOR1", "BATCH2", 1): ("1,0,1,0,1", (None, None)),
+        ("J2", "TABULATOR2", "BATCH1", 1): ("1,0,1,1,0", (None, None)),
+        ("J2", "TABULATOR2", "BATCH2", 1): ("1,0,1,0,1", (None, None)),
+        ("J2", "TABULATOR2", "BATCH2", 2): ("1,1,1,1,1", (None, None)),
+        ("J2", "TABULATOR2", "BATCH2", 3): (",,1,0,1", (None, None)),
+        ("J2", "TABULATOR2", "BATCH2", 5): (",,1,0,1", (None, None)),
+        ("J2", "TABULATOR2", "BATCH2", 6): ("1,0,1,0,1", (2, 2)),
+    }
+    audit_all_ballots(
+        round_1_id, round_1_audit_results, target_contest_id, opportunistic_contest_id
+    )
+    finish_round(round_1_id)
+
+    # Draw a large enough round 2 sample that both jurisdictions have newly
+    # sampled ballots, so each jurisdiction comes up again in the report
+    round_2_id = run_round(2, {"key": "custom", "size": 20, "prob": None})
+    round_2_ballots = (
+        SampledBallot.query.filter_by(status=BallotStatus.NOT_AUDITED)
+        .join(SampledBallotDraw)
+        .filter_by(round_id=round_2_id)
+        .join(Batch)
+        .all()
+    )
+    assert {ballot.batch.jurisdiction_id for ballot in round_2_ballots} == set(
+        jurisdiction_ids[:2]
+    )
+    for ballot in round_2_ballots:
+        ballot.status = BallotStatus.AUDITED
+        audit_ballot(ballot, target_contest_id, Interpretation.BLANK)
+        audit_ballot(ballot, opportunistic_contest_id, Interpretation.BLANK)
+    finish_round(round_2_id)
+
+    loaded_jurisdiction_ids = []
+    ballot_comparison_data = reports.ballot_comparison_data
+
+    def spy(election, jurisdiction):
+        loaded_jurisdiction_ids.append(jurisdiction.id)
+        return ballot_comparison_data(election, jurisdiction)
+
+    monkeypatch.setattr(reports, "ballot_comparison_data", spy)
+
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+    rv = client.get(f"/api/election/{election_id}/discrepancy-report")
+    discrepancy_report = rv.data.decode("utf-8")
+
+    # Each jurisdiction's comparison data is only loaded once for the report
+    assert sorted(loaded_jurisdiction_ids) == sorted(jurisdiction_ids[:2])
+    check_discrepancies(discrepancy_report, round_1_audit_results)
+
+    # The report should be the same as if we reloaded the comparison data for
+    # every ballot
+    monkeypatch.setattr(reports, "BALLOT_COMPARISON_DATA_CACHE_SIZE", 0)
+    rv = client.get(f"/api/election/{election_id}/discrepancy-report")
+    assert rv.data.decode("utf-8") == discrepancy_report
+    assert len(loaded_jurisdiction_ids) > 2 * len(jurisdiction_ids[:2])
+
+
 # This function can be used to generate the correct audit results in case you
 # need to update the above test case.
 def generate_audit_results(round_id: str):  # pragma: no cover
@@ -1039,7 +1179,10 @@ def generate_audit_results(round_id: str):  # pragma: no cover
 
     print(
         {
-            ballot_key(ballot): (cvr.interpretations if cvr else "no cvr", (None, None))
+            ballot_key(ballot): (
+                unpack_interpretations(cvr.packed_interpretations) if cvr else "no cvr",
+                (None, None),
+            )
             for ballot, cvr in ballots_and_cvrs
         }
     )
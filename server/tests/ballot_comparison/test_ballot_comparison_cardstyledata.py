@@ -9,6 +9,7 @@ from server.tests.ballot_comparison.test_ballot_comparison import (
     check_discrepancies,
 )
 
+from ...api.cvrs import cvr_batch_contest_ballot_positions
 from ...models import *
 from ..helpers import *
 from .conftest import (
@@ -438,3 +439,81 @@ def test_ballot_comparison_cardstyledata_two_rounds(
         == audit_report.split("######## SAMPLED BALLOTS ########\r\n")[1]
     )
     check_discrepancies(discrepancy_report, round_2_audit_results)
+
+
+@pytest.mark.parametrize(
+    "election_id",
+    [{"audit_math_type": AuditMathType.CARD_STYLE_DATA}],
+    indirect=True,
+)
+def test_ballot_comparison_cardstyledata_standardized_contest_name(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: list[str],
+    election_settings,
+    manifests,
+    cvrs,
+):
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+    contest_id = str(uuid.uuid4())
+    rv = put_json(
+        client,
+        f"/api/election/{election_id}/contest",
+        [
+            {
+                "id": contest_id,
+                "name": "Standardized Contest 1",
+                "numWinners": 1,
+                "jurisdictionIds": jurisdiction_ids[:2],
+                "isTargeted": True,
+            },
+        ],
+    )
+    assert_ok(rv)
+
+    rv = put_json(
+        client,
+        f"/api/election/{election_id}/contest/standardizations",
+        {
+            jurisdiction_ids[0]: {"Standardized Contest 1": "Contest 1"},
+            jurisdiction_ids[1]: {"Standardized Contest 1": "Contest 1"},
+        },
+    )
+    assert_ok(rv)
+
+    rv = client.get(f"/api/election/{election_id}/sample-sizes/1")
+    response = json.loads(rv.data)
+    assert response["task"]["status"] == "PROCESSED"
+    sample_size = response["sampleSizes"][contest_id][0]
+
+    rv = post_json(
+        client,
+        f"/api/election/{election_id}/round",
+        {"roundNum": 1, "sampleSizes": {contest_id: sample_size}},
+    )
+    assert_ok(rv)
+
+    # The sample should be drawn only from ballots that have the contest (as
+    # named in the CVR)
+    ballots_with_contest = {
+        (batch_id, ballot_position)
+        for batch_id, ballot_positions in CvrBatchContestBallots.query.filter_by(
+            contest_name="Contest 1"
+        ).with_entities(
+            CvrBatchContestBallots.batch_id, CvrBatchContestBallots.ballot_positions
+        )
+        for ballot_position in cvr_batch_contest_ballot_positions(ballot_positions)
+    }
+    sampled_ballots = (
+        SampledBallot.query.join(Batch)
+        .filter(Batch.jurisdiction_id.in_(jurisdiction_ids[:2]))
+        .with_entities(
+            Batch.jurisdiction_id,
+            SampledBallot.batch_id,
+            SampledBallot.ballot_position,
+        )
+        .all()
+    )
+    assert len(sampled_ballots) > 0
+    for _, batch_id, ballot_position in sampled_ballots:
+        assert (batch_id, ballot_position) in ballots_with_contest
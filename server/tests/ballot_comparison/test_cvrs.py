@@ -1,10 +1,13 @@
 import io
 import json
 from typing import TypedDict
+import pytest
 from flask.testing import FlaskClient
 
 from ...models import *
 from ..helpers import *
+from ...api import cvrs as cvrs_module
+from ...util.cvr_interpretations import unpack_interpretations
 from .conftest import TEST_CVRS
 
 
@@ -75,6 +78,8 @@ def test_dominion_cvr_upload(
         .all()
     )
     assert len(cvr_ballots) == manifest_num_ballots - 1
+    # New CVR ballots only store the packed interpretations
+    assert all(cvr.interpretations is None for cvr in cvr_ballots)
     snapshot.assert_match(
         [
             dict(
@@ -82,7 +87,7 @@ def test_dominion_cvr_upload(
                 tabulator=cvr.batch.tabulator,
                 ballot_position=cvr.ballot_position,
                 imprinted_id=cvr.imprinted_id,
-                interpretations=cvr.interpretations,
+                interpretations=unpack_interpretations(cvr.packed_interpretations),
             )
             for cvr in cvr_ballots
         ]
@@ -125,6 +130,91 @@ def test_dominion_cvr_upload(
     assert rv.data == TEST_CVRS.encode()
 
 
+def test_dominion_cvr_upload_unsorted(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: list[str],
+    manifests,
+    monkeypatch,
+):
+    sorted_calls = []
+    assign_ballot_positions = cvrs_module.assign_ballot_positions
+
+    def spy_assign_ballot_positions(rows):
+        sorted_calls.append(True)
+        return assign_ballot_positions(rows)
+
+    monkeypatch.setattr(
+        cvrs_module, "assign_ballot_positions", spy_assign_ballot_positions
+    )
+
+    set_logged_in_user(
+        client, UserType.JURISDICTION_ADMIN, default_ja_email(election_id)
+    )
+
+    def upload_and_get_cvr_ballots(cvrs: str):
+        rv = upload_cvrs(
+            client,
+            io.BytesIO(cvrs.encode()),
+            election_id,
+            jurisdiction_ids[0],
+            "DOMINION",
+        )
+        assert_ok(rv)
+
+        rv = client.get(
+            f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/cvrs"
+        )
+        processing = json.loads(rv.data)["processing"]
+        assert processing["status"] == ProcessingStatus.PROCESSED, processing
+
+        cvr_ballots = [
+            (
+                cvr.batch.tabulator,
+                cvr.batch.name,
+                cvr.record_id,
+                cvr.ballot_position,
+                unpack_interpretations(cvr.packed_interpretations),
+            )
+            for cvr in CvrBallot.query.join(Batch)
+            .filter_by(jurisdiction_id=jurisdiction_ids[0])
+            .order_by(CvrBallot.imprinted_id)
+        ]
+        contest_ballots = sorted(
+            CvrBatchContestBallots.query.join(Batch)
+            .filter_by(jurisdiction_id=jurisdiction_ids[0])
+            .with_entities(
+                Batch.tabulator,
+                Batch.name,
+                CvrBatchContestBallots.contest_name,
+                CvrBatchContestBallots.ballot_positions,
+            )
+            .all()
+        )
+        contests_metadata = Jurisdiction.query.get(
+            jurisdiction_ids[0]
+        ).cvr_contests_metadata
+        return cvr_ballots, contest_ballots, contests_metadata
+
+    # Rows grouped by batch in record_id order are streamed straight to the db
+    expected = upload_and_get_cvr_ballots(TEST_CVRS)
+    assert len(expected[0]) > 0
+    assert sorted_calls == []
+
+    # Otherwise, we start over and sort the rows first
+    header_lines = TEST_CVRS.splitlines()[:4]
+    ballot_lines = TEST_CVRS.splitlines()[4:]
+    for unsorted_ballot_lines in [
+        # A batch reappears
+        ballot_lines[1:] + ballot_lines[:1],
+        # A record_id goes backwards
+        [ballot_lines[1], ballot_lines[0], *ballot_lines[2:]],
+    ]:
+        unsorted_cvrs = "\n".join([*header_lines, *unsorted_ballot_lines]) + "\n"
+        assert upload_and_get_cvr_ballots(unsorted_cvrs) == expected
+    assert sorted_calls == [True, True]
+
+
 COUNTING_GROUP_CVR = """Test Audit CVR Upload,5.2.16.1,,,,,,,,,,
 ,,,,,,,,Contest 1 (Vote For=1),Contest 1 (Vote For=1),Contest 2 (Vote For=2),Contest 2 (Vote For=2),Contest 2 (Vote For=2)
 ,,,,,,,,Choice 1-1,Choice 1-2,Choice 2-1,Choice 2-2,Choice 2-3
@@ -210,7 +300,7 @@ def test_cvrs_counting_group(
                 tabulator=cvr.batch.tabulator,
                 ballot_position=cvr.ballot_position,
                 imprinted_id=cvr.imprinted_id,
-                interpretations=cvr.interpretations,
+                interpretations=unpack_interpretations(cvr.packed_interpretations),
             )
             for cvr in cvr_ballots
         ]
@@ -305,7 +395,7 @@ def test_dominion_cvr_unique_voting_identifier(
                 tabulator=cvr.batch.tabulator,
                 ballot_position=cvr.ballot_position,
                 imprinted_id=cvr.imprinted_id,
-                interpretations=cvr.interpretations,
+                interpretations=unpack_interpretations(cvr.packed_interpretations),
             )
             for cvr in cvr_ballots
         ]
@@ -707,7 +797,7 @@ def test_cvrs_newlines(
                 tabulator=cvr.batch.tabulator,
                 ballot_position=cvr.ballot_position,
                 imprinted_id=cvr.imprinted_id,
-                interpretations=cvr.interpretations,
+                interpretations=unpack_interpretations(cvr.packed_interpretations),
             )
             for cvr in cvr_ballots
         ]
@@ -1247,7 +1337,7 @@ def test_clearballot_cvr_upload(
                 tabulator=cvr.batch.tabulator,
                 ballot_position=cvr.ballot_position,
                 imprinted_id=cvr.imprinted_id,
-                interpretations=cvr.interpretations,
+                interpretations=unpack_interpretations(cvr.packed_interpretations),
             )
             for cvr in cvr_ballots
         ]
@@ -1521,7 +1611,7 @@ def test_ess_cvr_upload(
                     tabulator=cvr.batch.tabulator,
                     ballot_position=cvr.ballot_position,
                     imprinted_id=cvr.imprinted_id,
-                    interpretations=cvr.interpretations,
+                    interpretations=unpack_interpretations(cvr.packed_interpretations),
                 )
                 for cvr in cvr_ballots
             ]
@@ -1770,6 +1860,27 @@ def test_ess_cvr_upload_invalid(
             ],
             "ess_cvr.csv: Missing required column Cast Vote Record.",
         ),
+        (
+            [
+                (
+                    io.BytesIO(ESS_BALLOTS_1.encode()),
+                    "ess_ballots_1.csv",
+                ),
+                (
+                    io.BytesIO(
+                        replace_line(
+                            ESS_CVR, 2, "X2,p,bs,Choice 1-1,Choice 2-1"
+                        ).encode()
+                    ),
+                    "ess_cvr.csv",
+                ),
+                (
+                    io.BytesIO(ESS_BALLOTS_2.encode()),
+                    "ess_ballots_2.csv",
+                ),
+            ],
+            "ess_cvr.csv: Cast Vote Record should be a number. Got X2 in row 2.",
+        ),
         (
             [
                 (
@@ -1860,6 +1971,88 @@ def test_ess_cvr_upload_invalid(
         )
 
 
+def test_ess_cvr_upload_unsorted(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: list[str],
+    ess_manifests,
+):
+    # The CVR file isn't sorted by Cast Vote Record, and the ballots files
+    # overlap, so they have to be merged rather than concatenated
+    cvr_header, *cvr_rows = ESS_CVR.splitlines()
+    unsorted_cvr = "\n".join([cvr_header, *reversed(cvr_rows)])
+    ballots_header, *ballots_rows = ESS_BALLOTS_WITH_NO_METADATA_ROWS.splitlines()
+    odd_ballots = "\n".join([ballots_header, *ballots_rows[::2]])
+    even_ballots = "\n".join([ballots_header, *reversed(ballots_rows[1::2])])
+
+    set_logged_in_user(
+        client, UserType.JURISDICTION_ADMIN, default_ja_email(election_id)
+    )
+
+    def upload_and_get_cvr_ballots(cvrs):
+        rv = upload_cvrs(
+            client,
+            zip_cvrs(cvrs),
+            election_id,
+            jurisdiction_ids[0],
+            "ESS",
+            "application/zip",
+        )
+        assert_ok(rv)
+
+        rv = client.get(
+            f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/cvrs"
+        )
+        processing = json.loads(rv.data)["processing"]
+        assert processing["status"] == ProcessingStatus.PROCESSED, processing
+
+        return [
+            (
+                cvr.batch.tabulator,
+                cvr.batch.name,
+                cvr.record_id,
+                cvr.imprinted_id,
+                unpack_interpretations(cvr.packed_interpretations),
+            )
+            for cvr in CvrBallot.query.join(Batch)
+            .filter_by(jurisdiction_id=jurisdiction_ids[0])
+            .order_by(CvrBallot.imprinted_id)
+        ]
+
+    expected_cvr_ballots = upload_and_get_cvr_ballots(
+        [
+            (io.BytesIO(ESS_CVR.encode()), "ess_cvr.csv"),
+            (io.BytesIO(ESS_BALLOTS_1.encode()), "ess_ballots_1.csv"),
+            (io.BytesIO(ESS_BALLOTS_2.encode()), "ess_ballots_2.csv"),
+        ]
+    )
+    assert len(expected_cvr_ballots) > 0
+
+    assert (
+        upload_and_get_cvr_ballots(
+            [
+                (io.BytesIO(unsorted_cvr.encode()), "ess_cvr.csv"),
+                (io.BytesIO(odd_ballots.encode()), "ess_ballots_1.csv"),
+                (io.BytesIO(even_ballots.encode()), "ess_ballots_2.csv"),
+            ]
+        )
+        == expected_cvr_ballots
+    )
+
+
+def test_sort_by_cvr_number():
+    from ...api.cvrs import sort_by_cvr_number
+
+    rows = [
+        (str(cvr_number), index)
+        for index, cvr_number in enumerate([5, 3, 12, 3, 1, 8, 5, 5, 2, 10, 1, 7])
+    ]
+    expected = sorted(rows, key=lambda row: int(row[0]))
+    for run_size in [1, 2, 3, 5, 100]:
+        assert list(sort_by_cvr_number(rows, run_size=run_size)) == expected
+    assert list(sort_by_cvr_number([])) == []
+
+
 def test_ess_cvr_upload_cvr_file_with_tabulator_cvr_column(
     client: FlaskClient,
     election_id: str,
@@ -1970,7 +2163,7 @@ def test_ess_cvr_upload_cvr_file_with_tabulator_cvr_column(
                 tabulator=cvr.batch.tabulator,
                 ballot_position=cvr.ballot_position,
                 imprinted_id=cvr.imprinted_id,
-                interpretations=cvr.interpretations,
+                interpretations=unpack_interpretations(cvr.packed_interpretations),
             )
             for cvr in cvr_ballots
         ]
@@ -2228,7 +2421,7 @@ def test_hart_cvr_upload(
                 tabulator=cvr.batch.tabulator,
                 ballot_position=cvr.ballot_position,
                 imprinted_id=cvr.imprinted_id,
-                interpretations=cvr.interpretations,
+                interpretations=unpack_interpretations(cvr.packed_interpretations),
             )
             for cvr in cvr_ballots
         ]
@@ -2417,7 +2610,9 @@ def test_hart_cvr_upload_with_scanned_ballot_information(
                         tabulator=cvr.batch.tabulator,
                         ballot_position=cvr.ballot_position,
                         imprinted_id=cvr.imprinted_id,
-                        interpretations=cvr.interpretations,
+                        interpretations=unpack_interpretations(
+                            cvr.packed_interpretations
+                        ),
                     )
                     for cvr in cvr_ballots
                 ]
@@ -2583,7 +2778,9 @@ def test_hart_cvr_upload_with_duplicate_batch_names(
                         tabulator=cvr.batch.tabulator,
                         ballot_position=cvr.ballot_position,
                         imprinted_id=cvr.imprinted_id,
-                        interpretations=cvr.interpretations,
+                        interpretations=unpack_interpretations(
+                            cvr.packed_interpretations
+                        ),
                     )
                     for cvr in cvr_ballots
                 ]
@@ -3179,3 +3376,187 @@ def test_remove_ballot_manifest_fails_while_processing_cvr_file(
                 }
             ]
         }
+
+
+def test_assign_ballot_positions():
+    from ...api.cvrs import assign_ballot_positions
+
+    rows = [
+        ("batch-2", 3, "2-3", "1,0"),
+        ("batch-1", 10, "1-10", "0,1"),
+        ("batch-2", 1, "2-1", ""),
+        ("batch-1", 2, "1-2", '1,"0"'),
+        ("batch-3", 7, "3-7", "u,o"),
+        ("batch-1", 5, "1-5", "1,1"),
+        ("batch-2", 2, "2-2", "0,0"),
+    ]
+    expected = [
+        ("batch-1", 2, "1-2", '1,"0"', 1),
+        ("batch-1", 5, "1-5", "1,1", 2),
+        ("batch-1", 10, "1-10", "0,1", 3),
+        ("batch-2", 1, "2-1", "", 1),
+        ("batch-2", 2, "2-2", "0,0", 2),
+        ("batch-2", 3, "2-3", "1,0", 3),
+        ("batch-3", 7, "3-7", "u,o", 1),
+    ]
+
+    assert list(assign_ballot_positions(rows)) == expected
+    # Spill sorted chunks to disk and merge them
+    for max_rows_in_memory in [1, 2, 3]:
+        assert (
+            list(assign_ballot_positions(rows, max_rows_in_memory=max_rows_in_memory))
+            == expected
+        )
+    assert list(assign_ballot_positions([])) == []
+
+
+def test_stream_ballot_positions():
+    from ...api.cvrs import CvrBallotRowsNotSorted, stream_ballot_positions
+
+    rows = [
+        ("batch-2", 1, "2-1", ""),
+        ("batch-2", 2, "2-2", "0,0"),
+        ("batch-2", 2, "2-2b", "0,1"),
+        ("batch-1", 2, "1-2", '1,"0"'),
+        ("batch-1", 10, "1-10", "0,1"),
+        ("batch-3", 7, "3-7", "u,o"),
+    ]
+    assert list(stream_ballot_positions(rows)) == [
+        ("batch-2", 1, "2-1", "", 1),
+        ("batch-2", 2, "2-2", "0,0", 2),
+        ("batch-2", 2, "2-2b", "0,1", 3),
+        ("batch-1", 2, "1-2", '1,"0"', 1),
+        ("batch-1", 10, "1-10", "0,1", 2),
+        ("batch-3", 7, "3-7", "u,o", 1),
+    ]
+    assert list(stream_ballot_positions([])) == []
+
+    # Rows are streamed without reading ahead
+    def rows_then_error():
+        yield rows[0]
+        raise Exception("read too far")
+
+    assert next(stream_ballot_positions(rows_then_error())) == (*rows[0], 1)
+
+    # A batch reappears
+    with pytest.raises(CvrBallotRowsNotSorted):
+        list(stream_ballot_positions([*rows, ("batch-2", 3, "2-3", "")]))
+    # A record_id goes backwards
+    with pytest.raises(CvrBallotRowsNotSorted):
+        list(stream_ballot_positions([*rows, ("batch-3", 6, "3-6", "")]))
+
+
+def test_cvr_contest_tally():
+    from ...api.cvrs import CvrContestTally, tally_cvr_ballot
+
+    def contests_metadata():
+        return {
+            "Contest 1": dict(
+                choices={
+                    "Choice 1-1": dict(column=0, num_votes=0),
+                    "Choice 1-2": dict(column=1, num_votes=0),
+                },
+                votes_allowed=1,
+                total_ballots_cast=0,
+            ),
+            "Contest 2": dict(
+                choices={
+                    "Choice 2-1": dict(column=4, num_votes=0),
+                    "Choice 2-2": dict(column=2, num_votes=0),
+                    "Choice 2-3": dict(column=3, num_votes=0),
+                },
+                votes_allowed=2,
+                total_ballots_cast=0,
+            ),
+        }
+
+    ballots = [
+        "1,0,1,1,0",
+        "0,1,,,",
+        "1,1,0,1,0",  # Overvote in contest 1
+        ",,1,1,1",  # Overvote in contest 2
+        "o,u,0,0,1",  # ES&S overvote/undervote
+        "0,1,0,0,2",
+        ",,,,",
+        " 1,0,1,0,0",
+    ]
+
+    expected = contests_metadata()
+    for ballot in ballots:
+        tally_cvr_ballot(expected, ballot)
+    assert expected["Contest 1"]["total_ballots_cast"] == 6
+    assert expected["Contest 1"]["choices"]["Choice 1-1"]["num_votes"] == 2
+    assert expected["Contest 2"]["total_ballots_cast"] == 6
+
+    for chunk_size in [1, 3, 100]:
+        actual = contests_metadata()
+        tally = CvrContestTally(actual, chunk_size=chunk_size)
+        for ballot in ballots:
+            tally.add_ballot(ballot)
+        tally.flush()
+        assert actual == expected
+
+    # Unparseable values in contests that are tallied raise the same error
+    for ballots_with_error in [ballots + ["1,0,x,0,0"], ["1,0"] + ballots]:
+        tally = CvrContestTally(contests_metadata())
+        for ballot in ballots_with_error:
+            tally.add_ballot(ballot)
+        with pytest.raises(Exception) as error:
+            tally.flush()
+        with pytest.raises(Exception) as expected_error:
+            for ballot in ballots_with_error:
+                tally_cvr_ballot(contests_metadata(), ballot)
+        assert str(error.value) == str(expected_error.value)
+
+
+def test_cvr_batch_contest_ballots_indexer():
+    from ...api.cvrs import (
+        CvrBatchContestBallotsIndexer,
+        cvr_batch_contest_ballot_positions,
+    )
+
+    contests_metadata = {
+        "Contest 1": dict(
+            choices={
+                "Choice 1-1": dict(column=0, num_votes=0),
+                "Choice 1-2": dict(column=1, num_votes=0),
+            },
+            votes_allowed=1,
+            total_ballots_cast=0,
+        ),
+        "Contest 2": dict(
+            choices={
+                "Choice 2-1": dict(column=2, num_votes=0),
+                "Choice 2-2": dict(column=3, num_votes=0),
+            },
+            votes_allowed=1,
+            total_ballots_cast=0,
+        ),
+    }
+    ballots = [
+        ("batch-1", 1, "1,0,,"),
+        ("batch-1", 2, "0,0,0,1"),
+        ("batch-1", 3, ",,1,0"),
+        ("batch-1", 9, "o,u,,"),
+        ("batch-2", 1, ",,,"),
+        ("batch-2", 2, "0,,,"),
+        ("batch-3", 1, ",,0"),  # Short row
+    ]
+
+    for chunk_size in [1, 2, 100]:
+        indexer = CvrBatchContestBallotsIndexer(contests_metadata, chunk_size)
+        for batch_id, ballot_position, interpretations in ballots:
+            indexer.add_ballot(batch_id, ballot_position, interpretations)
+        indexer.flush()
+
+        assert {
+            (row["batch_id"], row["contest_name"]): cvr_batch_contest_ballot_positions(
+                row["ballot_positions"]
+            )
+            for row in indexer.index_rows
+        } == {
+            ("batch-1", "Contest 1"): [1, 2, 9],
+            ("batch-1", "Contest 2"): [2, 3],
+            ("batch-2", "Contest 1"): [2],
+            ("batch-3", "Contest 2"): [1],
+        }
@@ -1,7 +1,9 @@
+import numpy as np
 import pytest
 from flask.testing import FlaskClient
 from ..helpers import *
 from ...models import BatchInventoryData
+from ...api import batch_inventory
 from ..ballot_comparison.test_cvrs import (
     ESS_BALLOTS_1,
     ESS_BALLOTS_2,
@@ -2222,6 +2224,52 @@ def test_batch_inventory_hart_cvr_upload_collapses_whitespace_in_names(
     )
 
 
+def test_batch_inventory_hart_cvr_upload_missing_batch(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: list[str],
+    contest_id: str,
+):
+    set_logged_in_user(
+        client, UserType.JURISDICTION_ADMIN, default_ja_email(election_id)
+    )
+    rv = put_json(
+        client,
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/batch-inventory/system-type",
+        {"systemType": CvrFileType.HART},
+    )
+    assert_ok(rv)
+
+    # A CVR missing its batch should be reported before an invalid CVR in a
+    # later file
+    hart_cvrs = [
+        build_hart_cvr("BATCH1", "1", "1-1-1", "1,0,0,0,0"),
+        re.sub(
+            r"<PrecinctSplit>.*</PrecinctSplit>|<BatchNumber>.*</BatchNumber>",
+            "",
+            build_hart_cvr("BATCH1", "2", "1-1-2", "0,1,0,0,0"),
+            flags=re.DOTALL,
+        ),
+        "not valid XML",
+    ]
+    hart_zip = zip_hart_cvrs(hart_cvrs)
+
+    rv = upload_batch_inventory_cvr(
+        client, hart_zip, election_id, jurisdiction_ids[0], "application/zip"
+    )
+    assert_ok(rv)
+
+    rv = client.get(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/batch-inventory/cvr"
+    )
+    cvr = json.loads(rv.data)
+    assert cvr["processing"]["status"] == ProcessingStatus.ERRORED
+    assert (
+        cvr["processing"]["error"]
+        == "Could not find batch number or precinct name in CVR file."
+    )
+
+
 def test_batch_inventory_hart_cvr_upload_multi_contest(
     client: FlaskClient,
     election_id: str,
@@ -2779,3 +2827,153 @@ def test_batch_inventory_ess_cvr_upload_multi_contest(
             },
         },
     )
+
+
+def test_batch_inventory_cvr_upload_error_row_number_after_first_chunk(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: list[str],
+    contest_id: str,
+    monkeypatch,
+):
+    # Parse CVRs in small chunks so the invalid rows are past the first chunk
+    monkeypatch.setattr(batch_inventory, "BATCH_INVENTORY_CHUNK_SIZE", 5)
+
+    set_logged_in_user(
+        client, UserType.JURISDICTION_ADMIN, default_ja_email(election_id)
+    )
+
+    invalid_cvrs = [
+        (
+            CvrFileType.DOMINION,
+            io.BytesIO(TEST_CVR.replace("\n8,TABULATOR2", "\n,TABULATOR2").encode()),
+            "text/csv",
+            "Missing required column CvrNumber in row 8.",
+        ),
+        (
+            CvrFileType.ESS,
+            zip_cvrs(
+                [
+                    (
+                        io.BytesIO(ESS_CVR.replace("\n10,p", "\n,p").encode()),
+                        "ess_cvr.csv",
+                    ),
+                    (io.BytesIO(ESS_BALLOTS_1.encode()), "ess_ballots_1.csv"),
+                    (io.BytesIO(ESS_BALLOTS_2.encode()), "ess_ballots_2.csv"),
+                ]
+            ),
+            "application/zip",
+            "Missing required column Cast Vote Record in row 10.",
+        ),
+    ]
+    for system_type, invalid_cvr, file_type, expected_error in invalid_cvrs:
+        rv = put_json(
+            client,
+            f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/batch-inventory/system-type",
+            {"systemType": system_type},
+        )
+        assert_ok(rv)
+
+        rv = upload_batch_inventory_cvr(
+            client, invalid_cvr, election_id, jurisdiction_ids[0], file_type
+        )
+        assert_ok(rv)
+
+        rv = client.get(
+            f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/batch-inventory/cvr"
+        )
+        cvr = json.loads(rv.data)
+        assert cvr["processing"]["status"] == ProcessingStatus.ERRORED
+        assert cvr["processing"]["error"] == expected_error
+
+        rv = client.delete(
+            f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/batch-inventory/cvr"
+        )
+        assert_ok(rv)
+
+
+def test_batch_inventory_tally():
+    from ...api.batch_inventory import BatchInventoryTally
+
+    contests = [
+        Contest(
+            id="contest-1",
+            name="Contest 1",
+            votes_allowed=1,
+            choices=[
+                ContestChoice(id="choice-1-1", name="Choice 1-1"),
+                ContestChoice(id="choice-1-2", name="Choice 1-2"),
+            ],
+        ),
+        Contest(
+            id="contest-2",
+            name="Contest 2",
+            votes_allowed=2,
+            choices=[
+                ContestChoice(id="choice-2-1", name="Choice 2-1"),
+                ContestChoice(id="choice-2-2", name="Choice 2-2"),
+                ContestChoice(id="choice-2-3", name="Choice 2-3"),
+            ],
+        ),
+    ]
+    ballots = [
+        (("T1", "B1"), [0, 1, 1, 1, 0]),
+        (("T1", "B2"), [1, 1, 0, 0, 1]),  # Overvote in contest 1
+        (("T1", "B1"), [1, 0, 1, 1, 1]),  # Overvote in contest 2
+        (("T2", "B1"), [1, 1, 1, 1, 1]),  # Overvote in both contests
+        (("T1", "B2"), [0, 0, 0, 0, 0]),
+    ]
+
+    for chunk_size in [1, 2, len(ballots)]:
+        tally = BatchInventoryTally(contests)
+        for start in range(0, len(ballots), chunk_size):
+            chunk = ballots[start : start + chunk_size]
+            batch_indices = np.array(
+                [tally.batch_index(batch_key) for batch_key, _ in chunk],
+                dtype=np.intp,
+            )
+            votes = np.array([votes for _, votes in chunk], dtype=np.int64)
+            tally.add_ballots(batch_indices, votes, tally.within_votes_allowed(votes))
+
+        assert tally.ballot_count_by_batch() == {
+            ("T1", "B1"): 2,
+            ("T1", "B2"): 2,
+            ("T2", "B1"): 1,
+        }
+        # Same as adding each ballot's votes to nested dicts, including the
+        # order of the keys
+        batch_tallies = tally.batch_tallies(include_untallied=False)
+        assert [
+            (batch_key, list(choice_tallies.items()))
+            for batch_key, choice_tallies in batch_tallies.items()
+        ] == [
+            (
+                ("T1", "B1"),
+                [
+                    ("choice-1-1", 1),
+                    ("choice-1-2", 1),
+                    ("choice-2-1", 1),
+                    ("choice-2-2", 1),
+                    ("choice-2-3", 0),
+                ],
+            ),
+            (
+                ("T1", "B2"),
+                [
+                    ("choice-2-1", 0),
+                    ("choice-2-2", 0),
+                    ("choice-2-3", 1),
+                    ("choice-1-1", 0),
+                    ("choice-1-2", 0),
+                ],
+            ),
+        ]
+
+        # Untallied batches and choices get explicit zeros
+        assert tally.batch_tallies(include_untallied=True)[("T2", "B1")] == {
+            "choice-1-1": 0,
+            "choice-1-2": 0,
+            "choice-2-1": 0,
+            "choice-2-2": 0,
+            "choice-2-3": 0,
+        }
@@ -21,6 +21,9 @@ from .helpers import (
     find_log,
 )
 from ..worker.tasks import (
+    TASK_QUEUE_CHANNEL,
+    TaskPriority,
+    TaskProgressReporter,
     claim_next_task,
     create_background_task,
     background_task,
@@ -29,7 +32,14 @@ from ..worker.tasks import (
     serialize_background_task,
     UserError,
 )
-from ..worker.worker import run_worker
+from ..worker.worker import (
+    listen_for_queued_tasks,
+    run_worker,
+    run_worker_pool,
+    slot_restart_delay,
+    wait_for_queued_task,
+    wait_for_queued_task_or_reconnect,
+)
 
 
 # We give each test case its own database to work with so there is no
@@ -334,6 +344,106 @@ def test_task_db_error(capture_exception, caplog, db_session):
     assert isinstance(capture_exception.call_args[0][0], sqlalchemy.exc.IntegrityError)
 
 
+def test_task_progress(db_session):
+    task_id = None
+
+    def current_progress():
+        task = db_session.query(BackgroundTask).populate_existing().get(task_id)
+        return (task.work_progress, task.work_total)
+
+    @background_task
+    def progress_task(election_id, emit_progress):
+        emit_progress(0, 1000)
+        assert current_progress() == (0, 1000)
+        # Frequent updates are throttled...
+        emit_progress(500, 1000)
+        assert current_progress() == (0, 1000)
+        # ...unless the work is done
+        emit_progress(1000, 1000)
+        assert current_progress() == (1000, 1000)
+
+    task = create_background_task(progress_task, dict(election_id="1"), db_session)
+    task_id = task.id
+
+    run_task(claim_next_task("test_worker", db_session), db_session)
+
+    task = db_session.query(BackgroundTask).get(task_id)
+    assert task.work_started_at is not None
+    compare_json(
+        serialize_background_task(task),
+        {
+            "status": "PROCESSED",
+            "startedAt": assert_is_date,
+            "completedAt": assert_is_date,
+            "error": None,
+            "workProgress": 1000,
+            "workTotal": 1000,
+        },
+    )
+
+
+def test_task_progress_throttling(db_session):
+    @background_task
+    def throttled_progress_task(election_id):
+        pass
+
+    task = create_background_task(
+        throttled_progress_task, dict(election_id="1"), db_session
+    )
+    task = claim_next_task("test_worker", db_session)
+
+    def current_progress():
+        db_session.refresh(task)
+        return (task.work_progress, task.work_total)
+
+    reporter = TaskProgressReporter(
+        task.id, db_session.bind, min_interval_seconds=0, min_percent_change=1
+    )
+    reporter.emit_progress(0, 1000)
+    assert current_progress() == (0, 1000)
+    reporter.emit_progress(5, 1000)
+    assert current_progress() == (0, 1000)
+    reporter.emit_progress(10, 1000)
+    assert current_progress() == (10, 1000)
+    # Changing the total always triggers an update
+    reporter.emit_progress(11, 2000)
+    assert current_progress() == (11, 2000)
+    reporter.close()
+
+    reporter = TaskProgressReporter(
+        task.id, db_session.bind, min_interval_seconds=60, min_percent_change=0
+    )
+    reporter.emit_progress(0, 1000)
+    reporter.emit_progress(999, 1000)
+    assert current_progress() == (0, 1000)
+    reporter.close()
+
+    # While the task is running, we estimate throughput and time remaining
+    db_session.execute(
+        """
+        UPDATE background_task
+        SET work_progress = 100,
+            work_started_at = updated_at - INTERVAL '10 seconds'
+        WHERE id = :id
+        """,
+        dict(id=task.id),
+    )
+    db_session.commit()
+    compare_json(
+        serialize_background_task(task),
+        {
+            "status": "PROCESSING",
+            "startedAt": assert_is_date,
+            "completedAt": None,
+            "error": None,
+            "workProgress": 100,
+            "workTotal": 1000,
+            "workRate": 10.0,
+            "workEtaSeconds": 90,
+        },
+    )
+
+
 def test_task_multiple_run_in_order(db_session):
     results = []
 
@@ -477,9 +587,7 @@ def test_multiple_workers(db_session):
             sessionmaker(autocommit=False, autoflush=True, bind=engine)
         )
         name = context.current_process().name
-        run_worker(
-            name, db_session, pause_between_tasks_seconds=random.randint(0, 3) / 10
-        )
+        run_worker(name, db_session, poll_interval_seconds=random.randint(0, 3) / 10)
 
     # Start worker processes. This simulates how workers are run in production -
     # each one in its own process.
@@ -547,6 +655,159 @@ def test_lock_key(db_session):
     assert next_task_3.id == task1b.id
 
 
+def test_task_priority(db_session):
+    @background_task(priority=TaskPriority.BULK)
+    def bulk_task(election_id):
+        pass
+
+    @background_task(priority=TaskPriority.INTERACTIVE)
+    def interactive_task(election_id):
+        pass
+
+    @background_task
+    def default_task(election_id):
+        pass
+
+    task1_bulk = create_background_task(bulk_task, dict(election_id="1"), db_session)
+    task1_interactive = create_background_task(
+        interactive_task, dict(election_id="1"), db_session
+    )
+    task2_default = create_background_task(
+        default_task, dict(election_id="2"), db_session
+    )
+    task3_interactive = create_background_task(
+        interactive_task, dict(election_id="3"), db_session
+    )
+    assert task1_bulk.priority == TaskPriority.BULK
+    assert task2_default.priority == TaskPriority.DEFAULT
+
+    # Higher priority tasks jump ahead of older, lower priority tasks...
+    assert claim_next_task("test_worker", db_session).id == task3_interactive.id
+    assert claim_next_task("test_worker", db_session).id == task2_default.id
+    # ...but tasks for the same lock_key still run in the order they were
+    # created, so task1_interactive has to wait for task1_bulk
+    next_task = claim_next_task("test_worker", db_session)
+    assert next_task.id == task1_bulk.id
+    assert claim_next_task("test_worker", db_session) is None
+
+    run_task(next_task, db_session)
+    assert claim_next_task("test_worker", db_session).id == task1_interactive.id
+
+
+def test_claim_skips_tasks_being_claimed(db_session):
+    @background_task
+    def skip_locked_task(election_id):
+        pass
+
+    task1a = create_background_task(skip_locked_task, dict(election_id="1"), db_session)
+    task1b = create_background_task(skip_locked_task, dict(election_id="1"), db_session)
+    task2a = create_background_task(skip_locked_task, dict(election_id="2"), db_session)
+    db_session.commit()
+
+    # Simulate another worker in the middle of claiming task1a
+    other_worker_session = scoped_session(sessionmaker(bind=db_session.bind))
+    other_worker_session.execute(
+        "SELECT id FROM background_task WHERE id = :id FOR UPDATE",
+        dict(id=task1a.id),
+    )
+    other_worker_session.execute(
+        "SELECT pg_advisory_xact_lock(hashtext(:lock_key))",
+        dict(lock_key=task1a.lock_key),
+    )
+
+    # task1a is locked, and task1b shares its lock_key, so we should skip both
+    # without waiting for the other worker
+    next_task_1 = claim_next_task("test_worker", db_session)
+    assert next_task_1.id == task2a.id
+
+    # Once the other worker is done (without claiming), task1a is claimable
+    other_worker_session.rollback()
+    other_worker_session.close()
+    next_task_2 = claim_next_task("test_worker", db_session)
+    assert next_task_2.id == task1a.id
+
+    assert claim_next_task("test_worker", db_session) is None
+    run_task(next_task_2, db_session)
+    next_task_3 = claim_next_task("test_worker", db_session)
+    assert next_task_3.id == task1b.id
+
+
+def test_workers_notified_of_queued_tasks(db_session):
+    @background_task
+    def notify_task(election_id):
+        pass
+
+    listen_connection = listen_for_queued_tasks(db_session.bind)
+
+    task = create_background_task(notify_task, dict(election_id="1"), db_session)
+    # Notifications aren't sent until the task is committed
+    listen_connection.poll()
+    assert listen_connection.notifies == []
+    db_session.commit()
+
+    start = time.time()
+    wait_for_queued_task(listen_connection, timeout_seconds=5)
+    assert time.time() - start < 5
+    assert listen_connection.notifies == []
+
+    # If nothing is queued, we fall back to polling after the timeout
+    start = time.time()
+    wait_for_queued_task(listen_connection, timeout_seconds=0.1)
+    assert time.time() - start >= 0.1
+
+    # Resetting a task also notifies workers
+    claim_next_task("test_worker", db_session)
+    reset_task(task, db_session)
+    listen_connection.poll()
+    assert [notify.channel for notify in listen_connection.notifies] == [
+        TASK_QUEUE_CHANNEL
+    ]
+
+    listen_connection.close()
+
+
+def test_workers_reconnect_listen_connection(caplog, db_session):
+    @background_task
+    def reconnect_task(election_id):
+        pass
+
+    engine = db_session.bind
+    listen_connection = listen_for_queued_tasks(engine)
+
+    # Simulate the database dropping the connection (e.g. on restart)
+    db_session.execute(
+        "SELECT pg_terminate_backend(:pid)",
+        dict(pid=listen_connection.get_backend_pid()),
+    )
+    db_session.commit()
+
+    # The worker falls back to polling after the timeout
+    start = time.time()
+    listen_connection = wait_for_queued_task_or_reconnect(
+        engine, listen_connection, timeout_seconds=0.1
+    )
+    assert time.time() - start >= 0.1
+    assert listen_connection is None
+    assert find_log(caplog, logging.WARNING, "WORKER_LISTEN_ERROR")
+
+    # Then listens on a new connection
+    listen_connection = wait_for_queued_task_or_reconnect(
+        engine, listen_connection, timeout_seconds=5
+    )
+    assert listen_connection is not None
+
+    create_background_task(reconnect_task, dict(election_id="1"), db_session)
+    db_session.commit()
+    start = time.time()
+    assert (
+        wait_for_queued_task_or_reconnect(engine, listen_connection, timeout_seconds=5)
+        is listen_connection
+    )
+    assert time.time() - start < 5
+
+    listen_connection.close()
+
+
 # The idea of this test is to create race conditions by having multiple tasks
 # per election that try to increment a counter in the database. If only one task
 # per election can run at a time, then the counter should end up equal to the
@@ -601,9 +862,7 @@ def test_multiple_workers_lock_on_election(db_session):
             sessionmaker(autocommit=False, autoflush=True, bind=engine)
         )
         name = context.current_process().name
-        run_worker(
-            name, db_session, pause_between_tasks_seconds=random.randint(0, 3) / 10
-        )
+        run_worker(name, db_session, poll_interval_seconds=random.randint(0, 3) / 10)
 
     # Start worker processes
     workers = [context.Process(target=run_test_worker) for _ in range(num_workers)]
@@ -644,6 +903,119 @@ def test_multiple_workers_lock_on_election(db_session):
         )
 
 
+def test_worker_pool(db_session):
+    context = multiprocessing.get_context()
+
+    db_session.execute(
+        "CREATE TABLE IF NOT EXISTS pool_results (election_id TEXT, num INT, finished_at TIMESTAMPTZ)"
+    )
+    db_session.execute("TRUNCATE TABLE pool_results")
+    db_session.commit()
+
+    def record_result(db_session, election_id, num):
+        db_session.execute(
+            "INSERT INTO pool_results VALUES (:election_id, :num, clock_timestamp())",
+            dict(election_id=election_id, num=num),
+        )
+
+    @background_task(priority=TaskPriority.BULK)
+    def pool_slow_task(election_id, db_session):
+        time.sleep(2)
+        record_result(db_session, election_id, 0)
+
+    @background_task(priority=TaskPriority.INTERACTIVE)
+    def pool_quick_task(election_id, db_session, num: int):
+        record_result(db_session, election_id, num)
+
+    db_url = db_session.bind.url
+
+    def create_test_db_session():
+        engine = sqlalchemy.create_engine(db_url)
+        return scoped_session(
+            sessionmaker(autocommit=False, autoflush=True, bind=engine)
+        )
+
+    pool = context.Process(
+        target=run_worker_pool,
+        args=("test_worker", 2, 0.1, create_test_db_session),
+    )
+    pool.start()
+
+    slow_task = create_background_task(
+        pool_slow_task, dict(election_id="1"), db_session
+    )
+    db_session.commit()
+
+    # Wait for one slot to start the slow task
+    while db_session.query(BackgroundTask).get(slow_task.id).started_at is None:
+        db_session.commit()
+        time.sleep(0.1)
+
+    # The other slot should be able to run tasks for other audits in the meantime
+    create_background_task(pool_quick_task, dict(election_id="1", num=1), db_session)
+    for num in range(1, 6):
+        create_background_task(
+            pool_quick_task, dict(election_id="2", num=num), db_session
+        )
+    db_session.commit()
+
+    def num_incomplete_tasks():
+        return (
+            db_session.query(BackgroundTask)
+            .filter(BackgroundTask.task_name.in_(["pool_slow_task", "pool_quick_task"]))
+            .filter_by(completed_at=None)
+            .count()
+        )
+
+    while num_incomplete_tasks() > 0:
+        time.sleep(0.1)
+
+    pool.terminate()
+    pool.join()
+
+    results = db_session.execute(
+        "SELECT election_id, num FROM pool_results ORDER BY finished_at"
+    ).fetchall()
+    # The quick tasks for election 2 shouldn't have to wait for the slow task
+    # for election 1, but the quick task for election 1 should.
+    assert results == [
+        ("2", 1),
+        ("2", 2),
+        ("2", 3),
+        ("2", 4),
+        ("2", 5),
+        ("1", 0),
+        ("1", 1),
+    ]
+
+    # Each slot should have its own worker_id
+    election_2_worker_ids = {
+        task.worker_id
+        for task in db_session.query(BackgroundTask).filter_by(
+            task_name="pool_quick_task"
+        )
+        if task.payload["election_id"] == "2"
+    }
+    assert slow_task.worker_id.startswith("test_worker-")
+    assert len(election_2_worker_ids) == 1
+    assert slow_task.worker_id not in election_2_worker_ids
+
+
+def test_worker_slot_restart_delay():
+    # A slot that keeps exiting right after it starts is restarted with
+    # exponential backoff
+    delay = 0.0
+    delays = []
+    for _ in range(8):
+        delay = slot_restart_delay(delay, uptime_seconds=0.1)
+        delays.append(delay)
+    assert delays == [1, 2, 4, 8, 16, 32, 60, 60]
+
+    # Once a slot has been running for a while, it's restarted right away
+    assert slot_restart_delay(delay, uptime_seconds=60) == 0
+    assert slot_restart_delay(0, uptime_seconds=3600) == 0
+
+
 def test_task_missing_election_id():
     with pytest.raises(
         AssertionError,
@@ -0,0 +1,82 @@
+import csv
+import io
+import pytest
+
+from ...util.copy_stream import CsvRowStream, copy_rows
+
+
+ROWS = [
+    ["batch-1", 1, "1-1-1", "0,1,,1"],
+    ["batch-1", 2, "1-1-2", "1,0,0,0"],
+    ["batch-2", 1, 'quote "this"', ""],
+]
+
+
+def expected_csv(rows) -> str:
+    expected = io.StringIO()
+    csv.writer(expected).writerows(rows)
+    return expected.getvalue()
+
+
+def test_csv_row_stream_read_all():
+    stream = CsvRowStream(ROWS)
+    assert stream.readable()
+    assert stream.read() == expected_csv(ROWS)
+    assert stream.read() == ""
+
+
+def test_csv_row_stream_read_chunks():
+    for chunk_size in [1, 5, 16, 1000]:
+        pulled_rows = []
+
+        def rows():
+            for row in ROWS:
+                pulled_rows.append(row)
+                yield row
+
+        stream = CsvRowStream(rows())
+        chunks = []
+        while chunk := stream.read(chunk_size):
+            assert len(chunk) <= chunk_size
+            chunks.append(chunk)
+            # Rows are only pulled as they are needed to fill a read
+            assert len(expected_csv(pulled_rows)) - len("".join(chunks)) < len(
+                expected_csv(pulled_rows[-1:])
+            )
+        assert "".join(chunks) == expected_csv(ROWS)
+
+
+def test_csv_row_stream_empty():
+    stream = CsvRowStream([])
+    assert stream.read(10) == ""
+
+
+class FakeCursor:
+    # Mimics psycopg2, which wraps errors raised while reading the file
+    def copy_expert(self, sql, file, size):
+        self.sql = sql
+        self.data = ""
+        try:
+            while chunk := file.read(size):
+                self.data += chunk
+        except Exception as error:
+            raise Exception(f"COPY from stdin failed: {error}") from None
+
+
+def test_copy_rows():
+    cursor = FakeCursor()
+    copy_rows(cursor, "COPY table FROM STDIN", ROWS, chunk_size=8)
+    assert cursor.sql == "COPY table FROM STDIN"
+    assert cursor.data == expected_csv(ROWS)
+
+
+def test_copy_rows_error():
+    class ParseError(Exception):
+        pass
+
+    def rows():
+        yield ROWS[0]
+        raise ParseError("Couldn't parse row 2")
+
+    with pytest.raises(ParseError, match="Couldn't parse row 2"):
+        copy_rows(FakeCursor(), "COPY table FROM STDIN", rows())
@@ -0,0 +1,46 @@
+import csv
+import io
+
+from ...util.csv_download import csv_rows_chunks
+
+
+ROWS = [
+    ["######## SAMPLED BALLOTS ########"],
+    ["Jurisdiction Name", "Batch Name", "Ballot Position"],
+    ["J1", "Batch 1", 1],
+    ["J1", 'Batch "2"', 2],
+    [],
+    ["J2", "Batch, 3", 3],
+]
+
+
+def expected_csv(rows) -> str:
+    expected = io.StringIO()
+    csv.writer(expected).writerows(rows)
+    return expected.getvalue()
+
+
+def test_csv_rows_chunks():
+    for chunk_size in [1, 20, 1000]:
+        chunks = list(csv_rows_chunks(ROWS, chunk_size=chunk_size))
+        assert "".join(chunks) == expected_csv(ROWS)
+        # Every chunk but the last should fill the buffer
+        assert all(len(chunk) >= chunk_size for chunk in chunks[:-1])
+
+
+def test_csv_rows_chunks_is_lazy():
+    pulled_rows = []
+
+    def rows():
+        for row in ROWS:
+            pulled_rows.append(row)
+            yield row
+
+    chunks = csv_rows_chunks(rows(), chunk_size=1)
+    assert next(chunks) == expected_csv(ROWS[:1])
+    assert pulled_rows == ROWS[:1]
+    assert "".join(chunks) == expected_csv(ROWS[1:])
+
+
+def test_csv_rows_chunks_no_rows():
+    assert list(csv_rows_chunks([])) == []
@@ -1,14 +1,20 @@
 from typing import Any, BinaryIO
+import csv as py_csv
 import os
 import io
+import chardet
 import pytest
 
 from ...api.jurisdictions import JURISDICTIONS_COLUMNS
+from ...util import csv_parse
 from ...util.csv_parse import (
     parse_csv as parse_csv_binary,
     CSVParseError,
     CSVColumnType,
     CSVValueType,
+    decode_csv,
+    detect_encoding,
+    read_csv,
 )
 
 BALLOT_MANIFEST_COLUMNS = [
@@ -499,6 +505,26 @@ def test_parse_csv_total_row():
         {"Batch Name": "Batch B", "Number of Ballots": 10},
     ]
 
+    # Empty values in optional number columns are skipped when looking for a
+    # total, so the last value in the column is compared to the values above it
+    with pytest.raises(CSVParseError) as error:
+        list(
+            parse_csv(
+                (
+                    "Jurisdiction,Admin Email,Expected Number of Ballots\n"
+                    "J1,j1@example.com,10\n"
+                    "J2,j2@example.com,\n"
+                    "J3,j3@example.com,20\n"
+                    "All,all@example.com,30\n"
+                ),
+                JURISDICTIONS_COLUMNS,
+            )
+        )
+    assert (
+        str(error.value)
+        == "It looks like the last row in the CSV might be a total row. Please remove this row from the CSV."
+    )
+
 
 # Cases where we are lenient
 
@@ -1089,3 +1115,37 @@ Batch ó,1
     )
     assert len(rows) == 5000
     assert rows[-1]["Batch Name"] == "Batch �"
+
+
+def test_detect_encoding_matches_chardet():
+    for contents in [
+        b"Batch Name,Number of Ballots\nBatch A,20\n",
+        b"\xef\xbb\xbfBatch Name,Number of Ballots\nBatch A,20\n",
+        "Batch Name,Number of Ballots\nBatch ó,20\n".encode("utf-8"),
+        "Batch Name,Number of Ballots\nBatch ó,20\n".encode("latin-1"),
+        b"Batch Name,Number of Ballots\n~{Batch A~},20\n",
+    ]:
+        detector = chardet.UniversalDetector()
+        detector.feed(contents)
+        detector.close()
+        assert detect_encoding(io.BytesIO(contents)) == detector.result["encoding"]
+
+
+def test_read_csv_in_parallel(monkeypatch):
+    monkeypatch.setattr(csv_parse, "PARALLEL_CSV_MIN_FILE_SIZE", 0)
+    monkeypatch.setattr(csv_parse, "PARALLEL_CSV_CHUNK_SIZE", 16)
+
+    rows = "".join(
+        f'Batch {i},{i},"Note with\nnewline ""{i}""",Ó {i}\r\n' for i in range(50)
+    )
+    # Include a quoted value with lots of newlines that spans several chunks
+    contents = "Batch Name,Count,Notes,Other\n" + rows + '"' + "\n" * 50 + '",1,,\n'
+    for encoding in ["utf-8", "utf-8-sig", "cp1252"]:
+        encoded = contents.encode(encoding)
+        expected = list(py_csv.reader(decode_csv(io.BytesIO(encoded)), delimiter=","))
+        assert list(read_csv(io.BytesIO(encoded))) == expected
+        # Without a trailing newline
+        expected = list(
+            py_csv.reader(decode_csv(io.BytesIO(encoded[:-1])), delimiter=",")
+        )
+        assert list(read_csv(io.BytesIO(encoded[:-1]))) == expected
@@ -0,0 +1,101 @@
+import random
+import time
+import pytest
+
+from ...util.cvr_interpretations import (
+    PACKED_2_BIT,
+    PACKED_4_BIT,
+    RAW_TEXT,
+    interpretation_columns,
+    pack_interpretations,
+    pack_interpretations_chunk,
+    unpack_interpretation_columns,
+    unpack_interpretations,
+)
+
+
+@pytest.mark.parametrize(
+    "interpretations,expected_format",
+    [
+        ("", PACKED_2_BIT),
+        ("1", PACKED_2_BIT),
+        ("0,1,,,1,0,o,0", PACKED_2_BIT),
+        ("0,1,u,,1,o", PACKED_4_BIT),
+        ("0,1,2,,1", PACKED_4_BIT),
+        ("0,1,0.5,,1,0.5,x,2", PACKED_4_BIT),
+        ("1,2,3,4,5,6,7,8,9,10,11,12", PACKED_4_BIT),
+        ("1,2,3,4,5,6,7,8,9,10,11,12,13", RAW_TEXT),
+        ("1,ünïcödé,0", PACKED_4_BIT),
+    ],
+)
+def test_pack_interpretations(interpretations: str, expected_format: int):
+    packed = pack_interpretations(interpretations)
+    assert packed[0] == expected_format
+    assert unpack_interpretations(packed) == interpretations
+    assert unpack_interpretations(memoryview(packed)) == interpretations
+
+    values = interpretations.split(",")
+    for column in range(len(values)):
+        assert unpack_interpretation_columns(packed, [column]) == [values[column]]
+    columns = list(range(len(values)))[::-2]
+    assert unpack_interpretation_columns(packed, columns) == [
+        values[column] for column in columns
+    ]
+    assert interpretation_columns(packed, None, columns) == [
+        values[column] for column in columns
+    ]
+    assert interpretation_columns(None, interpretations, columns) == [
+        values[column] for column in columns
+    ]
+
+    with pytest.raises(IndexError):
+        unpack_interpretation_columns(packed, [len(values)])
+
+
+def test_pack_interpretations_size():
+    interpretations = ",".join(["0", "1", "", "", "0", "u"] * 100)
+    packed = pack_interpretations(interpretations)
+    # 4 bits per column plus a 5 byte header
+    assert len(packed) == 5 + 300
+    assert len(packed) < len(interpretations) / 3
+    assert unpack_interpretations(packed) == interpretations
+
+
+def test_pack_interpretations_chunk():
+    chunks = [
+        [],
+        [""],
+        ["", ""],
+        ["0,1,,,1,0,o,0", "0,1,u,,1,o,1,1", "1,0,0,0,0,0,0,0", ",,,,,,,"],
+        # Rows that need escape values
+        ["0,1,2,,1", "0,1,0,,1", "1,ünïcödé,0,0,0", "1,2,3,4,5", "1,10,0,,"],
+        # Rows with different numbers of columns
+        ["0,1,,,1,0,o,0", "0,1,u,,1,o", "1", ""],
+    ]
+    for chunk in chunks:
+        assert pack_interpretations_chunk(chunk) == [
+            pack_interpretations(interpretations) for interpretations in chunk
+        ]
+
+
+def test_pack_interpretations_chunk_throughput():
+    # Packing is part of loading CVR ballots, so it should cost about as much as
+    # splitting each row (much less than packing one row at a time)
+    rng = random.Random(0)
+    chunk = [
+        ",".join(rng.choice(["0", "0", "1", "", ""]) for _ in range(300))
+        for _ in range(2000)
+    ]
+
+    def best_time(function):
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    split_time = best_time(
+        lambda: [interpretations.split(",") for interpretations in chunk]
+    )
+    assert best_time(lambda: pack_interpretations_chunk(chunk)) < 3 * split_time
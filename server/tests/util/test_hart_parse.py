@@ -1,10 +1,12 @@
-from xml.etree.ElementTree import Element, ElementTree
+import io
+from xml.etree.ElementTree import Element, ElementTree, fromstring
 import pytest
 from ...util.hart_parse import (
     find_text_xml,
     find_xml,
     findall_xml,
     parse_contest_results,
+    parse_hart_cvr,
 )
 
 
@@ -61,3 +63,90 @@ def test_parse_contest_results(namespace):
     results = parse_contest_results(cvr_xml)
     assert "Contest1" in results
     assert "Choice1" in results["Contest1"]
+
+
+def test_parse_hart_cvr(namespace):
+    cvr_xml = f"""<?xml version="1.0" encoding="utf-8"?>
+        <Cvr xmlns="{namespace}">
+            <Contests>
+                <Contest>
+                    <Name>Contest1</Name>
+                    <Options>
+                        <Option><Name>Choice1</Name><Value>1</Value></Option>
+                        <Option>
+                            <WriteInData><Text /></WriteInData>
+                            <Value>1</Value>
+                        </Option>
+                    </Options>
+                </Contest>
+                <Contest>
+                    <Name>Contest2</Name>
+                    <Options />
+                </Contest>
+                <Contest>
+                    <Name>Contest1</Name>
+                    <Options>
+                        <Option><Name>Choice2</Name><Value>1</Value></Option>
+                    </Options>
+                </Contest>
+            </Contests>
+            <BatchSequence>3</BatchSequence>
+            <PrecinctSplit><Id>1</Id><Name>Precinct 1</Name></PrecinctSplit>
+            <BatchNumber>BATCH1</BatchNumber>
+            <CvrGuid>guid-1</CvrGuid>
+            <Contests>
+                <Contest>
+                    <Name>Contest3</Name>
+                    <Options>
+                        <Option><Name>Choice3</Name><Value>1</Value></Option>
+                    </Options>
+                </Contest>
+            </Contests>
+        </Cvr>
+        """.encode()
+
+    hart_cvr = parse_hart_cvr(io.BytesIO(cvr_xml))
+    assert hart_cvr == (
+        "guid-1",
+        "BATCH1",
+        "3",
+        "Precinct 1",
+        {"Contest1": {"Choice1", "Choice2", "Write-In"}},
+    )
+
+    # Should extract the same values as parsing the whole document
+    tree = ElementTree(fromstring(cvr_xml))
+    assert hart_cvr.contest_results == dict(parse_contest_results(tree))
+    assert hart_cvr.cvr_guid == find_text_xml(tree, "CvrGuid")
+    assert hart_cvr.batch_number == find_text_xml(tree, "BatchNumber")
+    assert hart_cvr.batch_sequence == find_text_xml(tree, "BatchSequence")
+    assert hart_cvr.precinct_name == find_text_xml(
+        find_xml(tree, "PrecinctSplit"), "Name"
+    )
+
+
+def test_parse_hart_cvr_missing_fields(namespace):
+    cvr_xml = f"""<?xml version="1.0" encoding="utf-8"?>
+        <Cvr xmlns="{namespace}">
+            <Contests />
+            <BatchSequence>3</BatchSequence>
+            <CvrGuid>guid-1</CvrGuid>
+        </Cvr>
+        """.encode()
+
+    with pytest.raises(ValueError, match="BatchNumber"):
+        parse_hart_cvr(io.BytesIO(cvr_xml))
+
+    assert parse_hart_cvr(io.BytesIO(cvr_xml), require_batch_fields=False) == (
+        "guid-1",
+        None,
+        "3",
+        None,
+        {},
+    )
+
+    with pytest.raises(ValueError, match="Contests"):
+        parse_hart_cvr(
+            io.BytesIO(f'<Cvr xmlns="{namespace}"></Cvr>'.encode()),
+            require_batch_fields=False,
+        )
@@ -1,5 +1,5 @@
 from typing import TypeVar
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 import itertools
 
 T = TypeVar("T")
@@ -50,3 +50,10 @@ def diff_file_lists_ignoring_order_and_case(
                 break
 
     return (overlapping_files, unexpected_files, missing_files)
+
+
+# chunked splits an iterable into lists of at most chunk_size items.
+def chunked(items: Iterable[T], chunk_size: int) -> Iterator[list[T]]:
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, chunk_size)):
+        yield chunk
@@ -0,0 +1,71 @@
+import csv
+import io
+from typing import Any, Iterable, Iterator
+
+
+class CsvRowStream(io.TextIOBase):
+    """
+    A read-only file-like object that serializes rows from an iterable as CSV
+    on demand. This lets us stream rows straight into Postgres COPY (which
+    reads from a file) as they are produced, without writing them all to a
+    tempfile first. Only about one read's worth of rows is buffered at a time.
+
+    If the row iterable raises an exception, it's saved in `error`, since
+    psycopg2 replaces exceptions raised while reading with a generic error.
+    """
+
+    def __init__(self, rows: Iterable[Iterable[Any]]):
+        self.rows: Iterator[Iterable[Any]] | None = iter(rows)
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.error: Exception | None = None
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int | None = -1) -> str:
+        if size is None:
+            size = -1
+
+        # Serialize rows until we have enough buffered to fill the read
+        try:
+            while self.rows is not None and (size < 0 or self.buffer.tell() < size):
+                row = next(self.rows, None)
+                if row is None:
+                    self.rows = None
+                else:
+                    self.writer.writerow(row)
+        except Exception as error:
+            self.error = error
+            raise
+
+        buffered = self.buffer.getvalue()
+        if size < 0:
+            size = len(buffered)
+        chunk, rest = buffered[:size], buffered[size:]
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.buffer.write(rest)
+        return chunk
+
+
+def copy_rows(
+    cursor,
+    copy_sql: str,
+    rows: Iterable[Iterable[Any]],
+    # How many characters COPY reads at a time
+    chunk_size: int = 64 * 1024,
+) -> None:
+    """
+    Load rows into the database using COPY, streaming them as CSV. copy_sql
+    should be a COPY ... FROM STDIN statement that expects CSV input.
+    """
+    stream = CsvRowStream(rows)
+    try:
+        cursor.copy_expert(copy_sql, stream, size=chunk_size)
+    except Exception:
+        # If generating the rows failed, surface that error rather than the
+        # generic COPY error psycopg2 wraps it in
+        if stream.error:
+            raise stream.error
+        raise
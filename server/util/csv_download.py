@@ -1,7 +1,9 @@
+import csv
+import io
 import re
 from datetime import datetime
-from typing import IO
-from flask import Response
+from typing import IO, Any, Iterable, Iterator
+from flask import Response, stream_with_context
 
 from ..models import *
 
@@ -27,3 +29,34 @@ def csv_response(csv_file: IO, filename: str) -> Response:
         mimetype="text/csv",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
+
+
+def csv_rows_chunks(
+    rows: Iterable[Iterable[Any]],
+    # How many characters to buffer before sending a chunk
+    chunk_size: int = 64 * 1024,
+) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell() > 0:
+        yield buffer.getvalue()
+
+
+def csv_stream_response(rows: Iterable[Iterable[Any]], filename: str) -> Response:
+    """
+    Streams rows to the client as CSV while they are generated, so large
+    reports start downloading right away and aren't held in memory all at
+    once. rows may be a generator that queries the database lazily - the
+    request context is kept alive until the response is done streaming.
+    """
+    return Response(
+        stream_with_context(csv_rows_chunks(rows)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,8 +1,10 @@
-from collections import defaultdict
+from collections import deque
+from concurrent.futures import Future
 from enum import Enum
 from typing import (
     IO,
     BinaryIO,
+    Callable,
     Iterable,
     Iterator,
     Any,
@@ -10,14 +12,17 @@ from typing import (
     TextIO,
     TypeVar,
 )
+import codecs
 import csv as py_csv
 import io
 import re
 import locale
 import chardet
 
+from .. import config
 from .jsonschema import EMAIL_REGEX
 from .collections import find_first_duplicate
+from .process_pool import fork_process_pool
 from ..worker.tasks import UserError
 
 locale.setlocale(locale.LC_ALL, "en_US.UTF-8")
@@ -59,25 +64,12 @@ INVALID_CSV_ERROR = (
 # "Be conservative in what you do, be liberal in what you accept from others"
 # https://en.wikipedia.org/wiki/Robustness_principle
 def parse_csv(file: BinaryIO, columns: list[CSVColumnType]) -> CSVDictIterator:
-    validate_not_empty(file)
-    text_file = decode_csv(file)
-    validate_comma_delimited(text_file)
-    csv: CSVIterator = py_csv.reader(text_file, delimiter=",")
+    csv = read_csv(file)
     csv = strip_whitespace(csv)
     csv = reject_no_rows(csv)
     csv = skip_empty_trailing_columns(csv)
     csv = validate_and_normalize_headers(csv, columns)
-    dict_csv = convert_rows_to_dicts(csv)
-    dict_csv = reject_empty_cells(dict_csv, columns)
-    dict_csv = reject_total_rows(dict_csv)
-    dict_csv = validate_and_parse_values(dict_csv, columns)
-    dict_csv = reject_duplicate_values(dict_csv, columns)
-    # Filter out empty rows towards the end so we can get accurate row numbers
-    # in all the other checkers
-    dict_csv = skip_empty_rows(dict_csv)
-    dict_csv = reject_final_total_row(dict_csv, columns)
-
-    return dict_csv
+    return validate_and_parse_rows(csv, columns)
 
 
 def is_filetype_csv_mimetype(file_type: str) -> bool:
@@ -92,14 +84,36 @@ def read_chunks(file: IO[bytes], chunk_size: int) -> Iterable[bytes]:
         yield chunk
 
 
-def decode_csv(file: IO[bytes]) -> TextIO:
+# chardet reads up to this many bytes from the start of the file (in 64 byte
+# chunks) to detect the encoding
+ENCODING_DETECTION_PREFIX_SIZE = 64 * 502
+
+
+def detect_encoding(file: IO[bytes]) -> str | None:
+    prefix = file.read(ENCODING_DETECTION_PREFIX_SIZE)
+    file.seek(0)
+
+    # Fast paths for the most common cases, which give the same result as
+    # chardet without running its probers
+    if prefix.startswith(codecs.BOM_UTF8):
+        return "UTF-8-SIG"
+    # chardet checks pure ASCII for escape sequences (ESC or "~{") that might
+    # indicate ISO-2022 or HZ encodings
+    if prefix.isascii() and b"\x1b" not in prefix and b"~{" not in prefix:
+        return "ascii"
+
     detector = chardet.UniversalDetector()
     for i, chunk in enumerate(read_chunks(file, 64)):
         detector.feed(chunk)
         if detector.done or i > 500:
             break
     detector.close()
-    encoding = detector.result["encoding"]
+    encoding: str | None = detector.result["encoding"]
+    return encoding
+
+
+def decode_csv(file: IO[bytes]) -> TextIO:
+    encoding = detect_encoding(file)
     if not encoding:
         raise CSVParseError(INVALID_CSV_ERROR)
     if encoding == "ascii":
@@ -125,6 +139,180 @@ def decode_csv(file: IO[bytes]) -> TextIO:
     return io.TextIOWrapper(file, encoding=encoding, errors="replace", newline=None)
 
 
+def read_csv(file: BinaryIO) -> CSVIterator:
+    """
+    Decodes and tokenizes a CSV file into rows. Large files are decoded and
+    tokenized in chunks in parallel (see read_csv_in_parallel).
+    """
+    validate_not_empty(file)
+    text_file = decode_csv(file)
+    validate_comma_delimited(text_file)
+
+    file.seek(0, io.SEEK_END)
+    file_size = file.tell()
+    file.seek(0)
+    if (
+        config.CSV_PARSING_PROCESSES > 1
+        and file_size >= PARALLEL_CSV_MIN_FILE_SIZE
+        and codecs.lookup(text_file.encoding).name in PARALLEL_CSV_ENCODINGS
+    ):
+        encoding = text_file.encoding
+        # Detach the text wrapper so it doesn't close the file when it's
+        # garbage collected
+        text_file.detach()
+        file.seek(0)
+        return read_csv_in_parallel(file, encoding)
+
+    return py_csv.reader(text_file, delimiter=",")
+
+
+# Files at least this big are read in parallel by read_csv
+PARALLEL_CSV_MIN_FILE_SIZE = 32 * 1024 * 1024
+# Approximate size of the chunks that read_csv_in_parallel splits files into
+PARALLEL_CSV_CHUNK_SIZE = 4 * 1024 * 1024
+# Encodings in which a newline byte always ends a line, so we can split a file
+# after any newline byte and decode each piece independently
+PARALLEL_CSV_ENCODINGS = {"utf-8", "utf-8-sig", "cp1252", "iso8859-1"}
+
+# Appended to a chunk to check whether tokenizing it ended inside a quoted
+# value. Uses a private use character that won't appear in real files.
+CHUNK_END_SENTINEL = "\ue000"
+CHUNK_END_SENTINEL_LINE = f'"{CHUNK_END_SENTINEL}"\n'
+
+# Sending rows back from worker processes as lists of strings is about as slow
+# as tokenizing them, so we pack them into one string using ASCII control
+# characters as separators, which can be split apart quickly.
+PACKED_ROW_SEPARATOR = "\x1e"
+PACKED_CELL_SEPARATOR = "\x1f"
+PACKED_EMPTY_ROW = "\x1d"
+PACKED_SEPARATORS = (PACKED_ROW_SEPARATOR, PACKED_CELL_SEPARATOR, PACKED_EMPTY_ROW)
+
+PackedRows = str | list[CSVRow]
+
+
+def pack_rows(rows: list[CSVRow], text: str) -> PackedRows:
+    # If the separators appear in the text, just send the rows as is. An empty
+    # list can't be told apart from a single row with one blank value once
+    # packed, so send that as is too.
+    if not rows or any(separator in text for separator in PACKED_SEPARATORS):
+        return rows
+    return PACKED_ROW_SEPARATOR.join(
+        PACKED_CELL_SEPARATOR.join(row) if row else PACKED_EMPTY_ROW for row in rows
+    )
+
+
+def unpack_rows(packed_rows: PackedRows) -> Iterable[CSVRow]:
+    if isinstance(packed_rows, list):
+        return packed_rows
+    return (
+        row.split(PACKED_CELL_SEPARATOR) if row != PACKED_EMPTY_ROW else []
+        for row in packed_rows.split(PACKED_ROW_SEPARATOR)
+    )
+
+
+def tokenize_csv_chunk(
+    chunk: bytes, encoding: str, is_last_chunk: bool = False
+) -> tuple[PackedRows, bool, Exception | None]:
+    """
+    Decodes and tokenizes a chunk of a CSV file that starts at the beginning of
+    a row. Returns:
+    - the rows (packed with pack_rows)
+    - whether the chunk ended at the end of a row, as opposed to in the middle
+      of a quoted value that contains a newline (in which case the rows aren't
+      valid)
+    - any error from the CSV reader, to be raised after yielding the rows
+      parsed before it
+    """
+    # Same decoding and newline translation as decode_csv's TextIOWrapper
+    text = chunk.decode(encoding, errors="replace")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    num_lines = text.count("\n")
+
+    # Add a sentinel row after the chunk. If the chunk ended at the end of a
+    # row, the sentinel will be parsed as its own row. Otherwise, it will be
+    # parsed into the open quoted value. The last chunk might not end with a
+    # newline, but it's always the end of the last row.
+    has_sentinel = not is_last_chunk and text.endswith("\n")
+    if has_sentinel:
+        text += CHUNK_END_SENTINEL_LINE
+
+    rows: list[CSVRow] = []
+    reader = py_csv.reader(io.StringIO(text, newline="\n"), delimiter=",")
+    try:
+        rows.extend(reader)
+    except py_csv.Error as error:
+        # If the reader got to the sentinel, the error may have been caused by
+        # it (e.g. by making a quoted value too long)
+        ended_at_row_end = not has_sentinel or reader.line_num <= num_lines
+        return pack_rows(rows, text), ended_at_row_end, error
+
+    if not has_sentinel:
+        return pack_rows(rows, text), True, None
+    if rows and rows[-1] == [CHUNK_END_SENTINEL]:
+        rows.pop()
+        return pack_rows(rows, text), True, None
+    return [], False, None
+
+
+def read_csv_in_parallel(file: BinaryIO, encoding: str) -> CSVIterator:
+    """
+    Splits a CSV file into chunks of roughly PARALLEL_CSV_CHUNK_SIZE bytes at
+    newlines, decodes and tokenizes the chunks in parallel across
+    config.CSV_PARSING_PROCESSES processes, and yields the rows in order. The
+    rows are the same as reading the file with decode_csv and csv.reader.
+
+    If a chunk turns out to end inside a quoted value that contains a newline,
+    it's combined with the following chunk and tokenized again.
+    """
+    # Only the start of the file can have a byte order mark
+    continuation_encoding = (
+        "utf-8" if codecs.lookup(encoding).name == "utf-8-sig" else encoding
+    )
+
+    def read_chunks_at_newlines() -> Iterator[tuple[bytes, str]]:
+        chunk_encoding = encoding
+        while True:
+            chunk = file.read(PARALLEL_CSV_CHUNK_SIZE)
+            if not chunk:
+                return
+            # Extend the chunk to the end of its line
+            yield chunk + file.readline(), chunk_encoding
+            chunk_encoding = continuation_encoding
+
+    chunks = read_chunks_at_newlines()
+    with fork_process_pool(config.CSV_PARSING_PROCESSES) as executor:
+        # Keep a bounded number of chunks in flight so we don't read the whole
+        # file into memory at once
+        pending: deque[tuple[bytes, str, Future]] = deque()
+
+        def submit_next_chunk():
+            next_chunk = next(chunks, None)
+            if next_chunk is not None:
+                chunk, chunk_encoding = next_chunk
+                future = executor.submit(tokenize_csv_chunk, chunk, chunk_encoding)
+                pending.append((chunk, chunk_encoding, future))
+
+        for _ in range(config.CSV_PARSING_PROCESSES * 2):
+            submit_next_chunk()
+
+        while pending:
+            chunk, chunk_encoding, future = pending.popleft()
+            submit_next_chunk()
+            rows, ended_at_row_end, error = future.result()
+            while not ended_at_row_end:
+                if pending:
+                    next_chunk, _, next_future = pending.popleft()
+                    next_future.cancel()
+                    submit_next_chunk()
+                    chunk += next_chunk
+                rows, ended_at_row_end, error = tokenize_csv_chunk(
+                    chunk, chunk_encoding, is_last_chunk=not pending
+                )
+            yield from unpack_rows(rows)
+            if error:
+                raise error
+
+
 def validate_not_empty(file: IO[bytes]):
     if file.read(1) == b"":
         raise CSVParseError("CSV cannot be empty.")
@@ -228,174 +416,216 @@ def validate_and_normalize_headers(
     yield from csv
 
 
-def is_empty_row(row: dict[str, Any]) -> bool:
-    return all(value == "" for value in row.values())
-
-
-def skip_empty_rows(csv: CSVDictIterator) -> CSVDictIterator:
-    for row in csv:
-        if not is_empty_row(row):
-            yield row
-
-
-def reject_empty_cells(
-    csv: CSVDictIterator, columns: list[CSVColumnType]
-) -> CSVDictIterator:
-    columns_by_header = {column.name: column for column in columns}
-
-    for r, row in enumerate(csv):
-        # Skip empty rows, we filter them out later
-        if is_empty_row(row):
-            yield row
-            continue
-
-        for header, value in row.items():
-            if value == "" and not columns_by_header[header].allow_empty_rows:
-                raise CSVParseError(
-                    f"A value is required for the cell at column {header}, row {r + 2}."
-                )
-        yield row
+ValueParser = Callable[[str, int], Any]
 
 
-def validate_and_parse_values(
-    csv: CSVDictIterator, columns: list[CSVColumnType]
-) -> CSVDictIterator:
-    columns_by_header = {column.name: column for column in columns}
-
-    def parse_and_validate_value(header, value, r):
-        where = f"column {header}, row {r + 2}"
-        column = columns_by_header[header]
-
-        if column.allow_empty_rows and value == "":
-            return None
+def compile_value_parser(header: str, column: CSVColumnType) -> ValueParser | None:
+    """
+    Returns a function that validates and parses a cell in the given column,
+    given the cell value and the row index (for error messages). Returns None
+    if values in the column can be used as is.
+    """
 
-        if column.value_type is CSVValueType.NUMBER:
-            try:
-                number = locale.atoi(value)
-            except ValueError:
-                raise CSVParseError(f"Expected a number in {where}. Got: {value}.")
-            if number < 0:
-                raise CSVParseError(
-                    f"Expected a number greater than or equal to 0 in {where}. Got: {value}."
-                )
-            return number
+    def where(r: int) -> str:
+        return f"column {header}, row {r + 2}"
 
-        if column.value_type is CSVValueType.EMAIL:
-            if not EMAIL_REGEX.match(value):
-                raise CSVParseError(
-                    f"Expected an email address in {where}. Got: {value}."
-                )
-
-        if column.value_type is CSVValueType.YES_NO:
-            if value.lower() in ["y", "yes"]:
-                return True
-            if value.lower() in ["n", "no"]:
-                return False
-            raise CSVParseError(f"Expected Y or N in {where}. Got: {value}.")
+    def parse_number(value: str, r: int) -> int:
+        # Most numbers are plain digits, which we can parse without the
+        # locale's handling of thousands separators
+        if value.isascii() and value.isdigit():
+            return int(value)
+        try:
+            number = locale.atoi(value)
+        except ValueError:
+            raise CSVParseError(f"Expected a number in {where(r)}. Got: {value}.")
+        if number < 0:
+            raise CSVParseError(
+                f"Expected a number greater than or equal to 0 in {where(r)}. Got: {value}."
+            )
+        return number
 
+    def parse_email(value: str, r: int) -> str:
+        if not EMAIL_REGEX.match(value):
+            raise CSVParseError(
+                f"Expected an email address in {where(r)}. Got: {value}."
+            )
         return value
 
-    for r, row in enumerate(csv):
-        # Skip empty rows, we filter them out later
-        if is_empty_row(row):
-            yield row
-            continue
+    def parse_yes_no(value: str, r: int) -> bool:
+        if value.lower() in ["y", "yes"]:
+            return True
+        if value.lower() in ["n", "no"]:
+            return False
+        raise CSVParseError(f"Expected Y or N in {where(r)}. Got: {value}.")
+
+    parsers: dict[CSVValueType, ValueParser] = {
+        CSVValueType.NUMBER: parse_number,
+        CSVValueType.EMAIL: parse_email,
+        CSVValueType.YES_NO: parse_yes_no,
+    }
+    parse = parsers.get(column.value_type)
+    if not column.allow_empty_rows:
+        return parse
+
+    def parse_allow_empty(value: str, r: int) -> Any:
+        if value == "":
+            return None
+        return parse(value, r) if parse else value
 
-        yield {
-            header: parse_and_validate_value(header, value, r)
-            for header, value in row.items()
-        }
+    return parse_allow_empty
 
 
 def format_tuple(tup: tuple) -> str:
     return str(tup[0]) if len(tup) == 1 else str(tup)
 
 
-def reject_duplicate_values(
-    csv: CSVDictIterator, columns: list[CSVColumnType]
-) -> CSVDictIterator:
-    # For our purposes, we want all the columns with unique=True to be used as
-    # one composite unique key for the rows.
-    unique_columns = tuple(sorted(column.name for column in columns if column.unique))
-    if len(unique_columns) == 0:
-        yield from csv
-        return
+TOTAL_REGEX = re.compile(r"(^|[^a-zA-Z])(sub)?totals?($|[^a-zA-Z])", re.IGNORECASE)
 
-    seen = set()
-    for row in csv:
-        # Skip empty rows, we filter them out later
-        if is_empty_row(row):
-            yield row
-            continue
 
-        row_key = tuple(row[column] for column in unique_columns)
-        if row_key in seen:
+class CompiledCSVSchema:
+    """
+    The column types for a CSV, compiled against its (normalized) headers into
+    a validator for each column index. This lets us validate and parse each
+    row as a list in one pass, rather than passing a dict for each row through
+    a chain of checks. The checks (and their error messages) are:
+
+    - Each row has the same number of cells as the headers
+    - Cells have values, unless the column allows empty rows
+    - There are no total rows
+    - Values are valid for their column type (and are parsed)
+    - Rows are unique by the composite key of all columns with unique=True
+    - The last row isn't the total of the rows above it
+
+    Empty rows are skipped (after counting them for row numbers).
+    """
+
+    def __init__(self, headers: list[str], columns: list[CSVColumnType]):
+        columns_by_header = {column.name: column for column in columns}
+        self.headers = headers
+        self.parsers = [
+            compile_value_parser(header, columns_by_header[header])
+            for header in headers
+        ]
+        self.has_parsers = any(parse is not None for parse in self.parsers)
+        self.required_indices = [
+            i
+            for i, header in enumerate(headers)
+            if not columns_by_header[header].allow_empty_rows
+        ]
+
+        # For our purposes, we want all the columns with unique=True to be used as
+        # one composite unique key for the rows.
+        self.unique_columns = tuple(
+            sorted(
+                column.name
+                for column in columns
+                if column.unique and column.name in headers
+            )
+        )
+        self.unique_indices = [headers.index(name) for name in self.unique_columns]
+        self.seen_unique_keys: set[tuple] = set()
+
+        # To detect a final total row, keep a running sum of each numeric
+        # column (except for the last value seen)
+        self.number_indices = [
+            headers.index(column.name)
+            for column in columns
+            if column.value_type == CSVValueType.NUMBER and column.name in headers
+        ]
+        self.number_sums = [0 for _ in self.number_indices]
+        self.number_last_values: list[int | None] = [None for _ in self.number_indices]
+        self.num_rows = 0
+
+    def parse_row(self, r: int, row: CSVRow) -> dict[str, Any] | None:
+        """
+        Validates and parses a row, given its index (not counting headers).
+        Returns None for empty rows.
+        """
+        headers = self.headers
+        if len(row) != len(headers) and len(row) != 0:
             raise CSVParseError(
-                f"Each row must be uniquely identified by {format_tuple(unique_columns)}."
-                + f" Found duplicate: {format_tuple(row_key)}."
+                f"Wrong number of cells in row {r + 2}."
+                f" Expected {len(headers)} {pluralize('cell', len(headers))},"
+                f" got {len(row)} {pluralize('cell', len(row))}."
             )
-        else:
-            seen.add(row_key)
-
-        yield row
-
-
-TOTAL_REGEX = re.compile(r"(^|[^a-zA-Z])(sub)?totals?($|[^a-zA-Z])", re.IGNORECASE)
-
+        if not any(row):
+            return None
 
-def reject_total_rows(csv: CSVDictIterator) -> CSVDictIterator:
-    for r, row in enumerate(csv):
-        for value in row.values():
-            if TOTAL_REGEX.search(value):
+        for i in self.required_indices:
+            if row[i] == "":
                 raise CSVParseError(
-                    f"It looks like you might have a total row (row {r + 2})."
-                    " Please remove this row from the CSV."
+                    f"A value is required for the cell at column {headers[i]}, row {r + 2}."
                 )
-        yield row
-
-
-def reject_final_total_row(csv: CSVDictIterator, columns: list[CSVColumnType]):
-    numeric_column_values = defaultdict(list)
 
-    num_rows = 0
-    for row in csv:
-        num_rows += 1
-        for column in columns:
-            value = row.get(column.name)
-            if column.value_type == CSVValueType.NUMBER and value is not None:
-                numeric_column_values[column.name].append(value)
-        yield row
+        # Since "total" is only letters, it matches a cell iff it matches the
+        # cells joined with a non-letter separator
+        if TOTAL_REGEX.search("\0".join(row)):
+            raise CSVParseError(
+                f"It looks like you might have a total row (row {r + 2})."
+                " Please remove this row from the CSV."
+            )
 
-    if (
-        num_rows > 2
-        and len(numeric_column_values) > 0
-        and all(
-            sum(values[:-1]) == values[-1] and values[-1] != 0
-            for values in numeric_column_values.values()
+        values: list[Any] = (
+            [
+                value if parse is None else parse(value, r)
+                for parse, value in zip(self.parsers, row)
+            ]
+            if self.has_parsers
+            else row
         )
-    ):
-        raise CSVParseError(
-            "It looks like the last row in the CSV might be a total row."
-            " Please remove this row from the CSV."
-        )
-
-
-def convert_rows_to_dicts(csv: CSVIterator) -> CSVDictIterator:
-    headers = next(csv)
 
-    for r, row in enumerate(csv):
-        # Normalize empty rows to make sure we can turn them into dicts.
-        # We'll filter them out later.
-        if len(row) == 0:
-            row = ["" for _ in headers]
-        if len(row) != len(headers):
+        if self.unique_indices:
+            row_key = tuple(values[i] for i in self.unique_indices)
+            if row_key in self.seen_unique_keys:
+                raise CSVParseError(
+                    f"Each row must be uniquely identified by {format_tuple(self.unique_columns)}."
+                    + f" Found duplicate: {format_tuple(row_key)}."
+                )
+            self.seen_unique_keys.add(row_key)
+
+        self.num_rows += 1
+        for n, i in enumerate(self.number_indices):
+            value = values[i]
+            if value is not None:
+                last_value = self.number_last_values[n]
+                if last_value is not None:
+                    self.number_sums[n] += last_value
+                self.number_last_values[n] = value
+
+        return dict(zip(headers, values))
+
+    def reject_final_total_row(self):
+        """
+        Call after parsing all rows.
+        """
+        columns_with_values = [
+            (total, last_value)
+            for total, last_value in zip(self.number_sums, self.number_last_values)
+            if last_value is not None
+        ]
+        if (
+            self.num_rows > 2
+            and len(columns_with_values) > 0
+            and all(
+                total == last_value and last_value != 0
+                for total, last_value in columns_with_values
+            )
+        ):
             raise CSVParseError(
-                f"Wrong number of cells in row {r + 2}."
-                f" Expected {len(headers)} {pluralize('cell', len(headers))},"
-                f" got {len(row)} {pluralize('cell', len(row))}."
+                "It looks like the last row in the CSV might be a total row."
+                " Please remove this row from the CSV."
             )
 
-        yield dict(zip(headers, row))
+
+def validate_and_parse_rows(
+    csv: CSVIterator, columns: list[CSVColumnType]
+) -> CSVDictIterator:
+    schema = CompiledCSVSchema(next(csv), columns)
+    for r, row in enumerate(csv):
+        parsed_row = schema.parse_row(r, row)
+        if parsed_row is not None:
+            yield parsed_row
+    schema.reject_final_total_row()
 
 
 def pluralize(word: str, num: int) -> str:
@@ -1,5 +1,7 @@
 from collections import defaultdict
+from typing import BinaryIO, NamedTuple
 from xml.etree.ElementTree import Element, ElementTree
+from defusedxml.ElementTree import iterparse
 
 NAMESPACE = "http://tempuri.org/CVRDesign.xsd"
 
@@ -19,21 +21,112 @@ def findall_xml(xml: ElementTree | Element, tag: str):
     return xml.findall(f"{{{NAMESPACE}}}{tag}")
 
 
+def parse_contest_result(contest: Element) -> tuple[str, set[str]]:
+    contest_name = find_xml(contest, "Name").text
+    # From what we've seen so far with Hart CVRs, the only choices
+    # listed are the ones with votes (i.e. with "Value" = 1), so if we
+    # see a choice, we can count it as a vote.
+    choice_names = set()
+    for choice in findall_xml(find_xml(contest, "Options"), "Option"):
+        if find_xml(choice, "WriteInData"):
+            choice_names.add("Write-In")
+        else:
+            choice_names.add(find_xml(choice, "Name").text)
+    return contest_name, choice_names
+
+
 def parse_contest_results(cvr_xml: ElementTree):
     # { contest_name: voted_for_choices }
     results = defaultdict(set)
     contests = findall_xml(find_xml(cvr_xml, "Contests"), "Contest")
     for contest in contests:
-        contest_name = find_xml(contest, "Name").text
-        # From what we've seen so far with Hart CVRs, the only choices
-        # listed are the ones with votes (i.e. with "Value" = 1), so if we
-        # see a choice, we can count it as a vote.
-        choices = findall_xml(find_xml(contest, "Options"), "Option")
-        for choice in choices:
-            if find_xml(choice, "WriteInData"):
-                choice_name = "Write-In"
-            else:
-                choice_name = find_xml(choice, "Name").text
-            results[contest_name].add(choice_name)
+        contest_name, choice_names = parse_contest_result(contest)
+        if choice_names:
+            results[contest_name].update(choice_names)
 
     return results
+
+
+class HartCvr(NamedTuple):
+    """
+    The parts of a Hart CVR XML document that we need to load a CVR ballot,
+    so that we can parse each document once and hold on to the results.
+    """
+
+    cvr_guid: str | None
+    batch_number: str | None
+    batch_sequence: str | None
+    precinct_name: str | None
+    # { contest_name: voted_for_choices }
+    contest_results: dict[str, set[str]]
+
+
+def qualified_tag(tag: str):
+    return f"{{{NAMESPACE}}}{tag}"
+
+
+CVR_GUID_TAG = qualified_tag("CvrGuid")
+BATCH_NUMBER_TAG = qualified_tag("BatchNumber")
+BATCH_SEQUENCE_TAG = qualified_tag("BatchSequence")
+PRECINCT_SPLIT_TAG = qualified_tag("PrecinctSplit")
+CONTESTS_TAG = qualified_tag("Contests")
+CONTEST_TAG = qualified_tag("Contest")
+
+
+def parse_hart_cvr(cvr_file: BinaryIO, require_batch_fields: bool = True) -> HartCvr:
+    """
+    Parses a Hart CVR XML document, extracting the same values as
+    find_xml/parse_contest_results would from the full document tree.
+
+    Rather than building the whole tree, we stream through the document and
+    only look at the elements we need, discarding each top-level element (and
+    each contest) once we've read it.
+
+    If require_batch_fields is set, raises an error if CvrGuid, BatchNumber,
+    or BatchSequence is missing. Otherwise, missing values are None.
+    """
+    texts: dict[str, str | None] = {}
+    precinct_name = None
+    contest_results: dict[str, set[str]] = defaultdict(set)
+    found_contests = False
+    in_contests = False
+    depth = 0
+
+    for event, element in iterparse(cvr_file, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            # Like find_xml, only look at the first Contests element
+            if depth == 2 and element.tag == CONTESTS_TAG and not found_contests:
+                found_contests = in_contests = True
+            continue
+
+        if depth == 3 and in_contests and element.tag == CONTEST_TAG:
+            contest_name, choice_names = parse_contest_result(element)
+            if choice_names:
+                contest_results[contest_name].update(choice_names)
+            element.clear()
+        elif depth == 2:
+            if element.tag == CONTESTS_TAG:
+                in_contests = False
+            elif element.tag in (CVR_GUID_TAG, BATCH_NUMBER_TAG, BATCH_SEQUENCE_TAG):
+                texts.setdefault(element.tag, element.text)
+            elif element.tag == PRECINCT_SPLIT_TAG and PRECINCT_SPLIT_TAG not in texts:
+                texts[PRECINCT_SPLIT_TAG] = None
+                precinct_name = find_text_xml(element, "Name")
+            element.clear()
+        depth -= 1
+
+    if not found_contests:
+        raise ValueError("Could not find Contests in CVR")
+    if require_batch_fields:
+        for tag in (CVR_GUID_TAG, BATCH_NUMBER_TAG, BATCH_SEQUENCE_TAG):
+            if tag not in texts:
+                raise ValueError(f"Could not find {tag} in CVR")
+
+    return HartCvr(
+        cvr_guid=texts.get(CVR_GUID_TAG),
+        batch_number=texts.get(BATCH_NUMBER_TAG),
+        batch_sequence=texts.get(BATCH_SEQUENCE_TAG),
+        precinct_name=precinct_name,
+        contest_results=dict(contest_results),
+    )
@@ -0,0 +1,35 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import signal
+
+from ..database import engine
+
+
+def init_forked_process():
+    # Forked processes inherit the parent's signal handlers. In a background
+    # worker, those reset the running task using the parent's database
+    # connection, which would corrupt that connection if a child ran them too
+    # (e.g. when every process receives SIGTERM on shutdown). Child processes
+    # should just exit, leaving the parent to clean up.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # Make sure the child never touches the parent's pooled database
+    # connections. Replacing the pool (rather than disposing it) leaves the
+    # inherited connections open, since closing them would also close them
+    # for the parent. Child processes shouldn't use the database at all, but
+    # if they do, they'll get a new connection of their own.
+    engine.pool = engine.pool.recreate()
+
+
+def fork_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Returns a pool of processes forked from the current process. Use this
+    instead of creating a ProcessPoolExecutor directly, so that the child
+    processes are safe to fork from a background worker (see
+    init_forked_process).
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=init_forked_process,
+    )
@@ -1,13 +1,15 @@
+import enum
+import time
 import uuid
 import traceback
 import logging
 from inspect import signature
 from datetime import datetime
 from typing import Callable
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import aliased
 import sentry_sdk
 
-from ..database import db_session, engine
+from ..database import db_session
 from ..models import *
 from ..util.isoformat import isoformat
 from ..util.jsonschema import JSONDict
@@ -24,17 +26,41 @@ class UserError(Exception):
     pass
 
 
+class TaskPriority(enum.IntEnum):
+    # Quick tasks that a user is actively waiting on (e.g. sample sizes)
+    INTERACTIVE = 0
+    DEFAULT = 1
+    # Long-running file ingest tasks
+    BULK = 2
+
+
 task_dispatch: dict[str, Callable] = {}
+task_priorities: dict[str, TaskPriority] = {}
+
+# Postgres NOTIFY channel used to wake up idle workers when a task is queued.
+TASK_QUEUE_CHANNEL = "background_task_queue"
 
 
 # Decorator to register background task handlers. We use the handler's function
-# name as the key.
-def background_task(task_handler: Callable):
-    task_dispatch[task_handler.__name__] = task_handler
-    assert "election_id" in signature(task_handler).parameters, (
-        f"Payload for task {task_handler.__name__} must include 'election_id' to easily identify all task logs for a single audit."
-    )
-    return task_handler
+# name as the key. Can be used bare (@background_task) or with a priority
+# (@background_task(priority=TaskPriority.BULK)). When multiple tasks are
+# claimable, workers claim higher priority tasks first.
+def background_task(
+    task_handler: Callable | None = None,
+    *,
+    priority: TaskPriority = TaskPriority.DEFAULT,
+):
+    def register(task_handler: Callable):
+        task_dispatch[task_handler.__name__] = task_handler
+        task_priorities[task_handler.__name__] = priority
+        assert "election_id" in signature(task_handler).parameters, (
+            f"Payload for task {task_handler.__name__} must include 'election_id' to easily identify all task logs for a single audit."
+        )
+        return task_handler
+
+    if task_handler is None:
+        return register
+    return register(task_handler)
 
 
 def create_background_task(
@@ -64,8 +90,10 @@ def create_background_task(
         # Only allow one task per audit to run at a time. This ensures that
         # tasks won't try to access the same db resources at the same time.
         lock_key=f"election_id:{payload['election_id']}",
+        priority=task_priorities[task_handler.__name__],
     )
     db_session.add(task)
+    notify_task_queued(task, db_session)
 
     # For testing, we often prefer tasks to run immediately, instead of asynchronously.
     if config.RUN_BACKGROUND_TASKS_IMMEDIATELY:
@@ -76,6 +104,16 @@ def create_background_task(
     return task
 
 
+def notify_task_queued(task: BackgroundTask, db_session):
+    # Let any listening workers know there's a task to claim. Postgres only
+    # delivers the notification once the enclosing transaction commits, so
+    # workers will never wake up to find a task they can't see yet.
+    db_session.execute(
+        "SELECT pg_notify(:channel, :task_id)",
+        dict(channel=TASK_QUEUE_CHANNEL, task_id=task.id),
+    )
+
+
 def task_log_data(task: BackgroundTask) -> JSONDict:
     return dict(
         id=task.id,
@@ -85,16 +123,74 @@ def task_log_data(task: BackgroundTask) -> JSONDict:
     )
 
 
-def emit_progress_for_task(task_id: str):
-    progress_session = Session(engine)
+class TaskProgressReporter:
+    """
+    Records progress for a running task so it can be shown in the UI.
+
+    Progress is written on its own connection (outside of the task's
+    transaction) so that it's visible while the task is still running. Since
+    tasks may report progress very frequently, we reuse a single connection for
+    the whole task and throttle writes: after the first write, we only write
+    again once both enough time has passed and progress has changed by a large
+    enough percentage, or when the work is done.
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        engine,
+        min_interval_seconds: float = 1.0,
+        min_percent_change: float = 1.0,
+    ):
+        self.task_id = task_id
+        self.engine = engine
+        self.min_interval_seconds = min_interval_seconds
+        self.min_percent_change = min_percent_change
+        self.connection = None
+        # (time.monotonic(), work_progress, work_total) of the last write
+        self.last_emitted: tuple[float, int, int | None] | None = None
+
+    def should_emit(self, now: float, work_progress: int, work_total: int | None):
+        if self.last_emitted is None:
+            return True
+        last_time, last_progress, last_total = self.last_emitted
+        if (work_progress, work_total) == (last_progress, last_total):
+            return False
+        if work_total != last_total:
+            return True
+        if work_total is not None and work_progress >= work_total:
+            return True
+        if now - last_time < self.min_interval_seconds:
+            return False
+        return (
+            not work_total
+            or abs(work_progress - last_progress) * 100 / work_total
+            >= self.min_percent_change
+        )
 
-    def emit_progress(work_progress: int, work_total: int):
-        task = progress_session.query(BackgroundTask).get(task_id)
-        task.work_progress = work_progress
-        task.work_total = work_total
-        progress_session.commit()
+    def emit_progress(self, work_progress: int, work_total: int | None):
+        now = time.monotonic()
+        if not self.should_emit(now, work_progress, work_total):
+            return
+
+        values = dict(work_progress=work_progress, work_total=work_total)
+        # Mark when the work started so we can compute throughput
+        if self.last_emitted is None:
+            values["work_started_at"] = datetime.now(timezone.utc)
+        if self.connection is None:
+            self.connection = self.engine.connect()
+        # Update the row directly, rather than loading the task via the ORM
+        self.connection.execute(
+            BackgroundTask.__table__.update()
+            .where(BackgroundTask.id == self.task_id)
+            .values(**values)
+        )
+        self.last_emitted = (now, work_progress, work_total)
 
-    return emit_progress
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
 
 
 def run_task(task: BackgroundTask, db_session):
@@ -109,8 +205,10 @@ def run_task(task: BackgroundTask, db_session):
     task_args = dict(task.payload)
     task_parameters = signature(task_handler).parameters
     # Inject emit_progress for handlers that want to record task progress
+    progress_reporter = None
     if "emit_progress" in task_parameters:
-        task_args["emit_progress"] = emit_progress_for_task(task.id)
+        progress_reporter = TaskProgressReporter(task.id, db_session.bind)
+        task_args["emit_progress"] = progress_reporter.emit_progress
     # For testing, allow the db_session to be injected into the task handler.
     if "db_session" in task_parameters:
         task_args["db_session"] = db_session
@@ -147,46 +245,35 @@ def run_task(task: BackgroundTask, db_session):
             logger.error(f"TASK_ERROR {log_data}")
             sentry_sdk.capture_exception(error)
 
+    finally:
+        if progress_reporter:
+            progress_reporter.close()
+
 
 def claim_next_task(worker_id: str, db_session) -> BackgroundTask | None:
-    # Use SELECT ... FOR UPDATE to lock all queued tasks, ensuring that only a
-    # single worker can claim a single task at a time. This ensures that we get
-    # an accurate view of which tasks are available to claim. If another worker has
-    # already locked the queued task, this query will block (though it shouldn't
-    # take long to claim a task, so this shouldn't cause problems).
+    # Use SELECT ... FOR UPDATE SKIP LOCKED to lock a single candidate task. If
+    # another worker is in the middle of claiming a task, we skip over it
+    # instead of waiting, so multiple workers can claim tasks in parallel
+    # without contending for a lock on the whole queue.
     #
-    # If new tasks are added after we lock the queued tasks, they won't be
-    # accessible by this worker, but another worker also won't be able to claim
-    # them (since it will also be trying to lock _all_ queued tasks, including
-    # the ones we already locked).
+    # Since workers no longer serialize on the queue, locking the candidate row
+    # isn't enough to guarantee that only one task per lock_key is running (two
+    # workers could lock two different queued tasks with the same lock_key). To
+    # handle that, we also take a transaction-scoped advisory lock on the
+    # candidate's lock_key, then double check that no task with that lock_key is
+    # in progress. The advisory lock is held until we commit the claim, and each
+    # statement in a READ COMMITTED transaction sees all previously committed
+    # changes, so a worker that gets the advisory lock after another worker's
+    # claim is guaranteed to see that claim.
     #
-    # Importantly, this also ensures that we get a safe view of which lock_keys
-    # are currently in use by in-progress tasks.  Importantly, this also ensures
-    # that we get a safe view of which lock_keys are currently in use by
-    # in-progress tasks. If this worker has successfully locked all queued
-    # tasks, then it's the only worker that can claim a task right now, so no
-    # additional tasks can be started. That means the current set of in-progress
-    # lock_keys won't change until this worker releases the lock on the queued
-    # tasks.
+    # If we can't get the advisory lock, another worker is claiming a task with
+    # the same lock_key right now, so we skip that lock_key and try the next
+    # candidate.
     #
-    # It is possible for another worker to finish an in-progress task and
-    # release a lock_key while we're running this query, but that's fine because
-    # even if we don't see that change and wanted to claim that lock_key, we'll
-    # just fail and try again later.
-    #
-    # Another approach to this would be to lock the entire table, but that would
-    # also prevent in-progress tasks from completing.
-    #
-    # We don't actually need to load the queued tasks into the app, so we just
-    # execute the query.
-    (
-        db_session.execute(
-            db_session.query(BackgroundTask)
-            .filter_by(started_at=None)
-            .with_for_update()
-            .with_entities(BackgroundTask.id)
-        )
-    )
+    # Higher priority tasks are claimed first, but tasks with the same lock_key
+    # always run in the order they were created (e.g. we must finish processing
+    # a manifest before computing sample sizes for that audit), so only the
+    # oldest queued task for each lock_key is a candidate.
     in_progress_task_lock_keys = (
         db_session.query(BackgroundTask)
         .filter(BackgroundTask.started_at.isnot(None))
@@ -194,20 +281,57 @@ def claim_next_task(worker_id: str, db_session) -> BackgroundTask | None:
         .with_entities(BackgroundTask.lock_key)
         .subquery()
     )
-    task: BackgroundTask | None = (
-        db_session.query(BackgroundTask)
-        .filter_by(started_at=None)
-        # Only allow one task per lock key to run at a time.
-        .filter(BackgroundTask.lock_key.notin_(in_progress_task_lock_keys))
-        .order_by(BackgroundTask.created_at)
-        .limit(1)
-        .one_or_none()
+    OlderQueuedTask = aliased(BackgroundTask)
+    older_queued_task_exists = (
+        db_session.query(OlderQueuedTask)
+        .filter(
+            OlderQueuedTask.started_at.is_(None),
+            OlderQueuedTask.lock_key == BackgroundTask.lock_key,
+            OlderQueuedTask.created_at < BackgroundTask.created_at,
+        )
+        .exists()
     )
+    skipped_lock_keys: list[str] = []
+    task: BackgroundTask | None = None
+    while True:
+        task = (
+            db_session.query(BackgroundTask)
+            .filter_by(started_at=None)
+            # Only allow one task per lock key to run at a time.
+            .filter(BackgroundTask.lock_key.notin_(in_progress_task_lock_keys))
+            .filter(BackgroundTask.lock_key.notin_(skipped_lock_keys))
+            .filter(~older_queued_task_exists)
+            .order_by(BackgroundTask.priority, BackgroundTask.created_at)
+            .with_for_update(skip_locked=True)
+            .limit(1)
+            .one_or_none()
+        )
+        if task is None:
+            break
+
+        (got_lock_key,) = db_session.execute(
+            "SELECT pg_try_advisory_xact_lock(hashtext(:lock_key))",
+            dict(lock_key=task.lock_key),
+        ).fetchone()
+        lock_key_in_progress = got_lock_key and (
+            db_session.query(BackgroundTask)
+            .filter(BackgroundTask.started_at.isnot(None))
+            .filter_by(completed_at=None, lock_key=task.lock_key)
+            .with_entities(BackgroundTask.id)
+            .first()
+            is not None
+        )
+        if got_lock_key and not lock_key_in_progress:
+            break
+
+        skipped_lock_keys.append(task.lock_key)
+        task = None
+
     if task:
         task.worker_id = worker_id
         task.started_at = datetime.now(timezone.utc)
-    # Commit the transaction to release the table lock, regardless of whether we
-    # claimed a task.
+    # Commit the transaction to release the row and advisory locks, regardless
+    # of whether we claimed a task.
     db_session.commit()
     return task
 
@@ -227,6 +351,7 @@ def reset_task(task: BackgroundTask, db_session):
     logger.info(f"TASK_RESET {task_log_data(task)}")
     task.worker_id = None
     task.started_at = None
+    notify_task_queued(task, db_session)
     db_session.commit()
 
 
@@ -254,4 +379,19 @@ def serialize_background_task(task: BackgroundTask | None) -> JSONDict | None:
         json["workProgress"] = task.work_progress
         json["workTotal"] = task.work_total
 
+        # While the task is running, estimate throughput (work units per
+        # second) and time remaining based on the last progress update.
+        if (
+            status == ProcessingStatus.PROCESSING
+            and task.work_started_at
+            and task.work_progress
+        ):
+            elapsed_seconds = (task.updated_at - task.work_started_at).total_seconds()
+            if elapsed_seconds > 0:
+                work_rate = task.work_progress / elapsed_seconds
+                json["workRate"] = round(work_rate, 1)
+                json["workEtaSeconds"] = max(
+                    round((task.work_total - task.work_progress) / work_rate), 0
+                )
+
     return json
@@ -1,11 +1,22 @@
+import multiprocessing
+import multiprocessing.connection
 import os
+import select
 import signal
 import sys
 import time
+from typing import Callable
 
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+import sqlalchemy.exc
+
+from server import config
 from server.database import db_session
 from server.worker.tasks import (
+    TASK_QUEUE_CHANNEL,
     claim_next_task,
+    logger,
     reset_task,
     run_task,
 )
@@ -17,7 +28,61 @@ from server.websession import cleanup_sessions
 from server import api  # noqa
 
 
-def run_worker(worker_id: str, db_session, pause_between_tasks_seconds):
+def listen_for_queued_tasks(engine):
+    # LISTEN needs its own connection outside of any transaction, since
+    # notifications are only delivered between transactions.
+    connection = engine.raw_connection()
+    connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    with connection.cursor() as cursor:
+        cursor.execute(f"LISTEN {TASK_QUEUE_CHANNEL}")
+    return connection
+
+
+def wait_for_queued_task(listen_connection, timeout_seconds: float):
+    # Block until a notification arrives or we time out. Notifications that
+    # arrived while we were busy are buffered on the connection, so we check
+    # for those first and return right away if there are any.
+    listen_connection.poll()
+    if not listen_connection.notifies:
+        select.select([listen_connection], [], [], timeout_seconds)
+        listen_connection.poll()
+    # We don't care which task was queued, just that there is something to
+    # claim, so drop all pending notifications.
+    listen_connection.notifies.clear()
+
+
+# Errors raised when the LISTEN connection has been lost or can't be made, e.g.
+# while the database is restarting or failing over
+LISTEN_CONNECTION_ERRORS = (
+    psycopg2.OperationalError,
+    psycopg2.InterfaceError,
+    sqlalchemy.exc.OperationalError,
+    sqlalchemy.exc.InterfaceError,
+)
+
+
+def wait_for_queued_task_or_reconnect(engine, listen_connection, timeout_seconds):
+    # Like wait_for_queued_task, but recovers from losing the LISTEN
+    # connection. Returns the connection to wait on next time, or None if we
+    # still need to reconnect. Until we can reconnect, we just wait for the
+    # timeout, falling back to polling for tasks.
+    try:
+        if listen_connection is None:
+            # We may have missed notifications while we weren't listening, so
+            # return right away to check for tasks.
+            return listen_for_queued_tasks(engine)
+        wait_for_queued_task(listen_connection, timeout_seconds)
+        return listen_connection
+    except LISTEN_CONNECTION_ERRORS as error:
+        logger.warning(f"WORKER_LISTEN_ERROR {{'error': {str(error).strip()!r}}}")
+        if listen_connection is not None:
+            # Discard the connection rather than returning it to the pool
+            listen_connection.invalidate()
+        time.sleep(timeout_seconds)
+        return None
+
+
+def run_worker(worker_id: str, db_session, poll_interval_seconds):
     task = None
 
     # Heroku dynos are sent one or more SIGTERM signals when they are shut down,
@@ -34,6 +99,12 @@ def run_worker(worker_id: str, db_session, pause_between_tasks_seconds):
     # Also handle SIGINT for local development
     signal.signal(signal.SIGINT, interrupt_handler)
 
+    # Start listening before we look for the first task, so we don't miss any
+    # tasks queued in between.
+    listen_connection = wait_for_queued_task_or_reconnect(
+        db_session.bind, None, poll_interval_seconds
+    )
+
     # If the database connection is closed due to sys.exit above, stop working.
     while db_session.is_active:
         task = claim_next_task(worker_id, db_session)
@@ -44,14 +115,125 @@ def run_worker(worker_id: str, db_session, pause_between_tasks_seconds):
         # sessions, since it's a convenient place to essentially run a cron job.
         cleanup_sessions(db_session)
 
-        # Before sleeping, we need to commit the current transaction, otherwise
+        # Before waiting, we need to commit the current transaction, otherwise
         # we will have "idle in transaction" queries that will lock the
         # database, which gets in the way of migrations.
         db_session.commit()
-        time.sleep(pause_between_tasks_seconds)
+
+        # If we just ran a task, there may be more queued up, so check again
+        # right away. Otherwise, wait for a new task to be queued. We still
+        # poll periodically as a fallback, since a queued task can also become
+        # claimable without a notification (e.g. when another worker finishes a
+        # task with the same lock_key).
+        if not task:
+            listen_connection = wait_for_queued_task_or_reconnect(
+                db_session.bind, listen_connection, poll_interval_seconds
+            )
+
+
+# If a task slot keeps exiting soon after it starts (e.g. because the database
+# is down), wait before restarting it, doubling the delay each time up to a max.
+# Once a slot has run for WORKER_SLOT_HEALTHY_SECONDS, restart it right away.
+WORKER_SLOT_MIN_RESTART_DELAY_SECONDS = 1
+WORKER_SLOT_MAX_RESTART_DELAY_SECONDS = 60
+WORKER_SLOT_HEALTHY_SECONDS = 60
+
+
+def slot_restart_delay(previous_delay: float, uptime_seconds: float) -> float:
+    if uptime_seconds >= WORKER_SLOT_HEALTHY_SECONDS:
+        return 0
+    return min(
+        max(previous_delay * 2, WORKER_SLOT_MIN_RESTART_DELAY_SECONDS),
+        WORKER_SLOT_MAX_RESTART_DELAY_SECONDS,
+    )
+
+
+def run_worker_pool(
+    worker_id: str,
+    num_slots: int,
+    poll_interval_seconds,
+    # Called in each slot process to get a db_session. Use the global
+    # db_session by default, but allow it to be overridden for testing.
+    create_db_session: Callable = lambda: db_session,
+):
+    # Run multiple tasks at once by running a worker in each of a pool of
+    # processes (task slots). Each slot claims tasks independently, so the usual
+    # claim_next_task rules still apply (e.g. one task per lock_key at a time).
+    #
+    # This process just supervises the slots and never touches the database,
+    # so the forked slots don't end up sharing database connections.
+    context = multiprocessing.get_context("fork")
+
+    def run_slot(slot_worker_id: str):
+        # Slots inherit the supervisor's signal handlers, which would terminate
+        # the other slots. Use the default handlers until run_worker installs
+        # its own.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        run_worker(slot_worker_id, create_db_session(), poll_interval_seconds)
+
+    def start_slot(slot: int):
+        process = context.Process(
+            target=run_slot,
+            args=(f"{worker_id}-{slot}",),
+            name=f"worker-slot-{slot}",
+        )
+        process.start()
+        return process
+
+    slots = {slot: start_slot(slot) for slot in range(num_slots)}
+    started_at = {slot: time.monotonic() for slot in slots}
+    restart_delays: dict[int, float] = {slot: 0 for slot in slots}
+    # Slots that have exited, mapped to when to restart them
+    restart_at: dict[int, float] = {}
+
+    # Pass shutdown signals on to the slots so they can reset any in-progress
+    # tasks, and wait for them to finish before exiting.
+    def interrupt_handler(*_args):
+        for process in slots.values():
+            process.terminate()
+        for process in slots.values():
+            process.join()
+        sys.exit(1)
+
+    signal.signal(signal.SIGTERM, interrupt_handler)
+    signal.signal(signal.SIGINT, interrupt_handler)
+
+    # If a slot dies unexpectedly, replace it so we keep the same capacity.
+    while True:
+        multiprocessing.connection.wait(
+            [
+                process.sentinel
+                for slot, process in slots.items()
+                if slot not in restart_at
+            ],
+            timeout=(
+                max(min(restart_at.values()) - time.monotonic(), 0)
+                if restart_at
+                else None
+            ),
+        )
+        now = time.monotonic()
+        for slot, process in slots.items():
+            if slot not in restart_at and not process.is_alive():
+                restart_delays[slot] = slot_restart_delay(
+                    restart_delays[slot], now - started_at[slot]
+                )
+                logger.error(
+                    f"WORKER_SLOT_EXITED {{'worker_id': '{worker_id}-{slot}', 'exitcode': {process.exitcode}, 'restart_delay': {restart_delays[slot]}}}"
+                )
+                restart_at[slot] = now + restart_delays[slot]
+        for slot, slot_restart_at in list(restart_at.items()):
+            if slot_restart_at <= now:
+                del restart_at[slot]
+                slots[slot] = start_slot(slot)
+                started_at[slot] = time.monotonic()
 
 
 if __name__ == "__main__":
     worker_id = os.environ.get("HEROKU_DYNO_ID", str(os.getpid()))
     configure_sentry()
-    run_worker(worker_id, db_session, pause_between_tasks_seconds=2)
+    if config.WORKER_TASK_SLOTS > 1:
+        run_worker_pool(worker_id, config.WORKER_TASK_SLOTS, poll_interval_seconds=30)
+    else:
+        run_worker(worker_id, db_session, poll_interval_seconds=30)